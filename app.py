@@ -1,7 +1,8 @@
 # -*- coding: utf-8 -*-
-from app import create_app
+from app import create_app, iniciar_tareas_de_fondo
 
 app = create_app()
+iniciar_tareas_de_fondo(app)
 
 if __name__ == "__main__":
     # Para correr en local con "python app.py"
@@ -22,6 +22,8 @@ def create_app():
     app.config["SQLALCHEMY_ENGINE_OPTIONS"] = {
         "connect_args": {"options": "-c client_encoding=utf8"}
     }
+    # Falla ante lazy loads no declarados al serializar (activar en tests/CI)
+    app.config["SERIALIZACION_ESTRICTA"] = os.getenv("SERIALIZACION_ESTRICTA", "false").lower() in ("1", "true", "yes")
 
     # 3) JWT (Flask-JWT-Extended espera timedelta)
     app.config["JWT_SECRET_KEY"] = os.getenv("JWT_SECRET_KEY", "dev-secret-change-me")
@@ -62,6 +64,13 @@ def create_app():
     from app.api import register_blueprints
     register_blueprints(app)
 
+    # 6b) Comandos CLI (flask contabilidad ...)
+    from app.commands import register_commands
+    register_commands(app)
+
+    # 6c-6f) Tareas de fondo: las inicia el proceso que sirve requests
+    # (wsgi.py / app.py) con iniciar_tareas_de_fondo(app), no create_app()
+
     # 7) (Opcional) callbacks JWT centralizados si existen
     try:
         from app.api.auth import register_jwt_callbacks
@@ -76,3 +85,45 @@ def create_app():
         seed_db()
 
     return app
+
+
+def _bajo_comando_cli():
+    """True dentro de un comando `flask ...` que no sea `flask run` (db upgrade, mantenimiento, ...)."""
+    import click
+    ctx = click.get_current_context(silent=True)
+    return ctx is not None and ctx.info_name != "run"
+
+
+def iniciar_tareas_de_fondo(app):
+    """
+    Hilos periódicos del servidor. Se llama desde el punto de entrada que sirve
+    requests; los comandos CLI y los scripts que usan create_app() no los inician.
+    """
+    if _bajo_comando_cli():
+        return
+
+    # 6c) Barrido periódico de vencimientos (0 = desactivado; usar cron + `flask creditos marcar-vencidos`)
+    intervalo_vencidos = int(os.getenv("VENCIDOS_INTERVALO_SEGUNDOS", 0))
+    if intervalo_vencidos > 0:
+        from app.services.vencimientos_service import marcar_vencidos
+        from app.utils.scheduler import iniciar_tarea_periodica
+        iniciar_tarea_periodica(app, "marcar-vencidos", intervalo_vencidos, marcar_vencidos)
+
+    # 6d) Purga periódica de Idempotency-Key vencidas (0 = desactivado; usar `flask mantenimiento purgar-idempotencia`)
+    intervalo_purga = int(os.getenv("IDEMPOTENCIA_PURGA_SEGUNDOS", 0))
+    if intervalo_purga > 0:
+        from app.utils.idempotency import purgar_claves_vencidas
+        from app.utils.scheduler import iniciar_tarea_periodica
+        iniciar_tarea_periodica(app, "purgar-idempotencia", intervalo_purga, purgar_claves_vencidas)
+
+    # 6e) Relay del outbox de auditoría (0 = desactivado; usar `flask mantenimiento procesar-outbox`)
+    intervalo_outbox = float(os.getenv("OUTBOX_INTERVALO_SEGUNDOS", 1))
+    if intervalo_outbox > 0:
+        from app.services.outbox_service import drenar_outbox
+        from app.utils.scheduler import iniciar_tarea_periodica
+        iniciar_tarea_periodica(app, "outbox-relay", intervalo_outbox, drenar_outbox)
+
+    # 6f) Escritor asíncrono del historial de accesos (ACCESOS_INTERVALO_MS=0 = escritura inmediata)
+    from app.utils import access_log
+    if access_log.INTERVALO_MS > 0:
+        access_log.iniciar_escritor_accesos(app)
@@ -5,7 +5,10 @@ from flask_jwt_extended import (
     get_jwt_identity, get_jwt
 )
 from app.extensions import db, jwt  # usa las extensiones inicializadas
-from app.models.catalog import Usuario, Rol, Permiso, UsuarioRol, HistorialAcceso
+from app.models.catalog import Usuario, Rol, Permiso, UsuarioRol
+from app.utils.permissions import get_permisos, claims_de_permisos
+from app.utils.access_log import registrar_acceso
+from app.utils.passwords import verificar, hashear, necesita_rehash, HashOcupado
 
 bp = Blueprint("auth", __name__)
 
@@ -42,7 +45,6 @@ def login():
     
     print(f"🕵️ Intento de login - User: [{username}] | PassLen: {len(password)}")
     
-    from werkzeug.security import check_password_hash
     from sqlalchemy import func
     
     # Búsqueda insensible a mayúsculas y espacios
@@ -52,75 +54,75 @@ def login():
 
     if not user:
         print(f"❌ Login FALLIDO: Usuario '{username}' no existe en la DB.")
-        new_log = HistorialAcceso(
+        registrar_acceso(
+            'LOGIN_FALLIDO',
             username_intentado=username,
-            evento='LOGIN_FALLIDO',
             ip_cliente=ip_cliente,
             user_agent=user_agent,
             motivo_fallo='Usuario no encontrado'
         )
-        db.session.add(new_log)
-        db.session.commit()
         return jsonify({"msg": "Credenciales inválidas"}), 401
 
-    if not check_password_hash(user.password_hash, password):
+    try:
+        password_ok = verificar(user.password_hash, password)
+    except HashOcupado as e:
+        return jsonify({"msg": e.message}), 503
+
+    if not password_ok:
         print(f"❌ Login FALLIDO: Contraseña incorrecta para el usuario '{username}'.")
-        new_log = HistorialAcceso(
+        registrar_acceso(
+            'LOGIN_FALLIDO',
             id_usuario=user.id_usuario,
             id_empresa=user.id_empresa,
             username_intentado=username,
-            evento='LOGIN_FALLIDO',
             ip_cliente=ip_cliente,
             user_agent=user_agent,
             motivo_fallo='Contraseña incorrecta'
         )
-        db.session.add(new_log)
-        db.session.commit()
         return jsonify({"msg": "Credenciales inválidas"}), 401
 
     if user.estado != 'ACTIVO':
-        new_log = HistorialAcceso(
+        registrar_acceso(
+            'LOGIN_FALLIDO',
             id_usuario=user.id_usuario,
             id_empresa=user.id_empresa,
             username_intentado=username,
-            evento='LOGIN_FALLIDO',
             ip_cliente=ip_cliente,
             user_agent=user_agent,
             motivo_fallo=f'Usuario con estado: {user.estado}'
         )
-        db.session.add(new_log)
-        db.session.commit()
         return jsonify({"msg": f"El usuario se encuentra {user.estado}"}), 403
 
+    # Hash con parámetros anteriores (método/iteraciones): se actualiza con la contraseña ya verificada
+    if necesita_rehash(user.password_hash):
+        try:
+            user.password_hash = hashear(password)
+            db.session.commit()
+        except HashOcupado:
+            pass  # se reintenta en el próximo login
+
+    # permisos desde roles (una consulta; refresca la caché que usa el claims loader)
+    permisos = get_permisos(user.id_usuario, refrescar=True)
+
     access  = create_access_token(identity=str(user.id_usuario))
     refresh = create_refresh_token(identity=str(user.id_usuario))
 
-    # permisos desde roles
-    permisos = []
-    for ur in user.roles:
-        for rp in ur.rol.permisos_asociados:
-            p = rp.permiso
-            if p.nombre not in permisos:
-                permisos.append(p.nombre)
-
     # Registro de login exitoso
-    new_log = HistorialAcceso(
+    registrar_acceso(
+        'LOGIN_EXITOSO',
         id_usuario=user.id_usuario,
         id_empresa=user.id_empresa,
         username_intentado=username,
-        evento='LOGIN_EXITOSO',
         ip_cliente=ip_cliente,
         user_agent=user_agent
     )
-    db.session.add(new_log)
-    db.session.commit()
 
     return jsonify({
         "access_token": access,
         "refresh_token": refresh,
         "username": user.nombre_usuario,
-        "user_roles": [r.rol.nombre for r in user.roles],
-        "user_permissions": permisos,
+        "user_roles": sorted(permisos.roles),
+        "user_permissions": sorted(permisos.permisos),
         "user_id": str(user.id_usuario),
         "id_empresa": user.id_empresa,
         "empresa_nombre": user.empresa.nombre if user.empresa else None,
@@ -133,21 +135,21 @@ def logout():
     user_id = get_jwt_identity()
     user = Usuario.query.get(int(user_id))
     
-    new_log = HistorialAcceso(
+    registrar_acceso(
+        'LOGOUT',
         id_usuario=user.id_usuario if user else None,
         username_intentado=user.nombre_usuario if user else None,
-        evento='LOGOUT',
         ip_cliente=request.remote_addr,
         user_agent=request.headers.get('User-Agent')
     )
-    db.session.add(new_log)
-    db.session.commit()
     return jsonify({"msg": "Sesión cerrada correctamente"}), 200
 
 @bp.post("/refresh")
 @jwt_required(refresh=True)
 def refresh_token():
     current_user = get_jwt_identity()
+    # Releer permisos para que el nuevo token lleve "perms"/"pv" vigentes
+    get_permisos(current_user, refrescar=True)
     return jsonify(access_token=create_access_token(identity=current_user))
 
 # -----------------------------
@@ -156,17 +158,19 @@ def refresh_token():
 def register_jwt_callbacks(jwt_manager):
     @jwt_manager.additional_claims_loader
     def add_claims_to_access_token(identity):
-        user = Usuario.query.filter_by(id_usuario=int(identity)).first()
-        roles = [ur.rol.nombre for ur in user.roles] if user else []
-        id_empresa = user.id_empresa if user else None
-        is_global = getattr(user, 'is_global', False)
-        return {"roles": roles, "id_empresa": id_empresa, "is_global": is_global}
+        # roles, empresa, códigos de permiso y versión de permisos ("pv")
+        permisos = get_permisos(identity)
+        if not permisos:
+            return {"roles": [], "id_empresa": None, "is_global": False}
+        return claims_de_permisos(permisos)
 
     @jwt_manager.user_lookup_loader
     def user_lookup_callback(jwt_header, jwt_data):
+        # Se ejecuta en cada request protegido: usamos la caché de permisos para no
+        # consultar la DB. current_user es el snapshot PermisosUsuario (None si no existe).
         identity = jwt_data.get("sub")
         try:
             identity_int = int(identity)
         except Exception:
             return None
-        return Usuario.query.filter_by(id_usuario=identity_int).one_or_none()
+        return get_permisos(identity_int)
@@ -1,9 +1,26 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, Response, stream_with_context
 from app.extensions import db
-from app.models.catalog import AsientoContable, MovimientoContable, Usuario
+from app.models.catalog import AsientoContable, MovimientoContable, Usuario, CuentaContable, CierrePeriodo
 from flask_jwt_extended import jwt_required, get_jwt_identity, get_jwt
-from datetime import datetime, timedelta
-from sqlalchemy import func, case
+from datetime import date, datetime, timedelta
+import csv
+import io
+import json
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+from sqlalchemy import func, case, tuple_
+from app.services.contabilidad_service import (
+    postear_asiento, postear_asientos_lote, saldos, flujo_caja, libro_mayor, TIPOS_CUENTA,
+    PeriodoCerrado, ultimo_periodo_cerrado, mes_siguiente
+)
+from app.services.dashboard_service import rango_fechas
+from app.services import cierres_service
+from app.services.cierres_service import parse_periodo
+from app.utils.serialization import con_forma, serializar
+from app.utils.pagination import parse_pagination, parse_keyset, keyset_page
+from app.utils.sql import contar_aproximado
+from app.utils.idempotency import idempotente
+from app.utils.permissions import permission_required
+from app.api.creditos import _como_bool
 
 bp = Blueprint('contabilidad', __name__)
 
@@ -12,47 +29,22 @@ bp = Blueprint('contabilidad', __name__)
 def get_dashboard_data():
     """
     Retorna los saldos actuales de las cuentas principales y datos para el gráfico de flujo de caja.
+    Rango del gráfico opcional: ?dias=N o ?fecha_inicio=&fecha_fin=
     """
     id_empresa = get_jwt().get("id_empresa")
     try:
-        # 1. Saldo CAJA (Debe - Haber)
-        saldo_caja = db.session.query(
-            func.coalesce(func.sum(MovimientoContable.debe - MovimientoContable.haber), 0)
-        ).filter(MovimientoContable.cuenta == 'Caja', MovimientoContable.id_empresa == id_empresa).scalar()
-
-        # 2. Saldo CUENTAS POR COBRAR (Debe - Haber)
-        saldo_cxc = db.session.query(
-            func.coalesce(func.sum(MovimientoContable.debe - MovimientoContable.haber), 0)
-        ).filter(MovimientoContable.cuenta == 'Cuentas por Cobrar', MovimientoContable.id_empresa == id_empresa).scalar()
-
-        # 3. Saldo GANANCIAS POR INTERESES (Haber - Debe) [Ganancia es Acreedora]
-        saldo_ganancias = db.session.query(
-            func.coalesce(func.sum(MovimientoContable.haber - MovimientoContable.debe), 0)
-        ).filter(MovimientoContable.cuenta == 'Ganancias por Intereses', MovimientoContable.id_empresa == id_empresa).scalar()
-
-        # 4. Datos para Gráfico (Últimos 7 días) - Flujo de CAJA
-        today = datetime.now().date()
-        start_date = today - timedelta(days=6)
-        
-        # Agrupar entradas (Debe) y salidas (Haber) de Caja por fecha
-        chart_data_query = db.session.query(
-            func.date(AsientoContable.fecha).label('fecha'),
-            func.sum(case((MovimientoContable.debe > 0, MovimientoContable.debe), else_=0)).label('ingresos'),
-            func.sum(case((MovimientoContable.haber > 0, MovimientoContable.haber), else_=0)).label('egresos')
-        ).join(AsientoContable)\
-         .filter(MovimientoContable.cuenta == 'Caja')\
-         .filter(AsientoContable.fecha >= start_date)\
-         .filter(AsientoContable.id_empresa == id_empresa)\
-         .group_by(func.date(AsientoContable.fecha))\
-         .order_by(func.date(AsientoContable.fecha)).all()
-
-        chart_data = []
-        for row in chart_data_query:
-            chart_data.append({
-                "fecha": row.fecha.strftime('%Y-%m-%d'),
-                "ingresos": float(row.ingresos or 0),
-                "egresos": float(row.egresos or 0)
-            })
+        # 1-3. Saldos desde saldos_cuenta (lookup por clave, sin recorrer movimientos)
+        saldo = saldos(id_empresa, ['Caja', 'Cuentas por Cobrar', 'Ganancias por Intereses'])
+        saldo_caja = saldo['Caja']                          # Debe - Haber
+        saldo_cxc = saldo['Cuentas por Cobrar']             # Debe - Haber
+        saldo_ganancias = -saldo['Ganancias por Intereses'] # Haber - Debe [Ganancia es Acreedora]
+
+        # 4. Datos para Gráfico (por defecto últimos 7 días) - Flujo de CAJA desde el rollup diario
+        try:
+            desde, hasta = rango_fechas(request.args, 6)
+        except ValueError as e:
+            return jsonify({"message": "Rango de fechas inválido", "error": str(e)}), 400
+        chart_data = flujo_caja(id_empresa, desde, hasta)
 
         return jsonify({
             "capital_operativo": float(saldo_caja),
@@ -68,38 +60,56 @@ def get_dashboard_data():
 @jwt_required()
 def get_asientos():
     """
-    Listar asientos contables con sus movimientos.
-    Filtros opcionales: fecha_inicio, fecha_fin, glosa
+    Listar asientos contables con sus movimientos, del más reciente al más antiguo.
+    Filtros opcionales: fecha_inicio, fecha_fin (YYYY-MM-DD), glosa (coincidencia parcial).
+    Con ?limit= o ?cursor= pagina por (fecha, id_asiento) y devuelve {items, next_cursor, limit};
+    ?total=aprox agrega "total" estimado por el planificador (sin COUNT completo).
+    Sin ellos mantiene la paginación por página (?page=&per_page=).
     """
-    fecha_inicio = request.args.get('fecha_inicio')
-    fecha_fin = request.args.get('fecha_fin')
-    glosa = request.args.get('glosa')
-    
-    # Paginación
+    args = request.args
+    id_empresa = get_jwt().get("id_empresa")
     try:
-        page = int(request.args.get('page', 1))
-        per_page = int(request.args.get('per_page', 10))
-    except ValueError:
-        page = 1
-        per_page = 10
+        pagina = parse_keyset(request)
+        condiciones = [AsientoContable.id_empresa == id_empresa]
+        if args.get('fecha_inicio'):
+            condiciones.append(AsientoContable.fecha >= date.fromisoformat(args['fecha_inicio']))
+        if args.get('fecha_fin'):
+            condiciones.append(AsientoContable.fecha < date.fromisoformat(args['fecha_fin']) + timedelta(days=1))
+        if args.get('glosa'):
+            condiciones.append(AsientoContable.glosa.ilike(f"%{args['glosa'].strip()}%"))
+    except ValueError as e:
+        return jsonify({"message": "Parámetros inválidos", "error": str(e)}), 400
 
-    id_empresa = get_jwt().get("id_empresa")
-    query = AsientoContable.query.filter_by(id_empresa=id_empresa).order_by(AsientoContable.fecha.desc())
+    query = AsientoContable.query.filter(*condiciones)\
+        .order_by(AsientoContable.fecha.desc(), AsientoContable.id_asiento.desc())
+    aproximado = args.get('total') == 'aprox'
 
-    if fecha_inicio:
-        query = query.filter(AsientoContable.fecha >= fecha_inicio)
-    if fecha_fin:
-        query = query.filter(AsientoContable.fecha <= f"{fecha_fin} 23:59:59")
-    if glosa:
-        query = query.filter(AsientoContable.glosa.ilike(f"%{glosa}%"))
+    if pagina is not None:
+        cursor, limit = pagina
+        total = contar_aproximado(query) if aproximado else None
+        if cursor:
+            try:
+                fecha, id_asiento = datetime.fromisoformat(cursor[0]), int(cursor[1])
+            except (ValueError, TypeError, IndexError):
+                return jsonify({"message": "Parámetros inválidos", "error": "Cursor inválido"}), 400
+            query = query.filter(tuple_(AsientoContable.fecha, AsientoContable.id_asiento) < (fecha, id_asiento))
+        asientos, next_cursor = keyset_page(
+            con_forma(query, "asiento").limit(limit + 1).all(), limit,
+            lambda a: (a.fecha.isoformat(), a.id_asiento)
+        )
+        respuesta = {"items": serializar(asientos), "next_cursor": next_cursor, "limit": limit}
+        if aproximado:
+            respuesta["total"] = total
+        return jsonify(respuesta), 200
 
-    # Cálculos de página
-    total = query.count()
+    # Paginación por página (compatibilidad)
+    page, per_page = parse_pagination(request, default_per_page=10)
+    total = contar_aproximado(query) if aproximado else query.order_by(None).count()
     pages = (total + per_page - 1) // per_page
-    asientos = query.limit(per_page).offset((page - 1) * per_page).all()
+    asientos = con_forma(query, "asiento").limit(per_page).offset((page - 1) * per_page).all()
 
     return jsonify({
-        "items": [a.to_dict() for a in asientos],
+        "items": serializar(asientos),
         "total": total,
         "pages": pages,
         "page": page,
@@ -127,32 +137,21 @@ def create_asiento_manual():
         monto = float(monto)
 
         id_empresa = get_jwt().get("id_empresa")
-        asiento = AsientoContable(
-            id_empresa=id_empresa,
-            glosa=glosa,
-            id_usuario=user_id,
-            fecha=datetime.now()
-        )
-        db.session.add(asiento)
-        db.session.flush()
 
         if tipo == 'INGRESO':
             # Caja: Debe (Entra plata)
             # Otra Cuenta: Haber (Contrapartida)
-            mov_caja = MovimientoContable(id_asiento=asiento.id_asiento, id_empresa=id_empresa, cuenta='Caja', debe=monto, haber=0)
-            mov_contra = MovimientoContable(id_asiento=asiento.id_asiento, id_empresa=id_empresa, cuenta=otra_cuenta, debe=0, haber=monto)
+            lineas = [('Caja', monto, 0), (otra_cuenta, 0, monto)]
         
         elif tipo == 'EGRESO':
             # Caja: Haber (Sale plata)
             # Otra Cuenta: Debe (Gasto/Activo)
-            mov_contra = MovimientoContable(id_asiento=asiento.id_asiento, id_empresa=id_empresa, cuenta=otra_cuenta, debe=monto, haber=0)
-            mov_caja = MovimientoContable(id_asiento=asiento.id_asiento, id_empresa=id_empresa, cuenta='Caja', debe=0, haber=monto)
+            lineas = [(otra_cuenta, monto, 0), ('Caja', 0, monto)]
         
         else:
             return jsonify({"message": "Tipo debe ser INGRESO o EGRESO"}), 400
 
-        db.session.add(mov_caja)
-        db.session.add(mov_contra)
+        postear_asiento(id_empresa, glosa, user_id, lineas)
         db.session.commit()
 
         return jsonify({"message": "Movimiento registrado exitosamente"}), 201
@@ -160,6 +159,133 @@ def create_asiento_manual():
     except Exception as e:
         db.session.rollback()
         return jsonify({"message": "Error registrando movimiento", "error": str(e)}), 500
+
+
+MAX_ASIENTOS_LOTE = 1000
+MAX_LINEAS_ASIENTO = 200
+CENTAVO = Decimal("0.01")
+
+
+def _importe(valor):
+    if valor in (None, ""):
+        return Decimal(0)
+    importe = Decimal(str(valor)).quantize(CENTAVO, rounding=ROUND_HALF_UP)
+    if importe < 0:
+        raise ValueError("Los importes no pueden ser negativos")
+    return importe
+
+
+def _validar_asiento_lote(item, abierto_desde):
+    """
+    Valida un asiento de /asientos/batch y devuelve (glosa, lineas, fecha) o
+    lanza ValueError. Debe y haber se acumulan en la misma pasada por las líneas.
+    """
+    if not isinstance(item, dict):
+        raise ValueError("Cada asiento debe ser un objeto")
+    glosa = item.get("glosa") or ""
+    if not isinstance(glosa, str):
+        raise ValueError("La glosa debe ser texto")
+    glosa = glosa.strip()
+    if not glosa:
+        raise ValueError("La glosa es obligatoria")
+
+    fecha = None
+    if item.get("fecha"):
+        try:
+            if not isinstance(item["fecha"], str):
+                raise ValueError()
+            fecha = datetime.fromisoformat(item["fecha"])
+        except ValueError:
+            raise ValueError("Fecha inválida (YYYY-MM-DD)")
+        if fecha.tzinfo is not None:
+            # asientos_contables.fecha es hora local sin zona (como datetime.now())
+            raise ValueError("La fecha no debe incluir zona horaria")
+        if abierto_desde is not None and fecha.date() < abierto_desde:
+            raise ValueError(f"La fecha cae en un período cerrado (abierto desde {abierto_desde.isoformat()})")
+
+    lineas_in = item.get("lineas")
+    if not isinstance(lineas_in, list) or len(lineas_in) < 2:
+        raise ValueError("El asiento debe tener al menos dos líneas")
+    if len(lineas_in) > MAX_LINEAS_ASIENTO:
+        raise ValueError(f"Máximo {MAX_LINEAS_ASIENTO} líneas por asiento")
+
+    lineas, total_debe, total_haber = [], Decimal(0), Decimal(0)
+    for n, linea in enumerate(lineas_in, start=1):
+        if not isinstance(linea, dict):
+            raise ValueError(f"Línea {n}: formato inválido")
+        cuenta = linea.get("cuenta") or ""
+        if not isinstance(cuenta, str):
+            raise ValueError(f"Línea {n}: la cuenta debe ser texto")
+        cuenta = cuenta.strip()
+        if not cuenta or len(cuenta) > 100:
+            raise ValueError(f"Línea {n}: cuenta obligatoria (máximo 100 caracteres)")
+        try:
+            debe, haber = _importe(linea.get("debe")), _importe(linea.get("haber"))
+        except InvalidOperation:
+            raise ValueError(f"Línea {n}: importe inválido")
+        except ValueError as e:
+            raise ValueError(f"Línea {n}: {e}")
+        if (debe > 0) == (haber > 0):
+            raise ValueError(f"Línea {n}: debe informar debe o haber (uno solo, mayor a 0)")
+        total_debe += debe
+        total_haber += haber
+        lineas.append((cuenta, debe, haber))
+
+    if total_debe != total_haber:
+        raise ValueError(f"El asiento no cuadra: debe {total_debe} != haber {total_haber}")
+    return glosa, lineas, fecha
+
+
+@bp.post("/asientos/batch")
+@jwt_required()
+@idempotente
+def create_asientos_batch():
+    """
+    Carga masiva de asientos manuales de varias líneas:
+    {"asientos": [{"glosa", "fecha"?, "lineas": [{"cuenta", "debe", "haber"}]}], "todo_o_nada"?}
+    Los asientos válidos se insertan en una transacción con INSERT multi-fila;
+    los inválidos se informan en "errores" (con todo_o_nada no se inserta nada).
+    """
+    data = request.get_json(silent=True) or {}
+    items = data.get("asientos")
+    if not isinstance(items, list) or not items:
+        return jsonify({"message": "Debe enviar una lista 'asientos'"}), 400
+    if len(items) > MAX_ASIENTOS_LOTE:
+        return jsonify({"message": f"Máximo {MAX_ASIENTOS_LOTE} asientos por lote"}), 400
+
+    id_empresa = get_jwt().get("id_empresa")
+    user_id = get_jwt_identity()
+
+    ultimo = ultimo_periodo_cerrado(id_empresa)
+    abierto_desde = mes_siguiente(ultimo) if ultimo is not None else None
+
+    validos, errores = [], []
+    for i, item in enumerate(items):
+        try:
+            validos.append((i, _validar_asiento_lote(item, abierto_desde)))
+        except ValueError as e:
+            errores.append({"indice": i, "error": str(e)})
+
+    if not validos or (errores and _como_bool(data.get("todo_o_nada"))):
+        return jsonify({"message": "El lote tiene asientos inválidos", "creados": [], "errores": errores}), 400
+
+    try:
+        ids = postear_asientos_lote(id_empresa, user_id, [asiento for _, asiento in validos])
+        db.session.commit()
+    except PeriodoCerrado as e:
+        db.session.rollback()
+        return jsonify({"message": e.message}), 409
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"message": "Error registrando asientos", "error": str(e)}), 500
+
+    creados = [{"indice": i, "id_asiento": id_asiento} for id_asiento, (i, _) in zip(ids, validos)]
+    return jsonify({
+        "message": f"{len(creados)} asiento(s) registrados, {len(errores)} con errores",
+        "creados": creados,
+        "errores": errores
+    }), 201
+
 @bp.post("/apertura")
 @jwt_required()
 def apertura_capital():
@@ -180,35 +306,10 @@ def apertura_capital():
         monto = float(monto)
 
         id_empresa = get_jwt().get("id_empresa")
-        asiento = AsientoContable(
-            id_empresa=id_empresa,
-            glosa="Apertura de Capital",
-            id_usuario=user_id,
-            fecha=datetime.now()
-        )
-        db.session.add(asiento)
-        db.session.flush()
-
-        # Movimiento 1: Ingreso a Caja
-        mov_caja = MovimientoContable(
-            id_asiento=asiento.id_asiento, 
-            id_empresa=id_empresa,
-            cuenta='Caja', 
-            debe=monto, 
-            haber=0
-        )
-        
-        # Movimiento 2: Capital Propio (Contrapartida)
-        mov_capital = MovimientoContable(
-            id_asiento=asiento.id_asiento, 
-            id_empresa=id_empresa,
-            cuenta='Capital Propio', 
-            debe=0, 
-            haber=monto
-        )
-
-        db.session.add(mov_caja)
-        db.session.add(mov_capital)
+        postear_asiento(id_empresa, "Apertura de Capital", user_id, [
+            ('Caja', monto, 0),            # Movimiento 1: Ingreso a Caja
+            ('Capital Propio', 0, monto),  # Movimiento 2: Capital Propio (Contrapartida)
+        ])
         db.session.commit()
 
         return jsonify({"message": "Apertura de capital registrada exitosamente."}), 201
@@ -221,26 +322,176 @@ def apertura_capital():
 @jwt_required()
 def get_cuentas():
     """
-    Retorna la lista de nombres únicos de cuentas usadas por la empresa.
+    Retorna los nombres del plan de cuentas de la empresa.
     Base para el sistema 'antibobo' en el frontend.
+    ?detalle=1 devuelve [{id_cuenta, nombre, tipo}].
     """
     id_empresa = get_jwt().get("id_empresa")
     try:
-        cuentas_query = db.session.query(
-            MovimientoContable.cuenta
-        ).filter(MovimientoContable.id_empresa == id_empresa)\
-         .distinct().order_by(MovimientoContable.cuenta).all()
-        
-        nombres = [c[0] for c in cuentas_query if c[0]]
-        
+        cuentas = CuentaContable.query.filter_by(id_empresa=id_empresa)\
+            .order_by(CuentaContable.nombre).all()
+        if request.args.get('detalle') in ('1', 'true'):
+            return jsonify([c.to_dict() for c in cuentas]), 200
+
+        nombres = [c.nombre for c in cuentas]
+
         # Si no hay cuentas aún, enviamos las básicas por defecto
         if not nombres:
             nombres = ["Caja", "Cuentas por Cobrar", "Ganancias por Intereses", "Intereses por Cobrar", "Capital Propio"]
-            
+
         return jsonify(nombres), 200
     except Exception as e:
         return jsonify({"message": "Error cargando catálogo", "error": str(e)}), 500
 
+@bp.put("/cuentas/<int:id_cuenta>")
+@permission_required("cuenta.gestionar")
+def update_cuenta(id_cuenta):
+    """Corrige el tipo de una cuenta (ACTIVO, PASIVO, PATRIMONIO, INGRESO, GASTO)."""
+    id_empresa = get_jwt().get("id_empresa")
+    cuenta = CuentaContable.query.filter_by(id_cuenta=id_cuenta, id_empresa=id_empresa).first()
+    if not cuenta:
+        return jsonify({"message": "Cuenta no encontrada o acceso denegado"}), 404
+
+    tipo = ((request.get_json(silent=True) or {}).get('tipo') or '').upper()
+    if tipo not in TIPOS_CUENTA:
+        return jsonify({"message": f"tipo debe ser uno de: {', '.join(TIPOS_CUENTA)}"}), 400
+
+    cuenta.tipo = tipo
+    db.session.commit()
+    return jsonify(cuenta.to_dict()), 200
+
+COLUMNAS_MAYOR_CSV = ["id_cuenta", "cuenta", "fecha", "id_asiento", "glosa", "debe", "haber", "saldo"]
+
+
+def _csv_mayor(filas):
+    """CSV del libro mayor en bloques de ~64KB; apertura y totales van como filas rotuladas."""
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=COLUMNAS_MAYOR_CSV, extrasaction="ignore")
+    writer.writeheader()
+    for fila in filas:
+        if fila["tipo"] == "apertura":
+            fila = dict(fila, glosa="SALDO INICIAL")
+        elif fila["tipo"] == "totales":
+            fila = dict(fila, glosa="TOTALES DEL PERÍODO")
+        writer.writerow(fila)
+        if buffer.tell() > 64 * 1024:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def _jsonl_mayor(filas):
+    bloque = []
+    for fila in filas:
+        bloque.append(json.dumps(fila, ensure_ascii=False))
+        if len(bloque) >= 500:
+            yield "\n".join(bloque) + "\n"
+            bloque = []
+    if bloque:
+        yield "\n".join(bloque) + "\n"
+
+
+@bp.get("/mayor")
+@jwt_required()
+def get_libro_mayor():
+    """
+    Libro mayor con saldo inicial, saldo corrido y totales del período, en streaming.
+    Parámetros: fecha_desde, fecha_hasta (YYYY-MM-DD, inclusivas), id_cuenta
+    (repetible o separado por comas; por defecto todas) y formato=jsonl|csv.
+    """
+    id_empresa = get_jwt().get("id_empresa")
+    args = request.args
+    try:
+        desde = date.fromisoformat(args['fecha_desde']) if args.get('fecha_desde') else None
+        hasta = date.fromisoformat(args['fecha_hasta']) if args.get('fecha_hasta') else None
+        ids_cuenta = [int(i) for valor in args.getlist('id_cuenta') for i in valor.split(',') if i.strip()]
+    except ValueError as e:
+        return jsonify({"message": "Parámetros inválidos", "error": str(e)}), 400
+    formato = args.get('formato', 'jsonl')
+    if formato not in ('jsonl', 'csv'):
+        return jsonify({"message": "formato debe ser jsonl o csv"}), 400
+
+    filas = libro_mayor(id_empresa, desde, hasta, ids_cuenta or None)
+    if formato == 'csv':
+        nombre = f"libro_mayor_{(hasta or date.today()).isoformat()}.csv"
+        return Response(
+            stream_with_context(_csv_mayor(filas)),
+            mimetype="text/csv",
+            headers={"Content-Disposition": f"attachment; filename={nombre}"}
+        )
+    return Response(stream_with_context(_jsonl_mayor(filas)), mimetype="application/x-ndjson")
+
+def _fecha_param(nombre):
+    valor = request.args.get(nombre)
+    return date.fromisoformat(valor) if valor else date.today()
+
+
+@bp.get("/cierres")
+@jwt_required()
+def get_cierres():
+    """Períodos cerrados de la empresa, del más reciente al más antiguo."""
+    id_empresa = get_jwt().get("id_empresa")
+    cierres = CierrePeriodo.query.filter_by(id_empresa=id_empresa)\
+        .order_by(CierrePeriodo.periodo.desc()).all()
+    return jsonify([c.to_dict() for c in cierres]), 200
+
+@bp.post("/cierres")
+@permission_required("cierre.gestionar")
+def cerrar_periodo():
+    """
+    Cierra un mes: {"periodo": "YYYY-MM"}. Guarda la foto de saldos por cuenta
+    y bloquea asientos con fecha en ese mes o anteriores.
+    """
+    id_empresa = get_jwt().get("id_empresa")
+    try:
+        periodo = parse_periodo((request.get_json(silent=True) or {}).get("periodo"))
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
+
+    try:
+        cierre = cierres_service.cerrar_periodo(id_empresa, periodo, get_jwt_identity())
+        db.session.commit()
+    except cierres_service.CierreError as e:
+        db.session.rollback()
+        return jsonify({"message": e.message}), e.status
+    return jsonify({"message": "Período cerrado", "cierre": cierre.to_dict()}), 201
+
+@bp.delete("/cierres/<periodo>")
+@permission_required("cierre.gestionar")
+def reabrir_periodo(periodo):
+    """Reabre el último período cerrado (YYYY-MM)."""
+    id_empresa = get_jwt().get("id_empresa")
+    try:
+        cierres_service.reabrir_periodo(id_empresa, parse_periodo(periodo))
+        db.session.commit()
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
+    except cierres_service.CierreError as e:
+        db.session.rollback()
+        return jsonify({"message": e.message}), e.status
+    return jsonify({"message": "Período reabierto"}), 200
+
+@bp.get("/balance-comprobacion")
+@jwt_required()
+def get_balance_comprobacion():
+    """Balance de comprobación a ?fecha=YYYY-MM-DD (por defecto hoy)."""
+    try:
+        fecha = _fecha_param("fecha")
+    except ValueError as e:
+        return jsonify({"message": "Fecha inválida", "error": str(e)}), 400
+    return jsonify(cierres_service.balance_comprobacion(get_jwt().get("id_empresa"), fecha)), 200
+
+@bp.get("/balance-general")
+@jwt_required()
+def get_balance_general():
+    """Balance general a ?fecha=YYYY-MM-DD (por defecto hoy)."""
+    try:
+        fecha = _fecha_param("fecha")
+    except ValueError as e:
+        return jsonify({"message": "Fecha inválida", "error": str(e)}), 400
+    return jsonify(cierres_service.balance_general(get_jwt().get("id_empresa"), fecha)), 200
+
 @bp.get("/glosas")
 @jwt_required()
 def get_glosas():
@@ -2,124 +2,23 @@ from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity, get_jwt
 from app.extensions import db
 from datetime import date, timedelta, datetime
+from itertools import product
+import math
+from sqlalchemy import insert
 from dateutil.relativedelta import relativedelta
 from app.models.catalog import Credito, DetalleCredito, TasaInteres, Cliente, Usuario, AsientoContable, MovimientoContable, ReglaCredito
+from app.services.contabilidad_service import postear_asiento, postear_asientos_lote, PeriodoCerrado
+from app.services.amortizacion import generar_plan, resumen_plan, a_decimal
+from app.utils.permissions import permission_required
+from app.utils.pagination import parse_keyset, keyset_page
+from app.utils.serialization import con_forma, serializar
+from app.utils.idempotency import idempotente
 
 bp = Blueprint("creditos", __name__)
 
-def permission_required(permission_name):
-    from functools import wraps
-    def wrapper(fn):
-        @wraps(fn)
-        @jwt_required()
-        def decorated(*args, **kwargs):
-            user_id = get_jwt_identity()
-            user = Usuario.query.get(user_id)
-            if not user:
-                return jsonify({"message": "Usuario no encontrado"}), 404
-            
-            is_admin = any(r.rol.nombre.upper() == 'ADMIN' for r in user.roles)
-            if is_admin:
-                 return fn(*args, **kwargs)
-
-            has_perm = False
-            for ur in user.roles:
-                for rp in ur.rol.permisos_asociados:
-                    if rp.permiso.nombre == permission_name:
-                        has_perm = True
-                        break
-                if has_perm: break
-            
-            if not has_perm:
-                return jsonify({"message": f"Permiso denegado. Se requiere '{permission_name}'"}), 403
-            return fn(*args, **kwargs)
-        return decorated
-    return wrapper
-
 def calculate_plan(monto, cuotas, tasa_porcentaje, dias_intervalo=7, fecha_primer_pago=None, usar_redondeo=False, monto_redondeado=0):
-    # Modelo de Negocio "José":
-    # 1. Interés Total = Monto * (Tasa / 100)
-    # 2. Deuda Final = Monto + Interés Total
-    
-    monto = float(monto)
-    cuotas = int(cuotas)
-    tasa_val = float(tasa_porcentaje)
-    
-    interes_total = monto * (tasa_val / 100.0)
-    deuda_total = monto + interes_total
-    
-    # Desglose por cuota estándar o redondeada
-    interes_por_cuota_fijo = interes_total / cuotas
-    
-    plan = []
-    
-    # Manejo de Fechas
-    if fecha_primer_pago and str(fecha_primer_pago).strip():
-        if isinstance(fecha_primer_pago, str):
-            try:
-                fecha_inicio = date.fromisoformat(fecha_primer_pago)
-            except (ValueError, TypeError):
-                fecha_inicio = date.today() + timedelta(days=int(dias_intervalo or 7))
-        else:
-            fecha_inicio = fecha_primer_pago
-    else:
-        fecha_inicio = date.today() + timedelta(days=int(dias_intervalo or 7))
-    
-    acumulado_total = 0
-    
-    if usar_redondeo and monto_redondeado > 0:
-        # Lógica de Redondeo: Cuotas 2 a N son fijas. Cuota 1 absorbe el residuo.
-        cuota_fija = float(monto_redondeado)
-        total_cuotas_2_a_n = cuota_fija * (cuotas - 1)
-        cuota_1 = deuda_total - total_cuotas_2_a_n
-        
-        for i in range(cuotas):
-            vencimiento = fecha_inicio + timedelta(days=dias_intervalo * i)
-            
-            if i == 0:
-                val_c = cuota_1
-            else:
-                val_c = cuota_fija
-            
-            # El interés se mantiene proporcional
-            int_c = interes_por_cuota_fijo
-            cap_c = val_c - int_c
-            
-            plan.append({
-                "numero_cuota": i + 1,
-                "monto_cuota": round(val_c, 2),
-                "capital_cuota": round(cap_c, 2),
-                "interes_cuota": round(int_c, 2),
-                "cuota_total": round(val_c, 2),
-                "fecha_vencimiento": vencimiento.isoformat()
-            })
-        valor_cuota_ref = cuota_fija
-    else:
-        # Cálculo estándar
-        capital_por_cuota = monto / cuotas
-        cuota_val = deuda_total / cuotas
-        
-        for i in range(cuotas):
-            vencimiento = fecha_inicio + timedelta(days=dias_intervalo * i)
-            plan.append({
-                "numero_cuota": i + 1,
-                "monto_cuota": round(cuota_val, 2),
-                "capital_cuota": round(capital_por_cuota, 2),
-                "interes_cuota": round(interes_por_cuota_fijo, 2),
-                "cuota_total": round(cuota_val, 2),
-                "fecha_vencimiento": vencimiento.isoformat()
-            })
-        valor_cuota_ref = cuota_val
-        
-    return {
-        "monto_solicitado": round(monto, 2),
-        "tasa_usada": tasa_val,
-        "interes_total": round(interes_total, 2),
-        "monto_total": round(deuda_total, 2),
-        "cuotas": cuotas,
-        "valor_cuota": round(valor_cuota_ref, 2),
-        "plan": plan
-    }
+    # Modelo de Negocio "José" calculado en centavos: ver app/services/amortizacion.py
+    return generar_plan(monto, cuotas, tasa_porcentaje, dias_intervalo, fecha_primer_pago, usar_redondeo, monto_redondeado).to_dict()
 
 @bp.post("/preview")
 @jwt_required()
@@ -147,14 +46,139 @@ def preview_credito():
         if monto <= 0 or cuotas <= 0:
             return jsonify({"message": "Monto y cuotas deben ser mayores a 0"}), 400
             
-        result = calculate_plan(monto, cuotas, regla.porcentaje, regla.dias_intervalo, fecha_primer_pago, usar_redondeo, monto_redondeado)
+        try:
+            result = calculate_plan(monto, cuotas, regla.porcentaje, regla.dias_intervalo, fecha_primer_pago, usar_redondeo, monto_redondeado)
+        except ValueError as e:
+            return jsonify({"message": str(e)}), 400
         return jsonify(result), 200
     except Exception as e:
         # En caso de error inesperado, retornamos 500 con el mensaje
         return jsonify({"message": "Error interno en cálculo", "error": str(e)}), 500
 
+def _como_bool(valor):
+    """Booleano de un campo JSON que puede venir como texto ("false", "0", "no")."""
+    if isinstance(valor, str):
+        return valor.strip().lower() in ("1", "true", "t", "si", "sí", "yes", "y")
+    return bool(valor)
+
+
+MAX_ESCENARIOS = 500
+MAX_CUOTAS = 1000
+
+
+def _escenarios_batch(data):
+    """
+    Escenarios de /preview/batch: lista explícita en "escenarios" o una grilla
+    {"montos", "cuotas", "reglas", "redondeo"} que se expande como producto cartesiano.
+    Lanza ValueError si el formato es inválido o supera MAX_ESCENARIOS (el
+    tamaño de la grilla se valida antes de expandirla).
+    """
+    if "escenarios" in data:
+        escenarios = data.get("escenarios") or []
+        if not isinstance(escenarios, list):
+            raise ValueError("'escenarios' debe ser una lista")
+    else:
+        grilla = data.get("grilla") or {}
+        if not isinstance(grilla, dict):
+            raise ValueError("'grilla' debe ser un objeto")
+        ejes = [grilla.get(campo) or [] for campo in ("reglas", "montos", "cuotas")]
+        ejes.append(grilla.get("redondeo") or [None])
+        if not all(isinstance(eje, list) for eje in ejes):
+            raise ValueError("Los campos de la grilla deben ser listas")
+        if len(ejes[0]) * len(ejes[1]) * len(ejes[2]) * len(ejes[3]) > MAX_ESCENARIOS:
+            raise ValueError(f"Máximo {MAX_ESCENARIOS} escenarios por solicitud")
+        escenarios = [
+            {
+                "monto": monto, "cuotas": cuotas, "id_regla": id_regla,
+                "usar_redondeo": bool(redondeo), "monto_cuota_redondeado": redondeo or 0,
+                "fecha_primer_pago": grilla.get("fecha_primer_pago")
+            }
+            for id_regla, monto, cuotas, redondeo in product(*ejes)
+        ]
+    if len(escenarios) > MAX_ESCENARIOS:
+        raise ValueError(f"Máximo {MAX_ESCENARIOS} escenarios por solicitud")
+    return escenarios
+
+
+@bp.post("/preview/batch")
+@jwt_required()
+def preview_credito_batch():
+    """
+    Simula varios escenarios en una sola llamada. Las reglas se cargan con una
+    única consulta y los escenarios repetidos se calculan una sola vez.
+    Con "solo_totales": true devuelve solo los totales de cada plan (sin cuotas).
+    Los errores son por escenario y no cortan el resto.
+    """
+    data = request.get_json() or {}
+    if not isinstance(data, dict):
+        return jsonify({"message": "El cuerpo debe ser un objeto JSON"}), 400
+    try:
+        escenarios = _escenarios_batch(data)
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
+    if not escenarios:
+        return jsonify({"message": "Debe enviar 'escenarios' o una 'grilla'"}), 400
+    solo_totales = bool(data.get("solo_totales"))
+
+    id_empresa = get_jwt().get("id_empresa")
+    ids_regla = set()
+    for esc in escenarios:
+        try:
+            ids_regla.add(int(esc.get("id_regla")))
+        except (ValueError, TypeError, AttributeError):
+            pass
+    reglas = {
+        r.id_regla: r for r in ReglaCredito.query.filter(
+            ReglaCredito.id_empresa == id_empresa, ReglaCredito.id_regla.in_(ids_regla)
+        ).all()
+    } if ids_regla else {}
+
+    resultados, calculados = [], {}
+    for i, esc in enumerate(escenarios):
+        try:
+            id_regla = int(esc.get("id_regla"))
+            monto = float(esc.get("monto") or 0)
+            cuotas = int(esc.get("cuotas") or 0)
+            usar_redondeo = _como_bool(esc.get("usar_redondeo", False))
+            monto_redondeado = float(esc.get("monto_cuota_redondeado") or 0)
+            fecha_primer_pago = esc.get("fecha_primer_pago")
+        except (ValueError, TypeError, AttributeError):
+            resultados.append({"escenario": i, "error": "Datos numéricos inválidos"})
+            continue
+        if not (math.isfinite(monto) and math.isfinite(monto_redondeado)):
+            resultados.append({"escenario": i, "error": "Datos numéricos inválidos"})
+            continue
+        if cuotas > MAX_CUOTAS:
+            resultados.append({"escenario": i, "error": f"Máximo {MAX_CUOTAS} cuotas por plan"})
+            continue
+        if fecha_primer_pago is not None:
+            fecha_primer_pago = str(fecha_primer_pago)  # parte de la clave: debe ser hasheable
+
+        regla = reglas.get(id_regla)
+        if not regla:
+            resultados.append({"escenario": i, "error": "Regla no encontrada o acceso denegado"})
+            continue
+
+        clave = (id_regla, monto, cuotas, usar_redondeo, monto_redondeado, fecha_primer_pago)
+        try:
+            if clave not in calculados:
+                if solo_totales:
+                    calculados[clave] = resumen_plan(monto, cuotas, regla.porcentaje, usar_redondeo, monto_redondeado)
+                else:
+                    calculados[clave] = generar_plan(
+                        monto, cuotas, regla.porcentaje, regla.dias_intervalo,
+                        fecha_primer_pago, usar_redondeo, monto_redondeado
+                    ).to_dict()
+        except ValueError as e:
+            resultados.append({"escenario": i, "error": str(e)})
+            continue
+        resultados.append({"escenario": i, "id_regla": id_regla, **calculados[clave]})
+
+    return jsonify({"resultados": resultados, "total": len(resultados)}), 200
+
 @bp.post("/")
 @permission_required("credito.gestionar") # Assuming permission 'credito.gestionar' from user request
+@idempotente
 def create_credito():
     import traceback
     try:
@@ -190,7 +214,12 @@ def create_credito():
         user_id = get_jwt_identity()
         
         # Calculate
-        calc = calculate_plan(monto, cuotas, regla.porcentaje, regla.dias_intervalo, fecha_primer_pago, usar_redondeo, monto_redondeado)
+        try:
+            plan = generar_plan(monto, cuotas, regla.porcentaje, regla.dias_intervalo, fecha_primer_pago, usar_redondeo, monto_redondeado)
+        except ValueError as e:
+            return jsonify({"message": str(e)}), 400
+        monto_total = a_decimal(plan.total)
+        interes_total = a_decimal(plan.interes)
         
         # Create Entities
         nuevo_credito = Credito(
@@ -198,8 +227,8 @@ def create_credito():
             id_cliente=id_cliente,
             id_usuario=user_id,
             id_regla=id_regla,
-            monto_solicitado=monto,
-            monto_total_a_pagar=calc["monto_total"],
+            monto_solicitado=a_decimal(plan.monto),
+            monto_total_a_pagar=monto_total,
             cantidad_cuotas=cuotas,
             fecha_desembolso=date.today(),
             estado='PENDIENTE'
@@ -209,17 +238,17 @@ def create_credito():
         db.session.flush() # Get ID
         
         # Create Details
-        for p in calc["plan"]:
+        for numero, monto_c, capital_c, interes_c, vencimiento in plan.filas():
             det = DetalleCredito(
                 id_credito=nuevo_credito.id_credito,
-                numero_cuota=p["numero_cuota"],
-                monto_cuota=p["monto_cuota"],
-                fecha_vencimiento=date.fromisoformat(p["fecha_vencimiento"]),
+                numero_cuota=numero,
+                monto_cuota=a_decimal(monto_c),
+                fecha_vencimiento=vencimiento,
                 monto_pagado=0,
                 estado_cuota='PENDIENTE',
-                capital_cuota=p["capital_cuota"],
-                interes_cuota=p["interes_cuota"],
-                cuota_total=p["cuota_total"]
+                capital_cuota=a_decimal(capital_c),
+                interes_cuota=a_decimal(interes_c),
+                cuota_total=a_decimal(monto_c)
             )
             db.session.add(det)
             
@@ -227,48 +256,22 @@ def create_credito():
         # Asiento Contable de Apertura
         # ---------------------------------------------------------
         try:
-            # 1. Crear Asiento
-            asiento = AsientoContable(
-                id_empresa=id_empresa,
-                glosa=f"Desembolso Crédito #{nuevo_credito.id_credito} - {cliente.nombre} {cliente.apellido}",
-                id_usuario=user_id,
-                fecha=datetime.now()
-            )
-            db.session.add(asiento)
-            db.session.flush()
+            lineas = [
+                # A) DEBE: Cuentas por Cobrar (Total Deuda = Capital + Interés)
+                ('Cuentas por Cobrar', monto_total, 0),
+                # B) HABER: Caja (Dinero entregado = Capital)
+                ('Caja', 0, a_decimal(plan.monto)),
+            ]
+            # C) HABER: Intereses por Cobrar (Ganancia Futura)
+            if plan.interes > 0:
+                lineas.append(('Intereses por Cobrar', 0, interes_total))
 
-            # 2. Movimientos
-            
-            # A) DEBE: Cuentas por Cobrar (Total Deuda = Capital + Interés)
-            mov_cxc = MovimientoContable(
-                id_asiento=asiento.id_asiento,
-                id_empresa=id_empresa,
-                cuenta='Cuentas por Cobrar',
-                debe=calc["monto_total"],
-                haber=0
-            )
-            db.session.add(mov_cxc)
-            
-            # B) HABER: Caja (Dinero entregado = Capital)
-            mov_caja = MovimientoContable(
-                id_asiento=asiento.id_asiento,
-                id_empresa=id_empresa,
-                cuenta='Caja',
-                debe=0,
-                haber=monto
+            postear_asiento(
+                id_empresa,
+                f"Desembolso Crédito #{nuevo_credito.id_credito} - {cliente.nombre} {cliente.apellido}",
+                user_id,
+                lineas
             )
-            db.session.add(mov_caja)
-            
-            # C) HABER: Intereses por Cobrar (Ganancia Futura)
-            if calc["interes_total"] > 0:
-                mov_int = MovimientoContable(
-                    id_asiento=asiento.id_asiento,
-                    id_empresa=id_empresa,
-                    cuenta='Intereses por Cobrar',
-                    debe=0,
-                    haber=calc["interes_total"]
-                )
-                db.session.add(mov_int)
                 
         except Exception as e_cont:
             print(f"Error al generar asiento contable: {e_cont}")
@@ -283,6 +286,163 @@ def create_credito():
             f.write("-------------------------------------\n")
         return jsonify({"message": "Error creando crédito", "error": str(e)}), 500
 
+MAX_CREDITOS_LOTE = 1000
+
+
+def _validar_item_lote(item, clientes, reglas):
+    """Valida un ítem de /batch y devuelve (datos, plan) o lanza ValueError con el motivo."""
+    try:
+        id_cliente = int(item.get("id_cliente"))
+        id_regla = int(item.get("id_regla"))
+        monto = float(item.get("monto") or 0)
+        cuotas = int(item.get("cuotas") or 0)
+        monto_redondeado = float(item.get("monto_cuota_redondeado") or 0)
+        usar_redondeo = _como_bool(item.get("usar_redondeo", False))
+        fecha_desembolso = date.fromisoformat(item["fecha_desembolso"]) if item.get("fecha_desembolso") else None
+    except (ValueError, TypeError, AttributeError):
+        raise ValueError("Datos inválidos")
+    if not (math.isfinite(monto) and math.isfinite(monto_redondeado)):
+        raise ValueError("Datos inválidos")
+    if not 1 <= cuotas <= MAX_CUOTAS:
+        raise ValueError(f"Las cuotas deben estar entre 1 y {MAX_CUOTAS}")
+
+    if id_cliente not in clientes:
+        raise ValueError("Cliente no encontrado o acceso denegado")
+    regla = reglas.get(id_regla)
+    if not regla:
+        raise ValueError("Regla no encontrada o acceso denegado")
+
+    plan = generar_plan(
+        monto, cuotas, regla.porcentaje, regla.dias_intervalo, item.get("fecha_primer_pago"),
+        usar_redondeo, monto_redondeado
+    )
+    datos = {
+        "id_cliente": id_cliente, "id_regla": id_regla,
+        "fecha_desembolso": fecha_desembolso or date.today(),
+        # El asiento de apertura va con la fecha de desembolso indicada (o ahora)
+        "fecha_asiento": datetime.combine(fecha_desembolso, datetime.min.time()) if fecha_desembolso else None
+    }
+    return datos, plan
+
+
+@bp.post("/batch")
+@permission_required("credito.gestionar")
+def create_creditos_batch():
+    """
+    Alta masiva de créditos (migración de carteras) en una sola transacción.
+    Créditos, cuotas, asientos y movimientos se insertan con INSERT multi-fila
+    (RETURNING para los ids). Los ítems inválidos se informan en "errores" y
+    no impiden el alta del resto.
+    """
+    data = request.get_json() or {}
+    items = data.get("creditos")
+    if not isinstance(items, list) or not items:
+        return jsonify({"message": "Debe enviar una lista 'creditos'"}), 400
+    if len(items) > MAX_CREDITOS_LOTE:
+        return jsonify({"message": f"Máximo {MAX_CREDITOS_LOTE} créditos por lote"}), 400
+
+    id_empresa = get_jwt().get("id_empresa")
+    user_id = get_jwt_identity()
+
+    def _ids(campo):
+        ids = set()
+        for item in items:
+            try:
+                ids.add(int(item.get(campo)))
+            except (ValueError, TypeError, AttributeError):
+                pass
+        return ids
+
+    # Una consulta por catálogo para todo el lote
+    clientes = {
+        c.id_cliente: c for c in Cliente.query.filter(
+            Cliente.id_empresa == id_empresa, Cliente.id_cliente.in_(_ids("id_cliente"))
+        ).all()
+    }
+    reglas = {
+        r.id_regla: r for r in ReglaCredito.query.filter(
+            ReglaCredito.id_empresa == id_empresa, ReglaCredito.id_regla.in_(_ids("id_regla"))
+        ).all()
+    }
+
+    validos, errores = [], []
+    for i, item in enumerate(items):
+        try:
+            datos, plan = _validar_item_lote(item, clientes, reglas)
+        except ValueError as e:
+            errores.append({"indice": i, "error": str(e)})
+            continue
+        validos.append((i, datos, plan))
+
+    if not validos:
+        return jsonify({"message": "Ningún crédito válido en el lote", "creados": [], "errores": errores}), 400
+
+    try:
+        ids_credito = db.session.scalars(
+            insert(Credito).returning(Credito.id_credito, sort_by_parameter_order=True),
+            [
+                {
+                    "id_empresa": id_empresa,
+                    "id_cliente": datos["id_cliente"],
+                    "id_usuario": user_id,
+                    "id_regla": datos["id_regla"],
+                    "monto_solicitado": a_decimal(plan.monto),
+                    "monto_total_a_pagar": a_decimal(plan.total),
+                    "cantidad_cuotas": plan.cuotas,
+                    "fecha_desembolso": datos["fecha_desembolso"],
+                    "estado": 'PENDIENTE'
+                }
+                for _, datos, plan in validos
+            ]
+        ).all()
+
+        db.session.execute(insert(DetalleCredito), [
+            {
+                "id_credito": id_credito,
+                "numero_cuota": numero,
+                "monto_cuota": a_decimal(monto_c),
+                "fecha_vencimiento": vencimiento,
+                "monto_pagado": 0,
+                "estado_cuota": 'PENDIENTE',
+                "capital_cuota": a_decimal(capital_c),
+                "interes_cuota": a_decimal(interes_c),
+                "cuota_total": a_decimal(monto_c)
+            }
+            for id_credito, (_, _, plan) in zip(ids_credito, validos)
+            for numero, monto_c, capital_c, interes_c, vencimiento in plan.filas()
+        ])
+
+        # Asientos de apertura (mismo esquema que create_credito)
+        asientos = []
+        for id_credito, (_, datos, plan) in zip(ids_credito, validos):
+            cliente = clientes[datos["id_cliente"]]
+            lineas = [
+                ('Cuentas por Cobrar', a_decimal(plan.total), 0),
+                ('Caja', 0, a_decimal(plan.monto)),
+            ]
+            if plan.interes > 0:
+                lineas.append(('Intereses por Cobrar', 0, a_decimal(plan.interes)))
+            asientos.append((
+                f"Desembolso Crédito #{id_credito} - {cliente.nombre} {cliente.apellido}",
+                lineas, datos["fecha_asiento"]
+            ))
+        postear_asientos_lote(id_empresa, user_id, asientos)
+
+        db.session.commit()
+    except PeriodoCerrado as e:
+        db.session.rollback()
+        return jsonify({"message": e.message}), 409
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"message": "Error creando créditos", "error": str(e)}), 500
+
+    creados = [{"indice": i, "id_credito": id_credito} for id_credito, (i, _, _) in zip(ids_credito, validos)]
+    return jsonify({
+        "message": f"{len(creados)} crédito(s) creados, {len(errores)} con errores",
+        "creados": creados,
+        "errores": errores
+    }), 201
+
 @bp.post("/<int:id_credito>/anular")
 @permission_required("credito.gestionar")
 def anular_credito(id_credito):
@@ -324,45 +484,17 @@ def anular_credito(id_credito):
         original_total = float(credito.monto_total_a_pagar)
         original_interes = original_total - original_monto
 
-        asiento = AsientoContable(
-            id_empresa=id_empresa,
-            glosa=f"ANULACIÓN Crédito #{credito.id_credito}",
-            id_usuario=user_id,
-            fecha=datetime.now()
-        )
-        db.session.add(asiento)
-        db.session.flush()
-
-        # A) DEBE: Caja (Devolución del Capital)
-        mov_caja = MovimientoContable(
-            id_asiento=asiento.id_asiento,
-            id_empresa=id_empresa,
-            cuenta='Caja',
-            debe=original_monto,
-            haber=0
-        )
-        db.session.add(mov_caja)
-
+        lineas = [
+            # A) DEBE: Caja (Devolución del Capital)
+            ('Caja', original_monto, 0),
+        ]
         # B) DEBE: Intereses por Cobrar (Cancelación)
         if original_interes > 0:
-            mov_int = MovimientoContable(
-                id_asiento=asiento.id_asiento,
-                id_empresa=id_empresa,
-                cuenta='Intereses por Cobrar',
-                debe=original_interes,
-                haber=0
-            )
-            db.session.add(mov_int)
-
+            lineas.append(('Intereses por Cobrar', original_interes, 0))
         # C) HABER: Cuentas por Cobrar (Cancelación de Deuda)
-        mov_cxc = MovimientoContable(
-            id_asiento=asiento.id_asiento,
-            id_empresa=id_empresa,
-            cuenta='Cuentas por Cobrar',
-            debe=0,
-            haber=original_total
-        )
-        db.session.add(mov_cxc)
+        lineas.append(('Cuentas por Cobrar', 0, original_total))
+
+        postear_asiento(id_empresa, f"ANULACIÓN Crédito #{credito.id_credito}", user_id, lineas)
 
         db.session.commit()
         return jsonify({"message": "Crédito anulado exitosamente"}), 200
@@ -371,45 +503,81 @@ def anular_credito(id_credito):
         db.session.rollback()
         return jsonify({"message": "Error anulando crédito", "error": str(e)}), 500
 
+ESTADOS_CREDITO = ('PENDIENTE', 'PAGADO', 'VENCIDO', 'ANULADO')
+
+
+def _listar_creditos(*filtros):
+    """
+    Listado de créditos de la empresa con filtros opcionales por query params:
+      estado, id_cliente, fecha_desde / fecha_hasta (fecha_desembolso, YYYY-MM-DD),
+      view=summary (sin cuotas ni pagos).
+    Con ?limit= o ?cursor= pagina por id_credito descendente y devuelve
+    {items, next_cursor, limit}; sin ellos devuelve la lista completa (compatibilidad).
+    """
+    id_empresa = get_jwt().get("id_empresa")
+    args = request.args
+    try:
+        pagina = parse_keyset(request)
+        condiciones = [Credito.id_empresa == id_empresa, *filtros]
+        if args.get("estado"):
+            estado = args["estado"].upper()
+            if estado not in ESTADOS_CREDITO:
+                raise ValueError(f"estado debe ser uno de {', '.join(ESTADOS_CREDITO)}")
+            condiciones.append(Credito.estado == estado)
+        if args.get("id_cliente"):
+            condiciones.append(Credito.id_cliente == int(args["id_cliente"]))
+        if args.get("fecha_desde"):
+            condiciones.append(Credito.fecha_desembolso >= date.fromisoformat(args["fecha_desde"]))
+        if args.get("fecha_hasta"):
+            condiciones.append(Credito.fecha_desembolso <= date.fromisoformat(args["fecha_hasta"]))
+        if pagina and pagina[0]:
+            condiciones.append(Credito.id_credito < int(pagina[0][0]))
+    except (ValueError, TypeError) as e:
+        return jsonify({"message": "Parámetros inválidos", "error": str(e)}), 400
+
+    resumen = args.get("view") == "summary"
+    query = con_forma(
+        Credito.query.filter(*condiciones).order_by(Credito.id_credito.desc()),
+        "credito.resumen" if resumen else "credito.detalle"
+    )
+    metodo = "to_dict_summary" if resumen else "to_dict"
+
+    if pagina is None:
+        return jsonify(serializar(query.all(), metodo)), 200
+
+    limit = pagina[1]
+    creditos, next_cursor = keyset_page(query.limit(limit + 1).all(), limit, lambda c: (c.id_credito,))
+    return jsonify({
+        "items": serializar(creditos, metodo),
+        "next_cursor": next_cursor,
+        "limit": limit
+    }), 200
+
 @bp.get("/")
 @permission_required("credito.gestionar")
 def get_creditos():
-    id_empresa = get_jwt().get("id_empresa")
     # Filtramos para no mostrar créditos ANULADOS en la operativa diaria
-    creditos = Credito.query.filter(
-        Credito.id_empresa == id_empresa,
-        Credito.estado != 'ANULADO'
-    ).order_by(Credito.id_credito.desc()).all()
-    return jsonify([c.to_dict() for c in creditos]), 200
+    return _listar_creditos(Credito.estado != 'ANULADO')
 
 @bp.get("/cliente/<int:id_cliente>")
 @permission_required("credito.gestionar")
 def get_creditos_by_cliente(id_cliente):
-    id_empresa = get_jwt().get("id_empresa")
     # Filtramos para no mostrar créditos ANULADOS en la operativa diaria del cliente
-    creditos = Credito.query.filter(
-        Credito.id_cliente == id_cliente,
-        Credito.id_empresa == id_empresa,
-        Credito.estado != 'ANULADO'
-    ).order_by(Credito.id_credito.desc()).all()
-    return jsonify([c.to_dict() for c in creditos]), 200
+    return _listar_creditos(Credito.id_cliente == id_cliente, Credito.estado != 'ANULADO')
 
 @bp.get("/anulados")
 @permission_required("credito.gestionar")
 def get_creditos_anulados():
-    id_empresa = get_jwt().get("id_empresa")
     # Filtramos exclusivamente créditos ANULADOS para auditoría
-    creditos = Credito.query.filter(
-        Credito.id_empresa == id_empresa,
-        Credito.estado == 'ANULADO'
-    ).order_by(Credito.id_credito.desc()).all()
-    return jsonify([c.to_dict() for c in creditos]), 200
+    return _listar_creditos(Credito.estado == 'ANULADO')
 
 @bp.get("/<int:id_credito>")
 @permission_required("credito.gestionar")
 def get_credito_by_id(id_credito):
     id_empresa = get_jwt().get("id_empresa")
-    credito = Credito.query.filter_by(id_credito=id_credito, id_empresa=id_empresa).first()
+    credito = con_forma(
+        Credito.query.filter_by(id_credito=id_credito, id_empresa=id_empresa), "credito.detalle"
+    ).first()
     if not credito:
         return jsonify({"message": "Crédito no encontrado o acceso denegado"}), 404
-    return jsonify(credito.to_dict()), 200
+    return jsonify(serializar(credito)), 200
@@ -1,8 +1,15 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, Response, stream_with_context
 from flask_jwt_extended import jwt_required, get_jwt_identity, get_jwt
 from app.extensions import db
-from app.models.catalog import Pago, FormaPago, DetalleCredito, Credito, AsientoContable, MovimientoContable, PagoAudit, Cliente, Usuario
-from datetime import datetime
+from app.models.catalog import Pago, FormaPago, DetalleCredito, Credito, AsientoContable, MovimientoContable, PagoAudit, Cliente, Usuario, ImportacionPagos
+from app.services import pagos_service, importacion_service
+from app.utils.idempotency import idempotente
+from app.utils.serialization import con_forma, serializar
+from app.utils.pagination import parse_keyset, keyset_page
+from datetime import date, datetime, timedelta
+import csv
+import io
+from sqlalchemy.orm import contains_eager
 
 bp = Blueprint("pagos", __name__)
 
@@ -15,10 +22,9 @@ def get_formas_pago():
 
 @bp.post("/")
 @jwt_required()
+@idempotente
 def registrar_pago():
-    print(">>> ¡PETICIÓN RECIBIDA EN /PAGOS/! <<<") # Sensor
     data = request.get_json() or {}
-    print(f">>> Datos recibidos: {data}")          # Sensor de datos
     
     try:
         id_detalle = data.get("id_detalle_credito")
@@ -38,321 +44,239 @@ def registrar_pago():
     if monto <= 0:
         return jsonify({"message": "El monto debe ser mayor a 0"}), 400
 
-    print(f">>> Analizando pago para Detalle #{id_detalle}, Forma #{id_forma}, Monto {monto}")
-    
     try:
-        id_empresa = get_jwt().get("id_empresa")
-        detalle = DetalleCredito.query.get(id_detalle)
-        if not detalle:
-            print(f">>> ERROR: Cuota #{id_detalle} no encontrada")
-            return jsonify({"message": "Cuota no encontrada"}), 404
-
-        credito = Credito.query.filter_by(id_credito=detalle.id_credito, id_empresa=id_empresa).first()
-        if not credito:
-             print(f">>> ERROR: Crédito #{detalle.id_credito} no pertenece a la empresa")
-             return jsonify({"message": "Crédito no encontrado o acceso denegado"}), 404
-        
-        print(f">>> Crédito asociado: #{credito.id_credito if credito else 'N/A'}")
-
-        forma = FormaPago.query.filter_by(id_forma_pago=id_forma, id_empresa=id_empresa).first()
-        if not forma:
-            print(f">>> ERROR: Forma de pago #{id_forma} no encontrada")
-            return jsonify({"message": "Forma de pago no encontrada"}), 404
-            
-        # Registrar Pago
-        user_id = get_jwt_identity()
-        nuevo_pago = Pago(
-            id_empresa=id_empresa,
-            id_detalle_credito=id_detalle,
-            id_forma_pago=id_forma,
-            id_usuario=user_id,
-            monto_pagado=monto,
-            fecha_pago=datetime.now(),
-            comprobante_nro=comprobante
+        nuevo_pago = pagos_service.registrar_pago(
+            get_jwt().get("id_empresa"), get_jwt_identity(), id_detalle, id_forma, monto,
+            comprobante=comprobante, ip=request.remote_addr
         )
-        db.session.add(nuevo_pago)
-        print(">>> Pago agregado a la sesión")
+        # Pago, asiento, estados y auditoría en una sola transacción
+        db.session.commit()
+        return jsonify({"message": "Pago registrado exitosamente", "pago": nuevo_pago.to_dict()}), 201
+    except pagos_service.PagoError as e:
+        db.session.rollback()
+        return jsonify({"message": e.message}), e.status
     except Exception as e:
-        print(f">>> ERROR AL INICIAR PAGO: {str(e)}")
         db.session.rollback()
-        return jsonify({"message": "Error al iniciar proceso de pago", "error": str(e)}), 500
-    
-    # ---------------------------------------------------------
-    # Generación de Asiento Contable Automático
-    # ---------------------------------------------------------
+        return jsonify({"message": "Error registrando pago", "error": str(e)}), 500
+
+@bp.post("/allocate")
+@jwt_required()
+@idempotente
+def asignar_pago():
+    """
+    Cobra varias cuotas de un crédito con un solo monto, de la más antigua a la
+    más nueva. Un pago por cuota alcanzada y un único asiento consolidado.
+    """
+    data = request.get_json() or {}
     try:
-        user_id = get_jwt_identity()
-        
-        # 1. Crear Asiento
-        asiento = AsientoContable(
-            id_empresa=id_empresa,
-            glosa=f"Pago de Cuota #{detalle.numero_cuota} - Crédito #{credito.id_credito} - {forma.nombre}",
-            id_usuario=user_id,
-            fecha=datetime.now()
-        )
-        db.session.add(asiento)
-        db.session.flush() # Para tener el ID del asiento
-        
-        # 2. Calcular proporción de Capital vs Interés
-        # Si el crédito es antiguo y no tiene desglosado, asumimos todo a capital por defecto o 0 interés.
-        total_esperado = float(detalle.cuota_total or 0)
-        cap_esperado = float(detalle.capital_cuota or 0)
-        int_esperado = float(detalle.interes_cuota or 0)
-        
-        pago_capital = 0.0
-        pago_interes = 0.0
-        
-        if total_esperado > 0:
-            # Proporcional
-            ratio_cap = cap_esperado / total_esperado
-            ratio_int = int_esperado / total_esperado
-            
-            pago_capital = monto * ratio_cap
-            pago_interes = monto * ratio_int
-        else:
-            # Fallback para créditos antiguos o sin datos: Todo a Capital (Cuentas por Cobrar)
-            pago_capital = monto
-            pago_interes = 0.0
-            
-        # 3. Movimientos Contables
-        
-        # Movimientos Contables
-        
-        # A) Entrada a CAJA (Debe: Total Pagado)
-        mov_caja = MovimientoContable(
-            id_asiento=asiento.id_asiento,
-            id_empresa=id_empresa,
-            cuenta='Caja',
-            debe=monto,
-            haber=0
-        )
-        db.session.add(mov_caja)
-        
-        # B) Salida de CUENTAS POR COBRAR (Haber: Total Pagado - para rebajar la deuda bruta creada al inicio)
-        # En el modelo "José", CxC nace con Capital + Interés. Al pagar, CxC baja.
-        mov_cxp = MovimientoContable(
-            id_asiento=asiento.id_asiento,
-            id_empresa=id_empresa,
-            cuenta='Cuentas por Cobrar',
-            debe=0,
-            haber=monto
-        )
-        db.session.add(mov_cxp)
-            
-        # C) Devengación de Intereses (Ajuste)
-        if pago_interes > 0:
-            # 1. Damos de baja el "Interés por Cobrar" (Pasivo Diferido) que creamos al inicio (Debe)
-            mov_int_deferred = MovimientoContable(
-                id_asiento=asiento.id_asiento,
-                id_empresa=id_empresa,
-                cuenta='Intereses por Cobrar',
-                debe=round(pago_interes, 2),
-                haber=0
-            )
-            db.session.add(mov_int_deferred)
+        id_credito = int(data.get("id_credito"))
+        id_forma = int(data.get("id_forma_pago"))
+        monto = float(data.get("monto") or 0)
+    except (ValueError, TypeError):
+        return jsonify({"message": "Datos inválidos"}), 400
+    if monto <= 0:
+        return jsonify({"message": "El monto debe ser mayor a 0"}), 400
 
-            # 2. Reconocemos la Ganancia Real (Haber)
-            mov_int_income = MovimientoContable(
-                id_asiento=asiento.id_asiento,
-                id_empresa=id_empresa,
-                cuenta='Ganancias por Intereses',
-                debe=0,
-                haber=round(pago_interes, 2)
-            )
-            db.session.add(mov_int_income)
-            
-    except Exception as e:
-        print(f">>> ERROR CRÍTICO CONTABILIDAD: {str(e)}")
-        import traceback
-        traceback.print_exc()
-        db.session.rollback()
-        return jsonify({"message": "Error generando contabilidad", "error": str(e)}), 500
-        
-    # ---------------------------------------------------------
-    
     try:
-        # Actualizar Detalle
-        detalle.monto_pagado = float(detalle.monto_pagado or 0) + monto
-        if detalle.monto_pagado >= float(detalle.monto_cuota or 0):
-            detalle.estado_cuota = 'PAGADO'
-        
-        # Verificar si el Crédito se paga por completo
-        credito = Credito.query.get(detalle.id_credito)
-        all_detalles = DetalleCredito.query.filter_by(id_credito=credito.id_credito).all()
-        
-        todas_pagadas = True
-        for d in all_detalles:
-            if d.estado_cuota != 'PAGADO':
-                todas_pagadas = False
-                break
-                
-        if todas_pagadas:
-            credito.estado = 'PAGADO'
-    except Exception as update_err:
-        print(f">>> ERROR ACTUALIZANDO ESTADOS: {str(update_err)}")
+        pagos, desglose = pagos_service.asignar_pago(
+            get_jwt().get("id_empresa"), get_jwt_identity(), id_credito, id_forma, monto,
+            comprobante=data.get("comprobante_nro"), ip=request.remote_addr
+        )
+        db.session.commit()
+        return jsonify({
+            "message": f"Pago aplicado a {len(pagos)} cuota(s)",
+            "id_credito": id_credito,
+            "monto": monto,
+            "cuotas": desglose
+        }), 201
+    except pagos_service.PagoError as e:
         db.session.rollback()
-        return jsonify({"message": "Error al actualizar estados de cuota/crédito", "error": str(update_err)}), 500
+        return jsonify({"message": e.message}), e.status
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"message": "Error aplicando pago", "error": str(e)}), 500
 
+@bp.post("/importar")
+@jwt_required()
+def importar_pagos():
+    """
+    Importa un CSV de pagos (campo multipart "archivo"). Ver columnas en
+    app/services/importacion_service.py. Con "id_importacion" reanuda una
+    importación interrumpida desde el último bloque confirmado.
+    """
+    archivo = request.files.get("archivo")
+    if not archivo:
+        return jsonify({"message": "Debe adjuntar el archivo en el campo 'archivo'"}), 400
     try:
-        db.session.commit()
-        
-        # 4. Registrar Auditoría (después del commit para tener el id_pago final)
-        try:
-            audit = PagoAudit(
-                id_empresa=id_empresa,
-                id_pago=nuevo_pago.id_pago,
-                id_usuario=user_id,
-                accion='CREACION',
-                monto_registrado=monto,
-                id_detalle_credito=id_detalle,
-                estado_pago_momento='ACTIVO',
-                direccion_ip=request.remote_addr,
-                observacion=f"Pago registrado vía Caja. Comprobante: {comprobante or 'N/A'}"
-            )
-            db.session.add(audit)
-            db.session.commit()
-        except Exception as audit_err:
-            print(f"Error en auditoría (no bloqueante): {audit_err}")
+        id_forma_default = int(request.form["id_forma_pago"]) if request.form.get("id_forma_pago") else None
+        id_reanudar = int(request.form["id_importacion"]) if request.form.get("id_importacion") else None
+    except ValueError:
+        return jsonify({"message": "Datos inválidos"}), 400
 
-        return jsonify({"message": "Pago registrado exitosamente", "pago": nuevo_pago.to_dict()}), 201
+    id_empresa = get_jwt().get("id_empresa")
+    if id_reanudar:
+        importacion = ImportacionPagos.query.filter_by(id_importacion=id_reanudar, id_empresa=id_empresa).first()
+        if not importacion:
+            return jsonify({"message": "Importación no encontrada o acceso denegado"}), 404
+        if importacion.estado == 'COMPLETADO':
+            return jsonify({"message": "La importación ya fue completada", "importacion": importacion.to_dict()}), 400
+    else:
+        importacion = importacion_service.iniciar_importacion(id_empresa, get_jwt_identity(), archivo.filename)
+
+    texto = io.TextIOWrapper(archivo.stream, encoding="utf-8-sig", newline="")
+    try:
+        importacion_service.procesar_archivo(importacion, texto, id_forma_default, ip=request.remote_addr)
     except Exception as e:
-        print(f">>> ERROR FINAL COMMIT: {str(e)}")
-        db.session.rollback()
-        return jsonify({"message": "Error registrando pago", "error": str(e)}), 500
+        return jsonify({
+            "message": "Importación interrumpida; puede reanudarse con id_importacion",
+            "error": str(e),
+            "importacion": importacion.to_dict()
+        }), 500
+    return jsonify({"message": "Importación completada", "importacion": importacion.to_dict()}), 200
+
+@bp.get("/importaciones/<int:id_importacion>")
+@jwt_required()
+def get_importacion(id_importacion):
+    importacion = ImportacionPagos.query.filter_by(
+        id_importacion=id_importacion, id_empresa=get_jwt().get("id_empresa")
+    ).first()
+    if not importacion:
+        return jsonify({"message": "Importación no encontrada o acceso denegado"}), 404
+    return jsonify(importacion.to_dict()), 200
+
 @bp.get("/")
 @jwt_required()
 def get_pagos():
+    """
+    Historial de pagos de la empresa, del más reciente al más antiguo.
+    Filtros: fecha_desde / fecha_hasta (YYYY-MM-DD, sobre fecha_pago), id_forma_pago,
+    id_usuario, estado (ACTIVO | ANULADO) y comprobante (coincidencia parcial).
+    Con ?limit= o ?cursor= pagina por id_pago y devuelve {items, next_cursor, limit};
+    sin ellos devuelve la lista completa (compatibilidad).
+    """
     id_empresa = get_jwt().get("id_empresa")
-    pagos = Pago.query.filter_by(id_empresa=id_empresa).order_by(Pago.id_pago.desc()).all()
-    return jsonify([p.to_dict() for p in pagos]), 200
+    args = request.args
+    try:
+        pagina = parse_keyset(request)
+        condiciones = [Pago.id_empresa == id_empresa]
+        if args.get("fecha_desde"):
+            condiciones.append(Pago.fecha_pago >= date.fromisoformat(args["fecha_desde"]))
+        if args.get("fecha_hasta"):
+            condiciones.append(Pago.fecha_pago < date.fromisoformat(args["fecha_hasta"]) + timedelta(days=1))
+        if args.get("id_forma_pago"):
+            condiciones.append(Pago.id_forma_pago == int(args["id_forma_pago"]))
+        if args.get("id_usuario"):
+            condiciones.append(Pago.id_usuario == int(args["id_usuario"]))
+        if args.get("estado"):
+            condiciones.append(Pago.estado == args["estado"].upper())
+        if args.get("comprobante"):
+            condiciones.append(Pago.comprobante_nro.ilike(f"%{args['comprobante'].strip()}%"))
+        if pagina and pagina[0]:
+            condiciones.append(Pago.id_pago < int(pagina[0][0]))
+    except (ValueError, TypeError) as e:
+        return jsonify({"message": "Parámetros inválidos", "error": str(e)}), 400
+
+    # forma_pago y usuario llegan en la misma consulta (JOIN), sin lazy loads por fila
+    query = con_forma(Pago.query.filter(*condiciones).order_by(Pago.id_pago.desc()), "pago")
+    if pagina is None:
+        return jsonify(serializar(query.all())), 200
+
+    limit = pagina[1]
+    pagos, next_cursor = keyset_page(query.limit(limit + 1).all(), limit, lambda p: (p.id_pago,))
+    return jsonify({"items": serializar(pagos), "next_cursor": next_cursor, "limit": limit}), 200
 
 @bp.get("/detalle/<int:id_detalle>")
 @jwt_required()
 def get_pagos_by_detalle(id_detalle):
     id_empresa = get_jwt().get("id_empresa")
-    pagos = Pago.query.filter_by(id_detalle_credito=id_detalle, id_empresa=id_empresa).order_by(Pago.id_pago.desc()).all()
-    return jsonify([p.to_dict() for p in pagos]), 200
+    pagos = con_forma(
+        Pago.query.filter_by(id_detalle_credito=id_detalle, id_empresa=id_empresa).order_by(Pago.id_pago.desc()),
+        "pago"
+    ).all()
+    return jsonify(serializar(pagos)), 200
 
 @bp.post("/<int:id_pago>/anular")
 @jwt_required()
 def anular_pago(id_pago):
-    id_empresa = get_jwt().get("id_empresa")
-    pago = Pago.query.filter_by(id_pago=id_pago, id_empresa=id_empresa).first()
-    if not pago:
-        return jsonify({"message": "Pago no encontrado o acceso denegado"}), 404
+    try:
+        pagos_service.anular_pago(get_jwt().get("id_empresa"), get_jwt_identity(), id_pago, ip=request.remote_addr)
+        db.session.commit()
+        return jsonify({"message": "Pago anulado exitosamente"}), 200
+    except pagos_service.PagoError as e:
+        db.session.rollback()
+        return jsonify({"message": e.message}), e.status
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"message": "Error anulando pago", "error": str(e)}), 500
 
-    if pago.estado == 'ANULADO':
-        return jsonify({"message": "El pago ya está anulado"}), 400
+COLUMNAS_AUDITORIA_CSV = [
+    "id_audit", "fecha_accion", "accion", "id_pago", "monto_registrado", "estado_pago_momento",
+    "id_detalle_credito", "usuario_nombre", "cliente_nombre", "cliente_ci", "direccion_ip", "observacion"
+]
 
-    detalle = DetalleCredito.query.get(pago.id_detalle_credito)
-    credito = Credito.query.get(detalle.id_credito)
-    forma = FormaPago.query.get(pago.id_forma_pago)
-    
-    monto = float(pago.monto_pagado or 0)
-    user_id = get_jwt_identity()
 
-    try:
-        # 1. Anular el registro del pago
-        pago.estado = 'ANULADO'
-        
-        # 2. Revertir montos en el Detalle
-        detalle.monto_pagado = float(detalle.monto_pagado or 0) - monto
-        if detalle.estado_cuota == 'PAGADO' and detalle.monto_pagado < float(detalle.monto_cuota or 0):
-            detalle.estado_cuota = 'PENDIENTE'
-            
-        # 3. Revertir estado del Crédito
-        if credito.estado == 'PAGADO':
-            credito.estado = 'PENDIENTE'
-            
-        # 4. Asiento Contable de Reversión
-        asiento = AsientoContable(
-            id_empresa=id_empresa,
-            glosa=f"REVERSIÓN Pago #{pago.id_pago} - Cuota #{detalle.numero_cuota} - Crédito #{credito.id_credito}",
-            id_usuario=user_id,
-            fecha=datetime.now()
-        )
-        db.session.add(asiento)
-        db.session.flush()
+def _query_auditoria(id_empresa, args):
+    """
+    Auditoría de pagos de la empresa con sus filtros (lanza ValueError si son inválidos):
+    fecha_desde / fecha_hasta (YYYY-MM-DD), id_usuario, accion y documento del cliente.
+    El usuario llega por JOIN (contains_eager): sin lazy loads por fila.
+    """
+    query = db.session.query(
+        PagoAudit,
+        Cliente.nombre.label("cliente_nombre"),
+        Cliente.apellido.label("cliente_apellido"),
+        Cliente.documento.label("cliente_ci")
+    ).outerjoin(PagoAudit.usuario)\
+     .outerjoin(DetalleCredito, PagoAudit.id_detalle_credito == DetalleCredito.id_detalle)\
+     .outerjoin(Credito, DetalleCredito.id_credito == Credito.id_credito)\
+     .outerjoin(Cliente, Credito.id_cliente == Cliente.id_cliente)\
+     .options(contains_eager(PagoAudit.usuario))\
+     .filter(PagoAudit.id_empresa == id_empresa)
 
-        # Calcular proporciones para reversión contable (igual que al registrar)
-        total_esperado = float(detalle.cuota_total or 0)
-        cap_esperado = float(detalle.capital_cuota or 0)
-        int_esperado = float(detalle.interes_cuota or 0)
-        
-        pago_interes = 0.0
-        if total_esperado > 0:
-            ratio_int = int_esperado / total_esperado
-            pago_interes = monto * ratio_int
+    if args.get("fecha_desde"):
+        query = query.filter(PagoAudit.fecha_accion >= date.fromisoformat(args["fecha_desde"]))
+    if args.get("fecha_hasta"):
+        query = query.filter(PagoAudit.fecha_accion < date.fromisoformat(args["fecha_hasta"]) + timedelta(days=1))
+    if args.get("id_usuario"):
+        query = query.filter(PagoAudit.id_usuario == int(args["id_usuario"]))
+    if args.get("accion"):
+        query = query.filter(PagoAudit.accion == args["accion"].upper())
+    if args.get("documento"):
+        query = query.filter(Cliente.documento == args["documento"].strip())
+    return query.order_by(PagoAudit.id_audit.desc())
 
-        # A) SALIDA de CAJA (Haber)
-        mov_caja = MovimientoContable(
-            id_asiento=asiento.id_asiento,
-            id_empresa=id_empresa,
-            cuenta='Caja',
-            debe=0,
-            haber=monto
-        )
-        db.session.add(mov_caja)
-        
-        # B) REPOSICIÓN de CUENTAS POR COBRAR (Debe)
-        mov_cxc = MovimientoContable(
-            id_asiento=asiento.id_asiento,
-            id_empresa=id_empresa,
-            cuenta='Cuentas por Cobrar',
-            debe=monto,
-            haber=0
-        )
-        db.session.add(mov_cxc)
-        
-        # C) Reversión de Ganancia de Interés
-        if pago_interes > 0:
-            # Revertimos el Pasivo Diferido (Haber: vuelve a estar por cobrar)
-            mov_int_deferred = MovimientoContable(
-                id_asiento=asiento.id_asiento,
-                id_empresa=id_empresa,
-                cuenta='Intereses por Cobrar',
-                debe=0,
-                haber=round(pago_interes, 2)
-            )
-            db.session.add(mov_int_deferred)
 
-            # Revertimos la Ganancia Real (Debe: ya no es ganancia)
-            mov_int_income = MovimientoContable(
-                id_asiento=asiento.id_asiento,
-                id_empresa=id_empresa,
-                cuenta='Ganancias por Intereses',
-                debe=round(pago_interes, 2),
-                haber=0
-            )
-            db.session.add(mov_int_income)
+def _fila_auditoria(audit, c_nome, c_ape, c_ci):
+    d = audit.to_dict()
+    d["usuario_nombre"] = d["usuario_nombre"] or "SISTEMA"
+    d["cliente_nombre"] = f"{c_nome} {c_ape}" if c_nome else "OTRO / AJUSTE"
+    d["cliente_ci"] = c_ci or "---"
+    return d
 
-        db.session.commit()
 
-        # 5. Registrar Auditoría
-        try:
-            audit = PagoAudit(
-                id_empresa=id_empresa,
-                id_pago=pago.id_pago,
-                id_usuario=user_id,
-                accion='ANULACION',
-                monto_registrado=monto,
-                id_detalle_credito=pago.id_detalle_credito,
-                estado_pago_momento='ANULADO',
-                direccion_ip=request.remote_addr,
-                observacion="Anulación de pago realizada por el usuario."
-            )
-            db.session.add(audit)
-            db.session.commit()
-        except Exception as audit_err:
-            print(f"Error en auditoría (no bloqueante): {audit_err}")
+def _csv_auditoria(query):
+    """Genera el CSV fila a fila (yield_per): memoria constante para todo el historial."""
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=COLUMNAS_AUDITORIA_CSV, extrasaction="ignore")
+    writer.writeheader()
+    for fila in query.yield_per(1000):
+        writer.writerow(_fila_auditoria(*fila))
+        if buffer.tell() > 64 * 1024:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
 
-    except Exception as e:
-        db.session.rollback()
-        return jsonify({"message": "Error anulando pago", "error": str(e)}), 500
 
 @bp.get("/auditoria")
 @jwt_required()
 def get_auditoria_pagos():
+    """
+    Auditoría de pagos. Filtros: ver _query_auditoria.
+    - ?limit= / ?cursor=: paginación por id_audit → {items, next_cursor, limit}
+    - ?formato=csv: exporta el historial completo (con filtros) en streaming
+    - sin parámetros: las últimas 500 entradas (compatibilidad)
+    """
     try:
         # Forzamos conversión a int por seguridad
         id_empresa_raw = get_jwt().get("id_empresa")
@@ -361,32 +285,32 @@ def get_auditoria_pagos():
         if not id_empresa:
             return jsonify({"message": "ID de empresa no encontrado en el token"}), 400
 
-        # Realizamos un Join para traer el nombre del cliente y del usuario
-        # Usamos outerjoin para el usuario también por si acaso hay huérfanos
-        results = db.session.query(
-            PagoAudit,
-            Usuario.nombre_usuario.label("usuario_nombre"),
-            Cliente.nombre.label("cliente_nombre"),
-            Cliente.apellido.label("cliente_apellido"),
-            Cliente.documento.label("cliente_ci")
-        ).outerjoin(Usuario, PagoAudit.id_usuario == Usuario.id_usuario)\
-         .outerjoin(DetalleCredito, PagoAudit.id_detalle_credito == DetalleCredito.id_detalle)\
-         .outerjoin(Credito, DetalleCredito.id_credito == Credito.id_credito)\
-         .outerjoin(Cliente, Credito.id_cliente == Cliente.id_cliente)\
-         .filter(PagoAudit.id_empresa == id_empresa)\
-         .order_by(PagoAudit.id_audit.desc())\
-         .limit(500)\
-         .all()
+        try:
+            pagina = parse_keyset(request)
+            query = _query_auditoria(id_empresa, request.args)
+            if pagina and pagina[0]:
+                query = query.filter(PagoAudit.id_audit < int(pagina[0][0]))
+        except (ValueError, TypeError) as e:
+            return jsonify({"message": "Parámetros inválidos", "error": str(e)}), 400
+
+        if request.args.get("formato") == "csv":
+            nombre = f"auditoria_pagos_{date.today().isoformat()}.csv"
+            return Response(
+                stream_with_context(_csv_auditoria(query)),
+                mimetype="text/csv",
+                headers={"Content-Disposition": f"attachment; filename={nombre}"}
+            )
 
-        data = []
-        for audit, u_nome, c_nome, c_ape, c_ci in results:
-            d = audit.to_dict()
-            d["usuario_nombre"] = u_nome or "SISTEMA"
-            d["cliente_nombre"] = f"{c_nome} {c_ape}" if c_nome else "OTRO / AJUSTE"
-            d["cliente_ci"] = c_ci or "---"
-            data.append(d)
+        if pagina is None:
+            return jsonify([_fila_auditoria(*fila) for fila in query.limit(500).all()]), 200
 
-        return jsonify(data), 200
+        limit = pagina[1]
+        filas, next_cursor = keyset_page(query.limit(limit + 1).all(), limit, lambda f: (f[0].id_audit,))
+        return jsonify({
+            "items": [_fila_auditoria(*fila) for fila in filas],
+            "next_cursor": next_cursor,
+            "limit": limit
+        }), 200
     except Exception as e:
         print(f"!!! CRASH EN AUDITORIA-PAGOS: {str(e)}") # Esto se verá en los logs del servidor
         return jsonify({"message": "Error interno al cargar auditoría", "error": str(e)}), 500
@@ -5,6 +5,7 @@ from sqlalchemy import asc, func
 from app.extensions import db
 from app.models.catalog import Permiso  # ajusta si tu ruta de modelos difiere
 from app.api.users import roles_required  # mismo decorador que usas en roles
+from app.utils.permissions import invalidar_permisos, incrementar_version_permisos
 
 bp = Blueprint("permisos", __name__)
 
@@ -99,9 +100,12 @@ def update_permission(id_permiso):
             if dup:
                 return jsonify({"error": "El código ya existe"}), 409
 
+        if new_codigo != p.nombre:
+            incrementar_version_permisos(id_permiso=id_permiso)
         p.nombre = new_codigo
         p.descripcion = new_nombre_legible
         db.session.commit()
+        invalidar_permisos()  # el código del permiso pudo cambiar
         return jsonify(perm_to_dto(p)), 200
     except Exception:
         db.session.rollback()
@@ -115,8 +119,10 @@ def delete_permission(id_permiso):
         p = Permiso.query.get(id_permiso)
         if not p:
             return jsonify({"error": "Permiso no encontrado"}), 404
+        incrementar_version_permisos(id_permiso=id_permiso)
         db.session.delete(p)
         db.session.commit()
+        invalidar_permisos()
         return jsonify({"msg": "Permiso eliminado"}), 200
     except Exception:
         db.session.rollback()
@@ -5,6 +5,8 @@ from app.extensions import db
 from app.models.catalog import Rol, Permiso, RolPermiso, UsuarioRol
 # usa el decorador ya definido en users.py para no duplicar
 from app.api.users import roles_required
+from app.utils.permissions import invalidar_permisos, incrementar_version_permisos
+from app.utils.serialization import con_forma, sin_lazy_loads, LazyLoadNoPlanificado
 
 bp = Blueprint("roles", __name__)
 
@@ -14,6 +16,8 @@ def _role_to_dict(r: Rol):
     if hasattr(r, "to_dict"):
         try:
             return r.to_dict()
+        except LazyLoadNoPlanificado:
+            raise
         except Exception:
             pass
     # Fallback: construirlo aquí
@@ -89,13 +93,14 @@ def get_roles():
     # SEGURIDAD: Solo es SUPERADMIN si tiene el rol Y no tiene empresa asignada
     is_super = "SUPERADMIN" in current_roles and claims.get("id_empresa") is None
 
-    roles = Rol.query.order_by(Rol.id_rol.asc()).all()
+    roles = con_forma(Rol.query.order_by(Rol.id_rol.asc()), "rol").all()
     
     if not is_super:
         # Filtrar el rol SuperAdmin para no-superadmins
         roles = [r for r in roles if r.nombre and r.nombre.upper() != 'SUPERADMIN']
         
-    return jsonify([_role_to_dict(r) for r in roles]), 200
+    with sin_lazy_loads():
+        return jsonify([_role_to_dict(r) for r in roles]), 200
 
 
 # PUT /api/roles/<id_rol>
@@ -112,7 +117,8 @@ def update_role(id_rol):
     new_permisos_ids = set(int(x) for x in (data.get("permisos") or []))
 
     # nombre único si cambió
-    if new_nombre and new_nombre != role.nombre:
+    renombrado = bool(new_nombre and new_nombre != role.nombre)
+    if renombrado:
         dup = (
             Rol.query.filter(
                 func.lower(Rol.nombre) == new_nombre.lower(),
@@ -149,7 +155,12 @@ def update_role(id_rol):
         for pid in to_add:
             db.session.add(RolPermiso(id_rol=id_rol, id_permiso=pid))
 
+        # los tokens llevan nombres de rol y códigos de permiso: invalidarlos
+        if renombrado or to_add or to_remove:
+            incrementar_version_permisos(id_rol=id_rol)
+
         db.session.commit()
+        invalidar_permisos()  # afecta a todos los usuarios con este rol
         return jsonify({"message": "Rol actualizado exitosamente", "role": _role_to_dict(role)}), 200
 
     except Exception as e:
@@ -177,6 +188,7 @@ def delete_role(id_rol):
     try:
         db.session.delete(role)
         db.session.commit()
+        invalidar_permisos()
         return jsonify({"message": "Rol eliminado exitosamente"}), 200
     except Exception as e:
         db.session.rollback()
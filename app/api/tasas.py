@@ -2,41 +2,10 @@ from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity, get_jwt
 from app.extensions import db
 from app.models.catalog import TasaInteres, Usuario
+from app.utils.permissions import permission_required
 
 bp = Blueprint("tasas", __name__)
 
-def permission_required(permission_name):
-    # Reusing the logic (could be centralized, but keeping independent for now)
-    from functools import wraps
-    def wrapper(fn):
-        @wraps(fn)
-        @jwt_required()
-        def decorated(*args, **kwargs):
-            user_id = get_jwt_identity()
-            user = Usuario.query.get(user_id)
-            if not user:
-                return jsonify({"message": "Usuario no encontrado"}), 404
-            
-            # Admin Bypass
-            is_admin = any(r.rol.nombre.upper() == 'ADMIN' for r in user.roles)
-            if is_admin:
-                 return fn(*args, **kwargs)
-
-            # Check permissions
-            has_perm = False
-            for ur in user.roles:
-                for rp in ur.rol.permisos_asociados:
-                    if rp.permiso.nombre == permission_name:
-                        has_perm = True
-                        break
-                if has_perm: break
-            
-            if not has_perm:
-                return jsonify({"message": f"Permiso denegado. Se requiere '{permission_name}'"}), 403
-            return fn(*args, **kwargs)
-        return decorated
-    return wrapper
-
 @bp.get("/")
 @jwt_required() # Allow read for all authenticated users (needed for dropdowns)
 def get_tasas():
@@ -1,11 +1,13 @@
 # app/api/users.py
 from flask import Blueprint, request, jsonify, current_app
 from flask_jwt_extended import jwt_required, get_jwt, get_jwt_identity
-from werkzeug.security import generate_password_hash
+from app.utils.passwords import hashear, HashOcupado
 from sqlalchemy import func, or_
 from functools import wraps
 from app.extensions import db
 from app.models.catalog import Usuario, Rol, UsuarioRol
+from app.utils.permissions import invalidar_permisos, incrementar_version_permisos
+from app.utils.serialization import con_forma, sin_lazy_loads
 
 bp = Blueprint("users", __name__)
 
@@ -109,7 +111,10 @@ def create_user():
         if faltantes:
             return jsonify({"message": f"Roles inexistentes: {faltantes}"}), 400
 
-    hashed_password = generate_password_hash(password, method="pbkdf2:sha256")
+    try:
+        hashed_password = hashear(password)
+    except HashOcupado as e:
+        return jsonify({"message": e.message}), 503
 
     try:
         nuevo = Usuario(
@@ -128,6 +133,7 @@ def create_user():
             db.session.add(UsuarioRol(id_usuario=nuevo.id_usuario, id_rol=role_id))
 
         db.session.commit()
+        invalidar_permisos(nuevo.id_usuario)
         return jsonify({"message": "Usuario creado exitosamente", "user": _user_to_dict(nuevo)}), 201
 
     except Exception as e:
@@ -180,18 +186,19 @@ def get_users():
             Usuario.email.ilike(like),
         ))
 
-    usuarios = qry.order_by(Usuario.id_usuario.asc()).all()
-    return jsonify([_user_to_dict(u) for u in usuarios]), 200
+    usuarios = con_forma(qry.order_by(Usuario.id_usuario.asc()), "usuario").all()
+    with sin_lazy_loads():
+        return jsonify([_user_to_dict(u) for u in usuarios]), 200
 
 # (Opcional) alias claro para eliminados
 @bp.get("/deleted")
 @roles_required(["Admin"])
 def get_deleted_users():
-    usuarios = (Usuario.query
-                .filter(func.upper(Usuario.estado) == "ELIMINADO")
-                .order_by(Usuario.id_usuario.asc())
-                .all())
-    return jsonify([_user_to_dict(u) for u in usuarios]), 200
+    usuarios = con_forma(Usuario.query
+                         .filter(func.upper(Usuario.estado) == "ELIMINADO")
+                         .order_by(Usuario.id_usuario.asc()), "usuario").all()
+    with sin_lazy_loads():
+        return jsonify([_user_to_dict(u) for u in usuarios]), 200
 
 # UPDATE
 @bp.put("/<int:id_usuario>")
@@ -232,7 +239,11 @@ def update_user(id_usuario):
     # Password (si viene)
     new_password = data.get("password")
     if new_password:
-        user.password_hash = generate_password_hash(new_password, method="pbkdf2:sha256")
+        try:
+            user.password_hash = hashear(new_password)
+        except HashOcupado as e:
+            db.session.rollback()  # descarta los cambios ya aplicados al usuario
+            return jsonify({"message": e.message}), 503
 
     # Roles (añadir / quitar)
     new_roles_ids = set(data.get("roles", []))
@@ -264,7 +275,11 @@ def update_user(id_usuario):
         for rid in roles_to_add:
             db.session.add(UsuarioRol(id_usuario=id_usuario, id_rol=rid))
 
+        if roles_to_add or roles_to_remove:
+            incrementar_version_permisos(id_usuario=id_usuario)
+
         db.session.commit()
+        invalidar_permisos(id_usuario)
         return jsonify({"message": "Usuario actualizado exitosamente", "user": _user_to_dict(user)}), 200
 
     except Exception as e:
@@ -293,6 +308,7 @@ def delete_user(id_usuario):
     try:
         user.estado = "ELIMINADO"
         db.session.commit()
+        invalidar_permisos(id_usuario)
         return jsonify({"message": "Usuario eliminado lógicamente"}), 200
     except Exception as e:
         db.session.rollback()
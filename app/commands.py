@@ -0,0 +1,135 @@
+# app/commands.py
+import click
+from flask.cli import AppGroup
+
+contabilidad_cli = AppGroup("contabilidad", help="Mantenimiento de la contabilidad.")
+
+
+@contabilidad_cli.command("recalcular-saldos")
+@click.option("--empresa", "id_empresa", type=int, default=None, help="Limitar a una empresa.")
+@click.option("--dry-run", is_flag=True, help="Solo reportar diferencias, sin corregir.")
+def recalcular_saldos_cmd(id_empresa, dry_run):
+    """Recalcula saldos_cuenta desde movimientos_contables y reporta desvíos."""
+    from app.services.contabilidad_service import recalcular_saldos
+
+    diferencias = recalcular_saldos(id_empresa=id_empresa, aplicar=not dry_run)
+    if not diferencias:
+        click.echo("Saldos consistentes: sin diferencias.")
+        return
+    for empresa, cuenta, guardado, real in diferencias:
+        click.echo(f"Empresa {empresa} | {cuenta}: guardado={guardado} real={real} desvío={real - guardado}")
+    accion = "detectadas" if dry_run else "corregidas"
+    click.echo(f"{len(diferencias)} diferencia(s) {accion}.")
+
+
+@contabilidad_cli.command("reconstruir-flujo")
+@click.option("--empresa", "id_empresa", type=int, default=None, help="Limitar a una empresa.")
+@click.option("--desde", type=click.DateTime(formats=["%Y-%m-%d"]), default=None, help="Reconstruir desde esta fecha (YYYY-MM-DD).")
+def reconstruir_flujo_cmd(id_empresa, desde):
+    """Regenera flujo_caja_diario desde los asientos (backfill)."""
+    from app.services.contabilidad_service import reconstruir_flujo_caja
+
+    dias = reconstruir_flujo_caja(id_empresa=id_empresa, desde=desde.date() if desde else None)
+    click.echo(f"flujo_caja_diario reconstruido: {dias} día(s) escritos.")
+
+
+@contabilidad_cli.command("cerrar-periodo")
+@click.option("--empresa", "id_empresa", type=int, required=True, help="Empresa a cerrar.")
+@click.option("--periodo", required=True, help="Mes a cerrar (YYYY-MM).")
+def cerrar_periodo_cmd(id_empresa, periodo):
+    """Cierra un mes contable y guarda la foto de saldos por cuenta."""
+    from app.extensions import db
+    from app.services import cierres_service
+
+    try:
+        cierre = cierres_service.cerrar_periodo(id_empresa, cierres_service.parse_periodo(periodo))
+        db.session.commit()
+    except ValueError as e:
+        raise click.BadParameter(str(e), param_hint="--periodo")
+    except cierres_service.CierreError as e:
+        db.session.rollback()
+        raise click.ClickException(e.message)
+    click.echo(f"Período {cierre.to_dict()['periodo']} cerrado para la empresa {id_empresa}.")
+
+
+creditos_cli = AppGroup("creditos", help="Mantenimiento de la cartera de créditos.")
+
+
+@creditos_cli.command("marcar-vencidos")
+@click.option("--empresa", "id_empresa", type=int, default=None, help="Limitar a una empresa.")
+@click.option("--fecha", type=click.DateTime(formats=["%Y-%m-%d"]), default=None, help="Fecha de corte (por defecto hoy).")
+def marcar_vencidos_cmd(id_empresa, fecha):
+    """Pasa a VENCIDO las cuotas pendientes ya vencidas y sus créditos."""
+    from app.services.vencimientos_service import marcar_vencidos
+
+    m = marcar_vencidos(id_empresa=id_empresa, hoy=fecha.date() if fecha else None)
+    click.echo(
+        f"{m['cuotas']} cuota(s) y {m['creditos']} crédito(s) marcados VENCIDO, "
+        f"{m['regularizados']} crédito(s) regularizados, en {m['empresas']} empresa(s) "
+        f"({m['omitidas']} omitidas por lock) en {m['segundos']}s."
+    )
+
+
+pagos_cli = AppGroup("pagos", help="Operaciones masivas de pagos.")
+
+
+@pagos_cli.command("importar")
+@click.argument("archivo", type=click.Path(exists=True, dir_okay=False))
+@click.option("--empresa", "id_empresa", type=int, required=True, help="Empresa dueña de los pagos.")
+@click.option("--usuario", "id_usuario", type=int, required=True, help="Usuario que registra los pagos.")
+@click.option("--forma-pago", "id_forma", type=int, default=None, help="Forma de pago por defecto.")
+@click.option("--bloque", type=int, default=None, help="Filas por transacción.")
+@click.option("--reanudar", "id_importacion", type=int, default=None, help="Reanudar una importación interrumpida.")
+def importar_pagos_cmd(archivo, id_empresa, id_usuario, id_forma, bloque, id_importacion):
+    """Importa un CSV de pagos en bloques transaccionales reanudables."""
+    import os
+    from app.models.catalog import ImportacionPagos
+    from app.services import importacion_service
+
+    if id_importacion:
+        importacion = ImportacionPagos.query.filter_by(id_importacion=id_importacion, id_empresa=id_empresa).first()
+        if not importacion:
+            raise click.ClickException("Importación no encontrada para la empresa.")
+    else:
+        importacion = importacion_service.iniciar_importacion(id_empresa, id_usuario, os.path.basename(archivo))
+    click.echo(f"Importación #{importacion.id_importacion} (desde la fila {importacion.filas_procesadas + 2})")
+
+    with open(archivo, encoding="utf-8-sig", newline="") as texto:
+        importacion_service.procesar_archivo(
+            importacion, texto, id_forma, tamano_bloque=bloque or importacion_service.TAMANO_BLOQUE
+        )
+    click.echo(
+        f"{importacion.pagos_aplicados} pago(s) aplicados, {importacion.filas_omitidas} omitidos "
+        f"(comprobante ya cargado), {importacion.filas_con_error} con error."
+    )
+
+
+mantenimiento_cli = AppGroup("mantenimiento", help="Tareas de limpieza.")
+
+
+@mantenimiento_cli.command("purgar-idempotencia")
+def purgar_idempotencia_cmd():
+    """Elimina las Idempotency-Key vencidas."""
+    from app.utils.idempotency import purgar_claves_vencidas
+
+    click.echo(f"{purgar_claves_vencidas()} clave(s) de idempotencia vencidas eliminadas.")
+
+
+@mantenimiento_cli.command("procesar-outbox")
+def procesar_outbox_cmd():
+    """Entrega los eventos de auditoría pendientes del outbox."""
+    from app.models.catalog import EventoOutbox
+    from app.services.outbox_service import drenar_outbox, MAX_INTENTOS
+
+    click.echo(f"{drenar_outbox()} evento(s) entregados.")
+    bloqueados = EventoOutbox.query.filter(EventoOutbox.intentos >= MAX_INTENTOS).count()
+    if bloqueados:
+        click.echo(f"{bloqueados} evento(s) superaron {MAX_INTENTOS} intentos; revisar outbox_eventos.ultimo_error.")
+
+
+def register_commands(app):
+    """Registra los grupos de comandos `flask <grupo> <comando>`."""
+    app.cli.add_command(contabilidad_cli)
+    app.cli.add_command(creditos_cli)
+    app.cli.add_command(pagos_cli)
+    app.cli.add_command(mantenimiento_cli)
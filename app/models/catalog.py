@@ -1,3 +1,4 @@
+import json
 from app.extensions import db
 from sqlalchemy import (
     Column, Integer, String, Text, Numeric, Boolean,
@@ -38,6 +39,8 @@ class Usuario(db.Model):
     password_hash = db.Column(db.String(255), nullable=False)
     estado = db.Column(db.String(20), nullable=False, default='ACTIVO')
     is_global = db.Column(db.Boolean, default=False, server_default='false')
+    # Se incrementa cuando cambian sus roles/permisos: invalida los tokens emitidos antes (claim "pv")
+    permisos_version = db.Column(db.Integer, nullable=False, default=0, server_default='0')
     created_at = db.Column(db.TIMESTAMP, default=db.func.current_timestamp())
     updated_at = db.Column(db.TIMESTAMP, default=db.func.current_timestamp(), onupdate=db.func.current_timestamp())
     
@@ -181,6 +184,10 @@ class Cliente(db.Model):
     direccion = db.Column(db.Text)
     created_at = db.Column(db.TIMESTAMP, default=db.func.current_timestamp())
 
+    __table_args__ = (
+        db.Index('ix_clientes_empresa_documento', 'id_empresa', 'documento'),
+    )
+
     def to_dict(self):
         return {
             'id_cliente': self.id_cliente,
@@ -246,7 +253,13 @@ class Credito(db.Model):
     regla = db.relationship('ReglaCredito', backref='creditos')
     detalles = db.relationship('DetalleCredito', backref='credito', cascade="all, delete-orphan")
 
-    def to_dict(self):
+    __table_args__ = (
+        db.Index('ix_creditos_empresa_id_credito', 'id_empresa', 'id_credito'),
+        db.Index('ix_creditos_empresa_cliente', 'id_empresa', 'id_cliente'),
+    )
+
+    def to_dict_summary(self):
+        """Vista liviana para listados: sin el árbol de cuotas y pagos."""
         return {
             'id_credito': self.id_credito,
             'id_cliente': self.id_cliente,
@@ -261,10 +274,14 @@ class Credito(db.Model):
             'monto_total_a_pagar': float(self.monto_total_a_pagar),
             'cantidad_cuotas': self.cantidad_cuotas,
             'fecha_desembolso': self.fecha_desembolso.isoformat() if self.fecha_desembolso else None,
-            'estado': self.estado,
-            'detalles': [d.to_dict() for d in self.detalles]
+            'estado': self.estado
         }
 
+    def to_dict(self):
+        data = self.to_dict_summary()
+        data['detalles'] = [d.to_dict() for d in self.detalles]
+        return data
+
 class DetalleCredito(db.Model):
     __tablename__ = 'detalles_credito'
     id_detalle = db.Column(db.Integer, primary_key=True)
@@ -278,6 +295,11 @@ class DetalleCredito(db.Model):
     interes_cuota = db.Column(db.Numeric, default=0)
     cuota_total = db.Column(db.Numeric, default=0)
 
+    __table_args__ = (
+        # Barrido de vencimientos: WHERE estado_cuota = 'PENDIENTE' AND fecha_vencimiento < hoy
+        db.Index('ix_detalles_estado_vencimiento', 'estado_cuota', 'fecha_vencimiento'),
+    )
+
     def to_dict(self):
         return {
             'id_detalle': self.id_detalle,
@@ -322,6 +344,11 @@ class Pago(db.Model):
     forma_pago = db.relationship('FormaPago', backref='pagos')
     usuario = db.relationship('Usuario', backref='pagos')
 
+    __table_args__ = (
+        db.Index('ix_pagos_empresa_fecha', 'id_empresa', 'fecha_pago'),
+        db.Index('ix_pagos_empresa_id_pago', 'id_empresa', 'id_pago'),
+    )
+
     def to_dict(self):
         return {
             'id_pago': self.id_pago,
@@ -352,6 +379,11 @@ class PagoAudit(db.Model):
 
     usuario = db.relationship('Usuario', backref='auditoria_pagos')
 
+    __table_args__ = (
+        db.Index('ix_pagos_audit_empresa_id', 'id_empresa', 'id_audit'),
+        db.Index('ix_pagos_audit_empresa_fecha', 'id_empresa', 'fecha_accion'),
+    )
+
     def to_dict(self):
         return {
             'id_audit': self.id_audit,
@@ -378,6 +410,14 @@ class AsientoContable(db.Model):
     movimientos = db.relationship('MovimientoContable', backref='asiento', cascade="all, delete-orphan")
     usuario = db.relationship('Usuario', backref='asientos')
 
+    __table_args__ = (
+        # Paginación por (fecha, id_asiento) dentro de la empresa
+        db.Index('ix_asientos_empresa_fecha_id', 'id_empresa', 'fecha', 'id_asiento'),
+        # Búsqueda ILIKE '%texto%' en glosa (pg_trgm, creada por la migración en PostgreSQL)
+        db.Index('ix_asientos_glosa_trgm', 'glosa', postgresql_using='gin',
+                 postgresql_ops={'glosa': 'gin_trgm_ops'}),
+    )
+
     def to_dict(self):
         return {
             'id_asiento': self.id_asiento,
@@ -387,23 +427,88 @@ class AsientoContable(db.Model):
             'movimientos': [m.to_dict() for m in self.movimientos]
         }
 
+class CuentaContable(db.Model):
+    """
+    Plan de cuentas por empresa. Las cuentas se crean al primer uso (ver
+    contabilidad_service.ids_cuentas) con un tipo inferido del nombre, que
+    puede corregirse con PUT /api/contabilidad/cuentas/<id>.
+    """
+    __tablename__ = 'plan_cuentas'
+    id_cuenta = db.Column(db.Integer, primary_key=True)
+    id_empresa = db.Column(db.Integer, db.ForeignKey('empresa.id_empresa'), nullable=False)
+    nombre = db.Column(db.String(100), nullable=False)
+    tipo = db.Column(db.String(20), nullable=False)  # ACTIVO | PASIVO | PATRIMONIO | INGRESO | GASTO
+    created_at = db.Column(db.DateTime, default=db.func.current_timestamp())
+
+    __table_args__ = (
+        db.UniqueConstraint('id_empresa', 'nombre', name='uq_plan_cuentas_empresa_nombre'),
+    )
+
+    def to_dict(self):
+        return {
+            'id_cuenta': self.id_cuenta,
+            'nombre': self.nombre,
+            'tipo': self.tipo
+        }
+
 class MovimientoContable(db.Model):
     __tablename__ = 'movimientos_contables'
     id_movimiento = db.Column(db.Integer, primary_key=True)
-    id_asiento = db.Column(db.Integer, db.ForeignKey('asientos_contables.id_asiento'), nullable=False)
+    id_asiento = db.Column(db.Integer, db.ForeignKey('asientos_contables.id_asiento'), nullable=False, index=True)
     id_empresa = db.Column(db.Integer, db.ForeignKey('empresa.id_empresa'), nullable=True)
-    cuenta = db.Column(db.String(100), nullable=False)
+    id_cuenta = db.Column(db.Integer, db.ForeignKey('plan_cuentas.id_cuenta'), nullable=True)
+    cuenta = db.Column(db.String(100), nullable=False)  # nombre de la cuenta (desnormalizado)
     debe = db.Column(db.Numeric, default=0)
     haber = db.Column(db.Numeric, default=0)
 
+    __table_args__ = (
+        db.Index('ix_movimientos_empresa_cuenta', 'id_empresa', 'id_cuenta'),
+    )
+
     def to_dict(self):
         return {
             'id_movimiento': self.id_movimiento,
+            'id_cuenta': self.id_cuenta,
             'cuenta': self.cuenta,
             'debe': float(self.debe),
             'haber': float(self.haber)
         }
 
+class SaldoCuenta(db.Model):
+    """
+    Saldo acumulado (debe - haber) por empresa y cuenta. Se actualiza en la misma
+    transacción en la que se insertan los MovimientoContable (ver contabilidad_service).
+    """
+    __tablename__ = 'saldos_cuenta'
+    id_empresa = db.Column(db.Integer, db.ForeignKey('empresa.id_empresa'), primary_key=True)
+    cuenta = db.Column(db.String(100), primary_key=True)
+    saldo = db.Column(db.Numeric, nullable=False, default=0)
+    updated_at = db.Column(db.TIMESTAMP, default=db.func.current_timestamp(), onupdate=db.func.current_timestamp())
+
+    def to_dict(self):
+        return {
+            'cuenta': self.cuenta,
+            'saldo': float(self.saldo or 0)
+        }
+
+class FlujoCajaDiario(db.Model):
+    """
+    Rollup diario de la cuenta Caja (ingresos = debe, egresos = haber) por empresa.
+    Se mantiene al postear asientos y alimenta los gráficos de flujo de caja.
+    """
+    __tablename__ = 'flujo_caja_diario'
+    id_empresa = db.Column(db.Integer, db.ForeignKey('empresa.id_empresa'), primary_key=True)
+    fecha = db.Column(db.Date, primary_key=True)
+    ingresos = db.Column(db.Numeric, nullable=False, default=0)
+    egresos = db.Column(db.Numeric, nullable=False, default=0)
+
+    def to_dict(self):
+        return {
+            'fecha': self.fecha.isoformat() if self.fecha else None,
+            'ingresos': float(self.ingresos or 0),
+            'egresos': float(self.egresos or 0)
+        }
+
 class MovimientoAdmin(db.Model):
     __tablename__ = 'movimientos_admin'
     id = db.Column(db.Integer, primary_key=True)
@@ -426,3 +531,108 @@ class MovimientoAdmin(db.Model):
             'id_usuario': self.id_usuario,
             'usuario_nombre': self.usuario.nombre_usuario if self.usuario else None
         }
+
+class ClaveIdempotencia(db.Model):
+    """
+    Idempotency-Key de POST /api/pagos/ y POST /api/creditos/.
+    Guarda la respuesta de la primera ejecución para devolverla en los reintentos.
+    id_empresa = 0 para usuarios globales (sin empresa).
+    """
+    __tablename__ = 'claves_idempotencia'
+    clave = db.Column(db.String(100), primary_key=True)
+    id_empresa = db.Column(db.Integer, primary_key=True)
+    endpoint = db.Column(db.String(100), nullable=False)
+    hash_solicitud = db.Column(db.String(64), nullable=False)
+    estado = db.Column(db.String(20), nullable=False, default='EN_PROCESO')  # EN_PROCESO | COMPLETADO
+    status_code = db.Column(db.Integer)
+    respuesta = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=db.func.current_timestamp())
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+
+class ImportacionPagos(db.Model):
+    """
+    Importación de un archivo de pagos (cobradores/bancos). Se actualiza en la
+    misma transacción que cada bloque de pagos: filas_procesadas indica desde
+    dónde reanudar si la importación se interrumpe.
+    """
+    __tablename__ = 'importaciones_pagos'
+    id_importacion = db.Column(db.Integer, primary_key=True)
+    id_empresa = db.Column(db.Integer, db.ForeignKey('empresa.id_empresa'), nullable=False)
+    id_usuario = db.Column(db.Integer, db.ForeignKey('usuarios.id_usuario'))
+    nombre_archivo = db.Column(db.String(255))
+    estado = db.Column(db.String(20), nullable=False, default='EN_PROCESO')  # EN_PROCESO | COMPLETADO | FALLIDO
+    filas_procesadas = db.Column(db.Integer, nullable=False, default=0)
+    pagos_aplicados = db.Column(db.Integer, nullable=False, default=0)
+    filas_omitidas = db.Column(db.Integer, nullable=False, default=0)
+    filas_con_error = db.Column(db.Integer, nullable=False, default=0)
+    monto_aplicado = db.Column(db.Numeric(15, 2), nullable=False, default=0)
+    errores = db.Column(db.Text)  # JSON: [{"fila": n, "error": "..."}] (primeros MAX_ERRORES)
+    created_at = db.Column(db.DateTime, default=db.func.current_timestamp())
+    updated_at = db.Column(db.DateTime, default=db.func.current_timestamp(), onupdate=db.func.current_timestamp())
+
+    def to_dict(self):
+        return {
+            'id_importacion': self.id_importacion,
+            'nombre_archivo': self.nombre_archivo,
+            'estado': self.estado,
+            'filas_procesadas': self.filas_procesadas,
+            'pagos_aplicados': self.pagos_aplicados,
+            'filas_omitidas': self.filas_omitidas,
+            'filas_con_error': self.filas_con_error,
+            'monto_aplicado': float(self.monto_aplicado or 0),
+            'errores': json.loads(self.errores) if self.errores else [],
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+        }
+
+class EventoOutbox(db.Model):
+    """
+    Outbox transaccional: eventos de auditoría escritos en la misma transacción
+    que la operación que los origina. El relay (outbox_service) los vuelca en
+    lotes a su tabla destino y los borra; si el proceso se reinicia, los
+    pendientes siguen aquí (entrega al menos una vez).
+    """
+    __tablename__ = 'outbox_eventos'
+    id_evento = db.Column(db.BigInteger().with_variant(db.Integer, 'sqlite'), primary_key=True)
+    tipo = db.Column(db.String(30), nullable=False)
+    payload = db.Column(db.Text, nullable=False)  # JSON con las columnas del registro destino
+    intentos = db.Column(db.Integer, nullable=False, default=0)
+    ultimo_error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=db.func.current_timestamp())
+
+class CierrePeriodo(db.Model):
+    """
+    Mes contable cerrado (periodo = primer día del mes). Los cierres son
+    consecutivos y no se aceptan asientos con fecha dentro de un mes cerrado.
+    """
+    __tablename__ = 'cierres_periodo'
+    id_empresa = db.Column(db.Integer, db.ForeignKey('empresa.id_empresa'), primary_key=True)
+    periodo = db.Column(db.Date, primary_key=True)
+    id_usuario = db.Column(db.Integer, db.ForeignKey('usuarios.id_usuario'))
+    cerrado_at = db.Column(db.DateTime, default=db.func.current_timestamp())
+
+    def to_dict(self):
+        return {
+            'periodo': self.periodo.strftime('%Y-%m') if self.periodo else None,
+            'id_usuario': self.id_usuario,
+            'cerrado_at': self.cerrado_at.isoformat() if self.cerrado_at else None
+        }
+
+class SaldoCierre(db.Model):
+    """
+    Foto de cada cuenta al cierre de un período: debe y haber acumulados desde
+    el primer asiento. Los balances a una fecha parten de la foto más cercana.
+    """
+    __tablename__ = 'saldos_cierre'
+    id_empresa = db.Column(db.Integer, primary_key=True)
+    periodo = db.Column(db.Date, primary_key=True)
+    id_cuenta = db.Column(db.Integer, db.ForeignKey('plan_cuentas.id_cuenta'), primary_key=True)
+    debe = db.Column(db.Numeric(18, 2), nullable=False, default=0)
+    haber = db.Column(db.Numeric(18, 2), nullable=False, default=0)
+
+    __table_args__ = (
+        db.ForeignKeyConstraint(
+            ['id_empresa', 'periodo'], ['cierres_periodo.id_empresa', 'cierres_periodo.periodo'],
+            ondelete='CASCADE'
+        ),
+    )
@@ -0,0 +1,171 @@
+# app/services/amortizacion.py
+"""
+Motor de amortización en centavos (enteros).
+
+Modelo de Negocio "José":
+  Interés Total = Monto * (Tasa / 100)
+  Deuda Final   = Monto + Interés Total
+
+Todos los importes se calculan en centavos y los residuos de la división se
+reparten de forma determinista (un centavo más en las primeras cuotas), de modo
+que la suma de las cuotas es exactamente la deuda total, la suma de capitales el
+monto y la suma de intereses el interés total.
+"""
+from array import array
+from datetime import date, timedelta
+from decimal import Decimal, ROUND_HALF_UP
+from operator import sub
+
+
+def a_centavos(valor):
+    """Convierte un importe (float, str, Decimal) a centavos, redondeando half-up."""
+    return int((Decimal(str(valor)) * 100).quantize(Decimal(1), rounding=ROUND_HALF_UP))
+
+
+def a_decimal(centavos):
+    return Decimal(centavos).scaleb(-2)
+
+
+def _repartir(total, partes):
+    """Reparte `total` centavos en `partes` enteros; las primeras absorben el residuo."""
+    base, resto = divmod(total, partes)
+    return [base + 1] * resto + [base] * (partes - resto)
+
+
+def fecha_primer_vencimiento(fecha_primer_pago=None, dias_intervalo=7):
+    """Fecha de la cuota 1: la indicada (date o YYYY-MM-DD) o hoy + un intervalo."""
+    if isinstance(fecha_primer_pago, date):
+        return fecha_primer_pago
+    if fecha_primer_pago and str(fecha_primer_pago).strip():
+        try:
+            return date.fromisoformat(str(fecha_primer_pago).strip())
+        except ValueError:
+            pass
+    return date.today() + timedelta(days=int(dias_intervalo or 7))
+
+
+class Plan:
+    """
+    Plan de pagos compacto: importes en centavos y columnas como array('q').
+    Las fechas se derivan de fecha_inicio + dias_intervalo * i al recorrerlo.
+    """
+    __slots__ = (
+        "monto", "tasa", "interes", "total", "cuotas", "valor_cuota",
+        "fecha_inicio", "dias_intervalo", "montos", "capitales", "intereses"
+    )
+
+    def __init__(self, monto, tasa, interes, valor_cuota, fecha_inicio, dias_intervalo, montos, intereses):
+        self.monto = monto
+        self.tasa = tasa
+        self.interes = interes
+        self.total = monto + interes
+        self.cuotas = len(montos)
+        self.valor_cuota = valor_cuota
+        self.fecha_inicio = fecha_inicio
+        self.dias_intervalo = dias_intervalo
+        self.montos = array("q", montos)
+        self.intereses = array("q", intereses)
+        self.capitales = array("q", map(sub, montos, intereses))
+
+    def vencimiento(self, i):
+        return self.fecha_inicio + timedelta(days=self.dias_intervalo * i)
+
+    def filas(self):
+        """(numero_cuota, monto, capital, interes, fecha_vencimiento) con importes en centavos."""
+        for i in range(self.cuotas):
+            yield i + 1, self.montos[i], self.capitales[i], self.intereses[i], self.vencimiento(i)
+
+    def resumen(self):
+        return {
+            "monto_solicitado": self.monto / 100,
+            "tasa_usada": float(self.tasa),
+            "interes_total": self.interes / 100,
+            "monto_total": self.total / 100,
+            "cuotas": self.cuotas,
+            "valor_cuota": self.valor_cuota / 100,
+        }
+
+    def to_dict(self):
+        """Formato de respuesta de /api/creditos/preview."""
+        data = self.resumen()
+        data["plan"] = [
+            {
+                "numero_cuota": n,
+                "monto_cuota": m / 100,
+                "capital_cuota": c / 100,
+                "interes_cuota": i / 100,
+                "cuota_total": m / 100,
+                "fecha_vencimiento": f.isoformat()
+            }
+            for n, m, c, i, f in self.filas()
+        ]
+        return data
+
+
+def generar_plan(monto, cuotas, tasa_porcentaje, dias_intervalo=7, fecha_primer_pago=None,
+                 usar_redondeo=False, monto_redondeado=0):
+    """
+    Genera el plan de pagos. Lanza ValueError si los datos no permiten un plan
+    válido (montos/cuotas no positivos, o cuota redondeada mayor que la deuda
+    o que deje alguna cuota sin cubrir su interés).
+
+    - Estándar: la deuda y el interés se reparten en partes iguales.
+    - usar_redondeo: las cuotas 2..N valen monto_redondeado y la cuota 1 absorbe
+      la diferencia; el interés se mantiene repartido en partes iguales.
+    """
+    monto_c, tasa, cuotas, interes_c, fija_c, valor_cuota = _totales(
+        monto, cuotas, tasa_porcentaje, usar_redondeo, monto_redondeado
+    )
+    total_c = monto_c + interes_c
+    dias = int(dias_intervalo or 7)
+    inicio = fecha_primer_vencimiento(fecha_primer_pago, dias)
+
+    if fija_c > 0:
+        montos = [total_c - fija_c * (cuotas - 1)] + [fija_c] * (cuotas - 1)
+    else:
+        montos = _repartir(total_c, cuotas)
+
+    return Plan(monto_c, tasa, interes_c, valor_cuota, inicio, dias, montos, _repartir(interes_c, cuotas))
+
+
+def _totales(monto, cuotas, tasa_porcentaje, usar_redondeo=False, monto_redondeado=0):
+    """Cálculos O(1) del plan: (monto, tasa, cuotas, interes, cuota_fija, valor_cuota)."""
+    cuotas = int(cuotas)
+    monto_c = a_centavos(monto)
+    if monto_c <= 0 or cuotas <= 0:
+        raise ValueError("Monto y cuotas deben ser mayores a 0")
+
+    tasa = Decimal(str(tasa_porcentaje or 0))
+    interes_c = int((monto_c * tasa / 100).quantize(Decimal(1), rounding=ROUND_HALF_UP))
+    total_c = monto_c + interes_c
+
+    fija_c = a_centavos(monto_redondeado or 0) if usar_redondeo else 0
+    if fija_c > 0:
+        primera_c = total_c - fija_c * (cuotas - 1)
+        if primera_c <= 0:
+            raise ValueError("La cuota redondeada supera la deuda total")
+        # Ninguna cuota puede quedar con capital negativo: cada una debe cubrir
+        # su parte del interés (la de _repartir, las primeras con un centavo más)
+        base, resto = divmod(interes_c, cuotas)
+        if primera_c < base + (resto > 0) or (cuotas > 1 and fija_c < base + (resto > 1)):
+            raise ValueError("La cuota redondeada no cubre el interés de cada cuota")
+        valor_cuota = fija_c
+    else:
+        # Cuota de referencia: deuda / cuotas redondeada half-up (como el cálculo original)
+        valor_cuota = (2 * total_c + cuotas) // (2 * cuotas)
+    return monto_c, tasa, cuotas, interes_c, fija_c, valor_cuota
+
+
+def resumen_plan(monto, cuotas, tasa_porcentaje, usar_redondeo=False, monto_redondeado=0):
+    """Totales del plan (mismo formato que Plan.resumen) sin generar las cuotas."""
+    monto_c, tasa, cuotas, interes_c, _, valor_cuota = _totales(
+        monto, cuotas, tasa_porcentaje, usar_redondeo, monto_redondeado
+    )
+    return {
+        "monto_solicitado": monto_c / 100,
+        "tasa_usada": float(tasa),
+        "interes_total": interes_c / 100,
+        "monto_total": (monto_c + interes_c) / 100,
+        "cuotas": cuotas,
+        "valor_cuota": valor_cuota / 100,
+    }
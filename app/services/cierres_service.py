@@ -0,0 +1,199 @@
+# app/services/cierres_service.py
+"""
+Cierre de períodos contables y balances a fecha.
+
+Cerrar un mes guarda en saldos_cierre el debe y haber acumulados de cada
+cuenta: la foto del mes anterior más los movimientos del mes. Desde entonces
+postear_asiento rechaza asientos con fecha en ese mes o antes.
+
+Los balances a una fecha toman la foto del último mes cerrado que termina
+antes de esa fecha y solo suman los movimientos posteriores, en vez de
+agregar todo el libro.
+"""
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+from sqlalchemy import func, insert
+
+from app.extensions import db
+from app.models.catalog import AsientoContable, MovimientoContable, CuentaContable, CierrePeriodo, SaldoCierre
+from app.services.contabilidad_service import mes_siguiente, LOCK_CIERRES
+from app.utils.sql import advisory_xact_lock
+
+
+class CierreError(Exception):
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.message = message
+        self.status = status
+
+
+def parse_periodo(valor):
+    """'YYYY-MM' -> date del primer día del mes. Lanza ValueError si es inválido."""
+    try:
+        return datetime.strptime((valor or "").strip(), "%Y-%m").date()
+    except ValueError:
+        raise ValueError("El período debe tener formato YYYY-MM")
+
+
+def _ultimo_cierre(id_empresa):
+    return db.session.query(func.max(CierrePeriodo.periodo))\
+        .filter(CierrePeriodo.id_empresa == id_empresa).scalar()
+
+
+def _movimientos(id_empresa, desde, hasta):
+    """{id_cuenta: [debe, haber]} de los asientos con desde <= fecha < hasta (desde None = sin límite)."""
+    query = db.session.query(
+        MovimientoContable.id_cuenta,
+        func.coalesce(func.sum(MovimientoContable.debe), 0),
+        func.coalesce(func.sum(MovimientoContable.haber), 0)
+    ).join(AsientoContable, AsientoContable.id_asiento == MovimientoContable.id_asiento)\
+     .filter(
+        MovimientoContable.id_empresa == id_empresa,
+        MovimientoContable.id_cuenta.isnot(None),
+        AsientoContable.fecha < hasta
+    )
+    if desde is not None:
+        query = query.filter(AsientoContable.fecha >= desde)
+    return {
+        id_cuenta: [Decimal(str(debe)), Decimal(str(haber))]
+        for id_cuenta, debe, haber in query.group_by(MovimientoContable.id_cuenta)
+    }
+
+
+def _foto(id_empresa, periodo):
+    rows = db.session.query(SaldoCierre.id_cuenta, SaldoCierre.debe, SaldoCierre.haber)\
+        .filter(SaldoCierre.id_empresa == id_empresa, SaldoCierre.periodo == periodo)
+    return {id_cuenta: [Decimal(str(debe)), Decimal(str(haber))] for id_cuenta, debe, haber in rows}
+
+
+def _sumar(base, delta):
+    total = defaultdict(lambda: [Decimal(0), Decimal(0)])
+    for origen in (base, delta):
+        for id_cuenta, (debe, haber) in origen.items():
+            total[id_cuenta][0] += debe
+            total[id_cuenta][1] += haber
+    return total
+
+
+def cerrar_periodo(id_empresa, periodo, id_usuario=None, hoy=None):
+    """
+    Cierra el mes `periodo` (date del primer día). Los cierres son consecutivos
+    y solo se cierran meses terminados. No hace commit. Devuelve el CierrePeriodo.
+    """
+    hoy = hoy or date.today()
+    fin = mes_siguiente(periodo)
+    if fin > hoy:
+        raise CierreError("Solo se pueden cerrar meses ya terminados")
+    # Exclusivo: espera a los asientos en curso (lock compartido) y a otro cierre
+    advisory_xact_lock(LOCK_CIERRES, id_empresa)
+
+    ultimo = _ultimo_cierre(id_empresa)
+    if ultimo is not None and periodo <= ultimo:
+        raise CierreError(f"El período {periodo.strftime('%Y-%m')} ya está cerrado", 409)
+    if ultimo is not None and periodo != mes_siguiente(ultimo):
+        raise CierreError(f"Debe cerrar primero {mes_siguiente(ultimo).strftime('%Y-%m')}")
+
+    # Foto anterior + movimientos del mes; en el primer cierre, todo lo anterior al fin de mes
+    if ultimo is None:
+        acumulado = _movimientos(id_empresa, None, fin)
+    else:
+        acumulado = _sumar(_foto(id_empresa, ultimo), _movimientos(id_empresa, periodo, fin))
+
+    cierre = CierrePeriodo(id_empresa=id_empresa, periodo=periodo, id_usuario=id_usuario)
+    db.session.add(cierre)
+    db.session.flush()
+    if acumulado:
+        db.session.execute(insert(SaldoCierre), [
+            {"id_empresa": id_empresa, "periodo": periodo, "id_cuenta": id_cuenta, "debe": debe, "haber": haber}
+            for id_cuenta, (debe, haber) in sorted(acumulado.items())
+        ])
+    return cierre
+
+
+def reabrir_periodo(id_empresa, periodo):
+    """Reabre el último mes cerrado (borra su foto). No hace commit."""
+    advisory_xact_lock(LOCK_CIERRES, id_empresa)
+    ultimo = _ultimo_cierre(id_empresa)
+    if ultimo is None or periodo != ultimo:
+        raise CierreError("Solo se puede reabrir el último período cerrado")
+    SaldoCierre.query.filter_by(id_empresa=id_empresa, periodo=periodo).delete(synchronize_session=False)
+    CierrePeriodo.query.filter_by(id_empresa=id_empresa, periodo=periodo).delete(synchronize_session=False)
+
+
+def saldos_a_fecha(id_empresa, fecha):
+    """
+    {id_cuenta: [debe, haber]} acumulados hasta `fecha` inclusive: foto del
+    último cierre que termina antes de la fecha + movimientos posteriores.
+    """
+    limite = fecha + timedelta(days=1)
+    candidatos = db.session.query(CierrePeriodo.periodo)\
+        .filter(CierrePeriodo.id_empresa == id_empresa, CierrePeriodo.periodo <= fecha)\
+        .order_by(CierrePeriodo.periodo.desc()).limit(2).all()
+    foto = next((p for (p,) in candidatos if mes_siguiente(p) <= limite), None)
+    if foto is None:
+        return _movimientos(id_empresa, None, limite)
+    return _sumar(_foto(id_empresa, foto), _movimientos(id_empresa, mes_siguiente(foto), limite))
+
+
+def _cuentas(id_empresa, ids):
+    if not ids:
+        return []
+    return db.session.query(CuentaContable.id_cuenta, CuentaContable.nombre, CuentaContable.tipo)\
+        .filter(CuentaContable.id_empresa == id_empresa, CuentaContable.id_cuenta.in_(ids))\
+        .order_by(CuentaContable.nombre).all()
+
+
+def balance_comprobacion(id_empresa, fecha):
+    """Balance de comprobación de sumas y saldos a `fecha`."""
+    acumulado = saldos_a_fecha(id_empresa, fecha)
+    cuentas, totales = [], defaultdict(Decimal)
+    for id_cuenta, nombre, tipo in _cuentas(id_empresa, list(acumulado)):
+        debe, haber = acumulado[id_cuenta]
+        saldo = debe - haber
+        fila = {
+            "id_cuenta": id_cuenta, "cuenta": nombre, "tipo": tipo,
+            "debe": debe, "haber": haber,
+            "saldo_deudor": saldo if saldo > 0 else Decimal(0),
+            "saldo_acreedor": -saldo if saldo < 0 else Decimal(0),
+        }
+        for clave in ("debe", "haber", "saldo_deudor", "saldo_acreedor"):
+            totales[clave] += fila[clave]
+        cuentas.append({k: float(v) if isinstance(v, Decimal) else v for k, v in fila.items()})
+    return {
+        "fecha": fecha.isoformat(),
+        "cuentas": cuentas,
+        "totales": {k: float(v) for k, v in totales.items()},
+        "cuadra": totales["debe"] == totales["haber"],
+    }
+
+
+def balance_general(id_empresa, fecha):
+    """
+    Balance general a `fecha`: activo, pasivo y patrimonio por cuenta, con el
+    resultado acumulado (ingresos - gastos) dentro del patrimonio.
+    """
+    acumulado = saldos_a_fecha(id_empresa, fecha)
+    secciones = {"ACTIVO": [], "PASIVO": [], "PATRIMONIO": []}
+    totales = defaultdict(Decimal)
+    for id_cuenta, nombre, tipo in _cuentas(id_empresa, list(acumulado)):
+        debe, haber = acumulado[id_cuenta]
+        saldo = debe - haber if tipo in ("ACTIVO", "GASTO") else haber - debe
+        totales[tipo] += saldo
+        if tipo in secciones and saldo != 0:
+            secciones[tipo].append({"id_cuenta": id_cuenta, "cuenta": nombre, "saldo": float(saldo)})
+
+    resultado = totales["INGRESO"] - totales["GASTO"]
+    patrimonio = totales["PATRIMONIO"] + resultado
+    return {
+        "fecha": fecha.isoformat(),
+        "activo": {"cuentas": secciones["ACTIVO"], "total": float(totales["ACTIVO"])},
+        "pasivo": {"cuentas": secciones["PASIVO"], "total": float(totales["PASIVO"])},
+        "patrimonio": {
+            "cuentas": secciones["PATRIMONIO"],
+            "resultado_acumulado": float(resultado),
+            "total": float(patrimonio),
+        },
+        "cuadra": totales["ACTIVO"] == totales["PASIVO"] + patrimonio,
+    }
@@ -0,0 +1,446 @@
+# app/services/contabilidad_service.py
+import threading
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+from sqlalchemy import func, select, case, insert, event
+from sqlalchemy.orm import Session
+
+from app.extensions import db
+from app.models.catalog import (
+    AsientoContable, MovimientoContable, SaldoCuenta, FlujoCajaDiario, CuentaContable, CierrePeriodo
+)
+from app.utils.sql import upsert, advisory_xact_lock_shared
+
+CUENTA_CAJA = 'Caja'
+
+TIPOS_CUENTA = ('ACTIVO', 'PASIVO', 'PATRIMONIO', 'INGRESO', 'GASTO')
+
+# Cuentas que usa el sistema; el resto se clasifica por palabras clave del nombre
+CUENTAS_BASE = {
+    'Caja': 'ACTIVO',
+    'Cuentas por Cobrar': 'ACTIVO',
+    'Intereses por Cobrar': 'ACTIVO',
+    'Ganancias por Intereses': 'INGRESO',
+    'Capital Propio': 'PATRIMONIO',
+}
+_PALABRAS_TIPO = (
+    ('GASTO', ('gasto', 'costo', 'egreso')),
+    ('INGRESO', ('ganancia', 'ingreso', 'venta')),
+    ('PATRIMONIO', ('capital', 'patrimonio', 'resultado')),
+    ('PASIVO', ('por pagar', 'deuda', 'proveedor')),
+)
+
+# Advisory lock de cierres (clase; el id_empresa es el recurso): los asientos toman
+# el compartido y cerrar/reabrir un período el exclusivo
+LOCK_CIERRES = 4102
+
+# (id_empresa, nombre) -> id_cuenta, solo cuentas ya confirmadas en la base
+_ids_cuenta = {}
+_ids_lock = threading.Lock()
+
+
+class PeriodoCerrado(Exception):
+    def __init__(self, message):
+        super().__init__(message)
+        self.message = message
+
+
+def _decimal(valor):
+    return Decimal(str(valor or 0))
+
+
+def verificar_periodo_abierto(id_empresa, fecha):
+    """
+    Lanza PeriodoCerrado si `fecha` cae en un mes ya cerrado. Antes de leer el
+    último cierre toma el lock compartido de cierres, que se mantiene hasta el
+    commit: un cierre concurrente espera a que el asiento se confirme y lo
+    incluye en su foto, o el asiento espera al cierre y ve el período cerrado.
+    """
+    advisory_xact_lock_shared(LOCK_CIERRES, id_empresa)
+    dia = fecha.date() if isinstance(fecha, datetime) else fecha
+    ultimo = ultimo_periodo_cerrado(id_empresa)
+    if ultimo is not None and dia < mes_siguiente(ultimo):
+        raise PeriodoCerrado(f"El período {ultimo.strftime('%Y-%m')} está cerrado; no se admiten asientos hasta esa fecha")
+
+
+def ultimo_periodo_cerrado(id_empresa):
+    """Primer día del último mes cerrado de la empresa, o None."""
+    return db.session.query(func.max(CierrePeriodo.periodo))\
+        .filter(CierrePeriodo.id_empresa == id_empresa).scalar()
+
+
+def mes_siguiente(periodo):
+    return date(periodo.year + periodo.month // 12, periodo.month % 12 + 1, 1)
+
+
+def tipo_cuenta(nombre):
+    """Tipo inferido para una cuenta nueva: cuentas del sistema o palabras clave del nombre."""
+    if nombre in CUENTAS_BASE:
+        return CUENTAS_BASE[nombre]
+    texto = nombre.lower()
+    for tipo, palabras in _PALABRAS_TIPO:
+        if any(p in texto for p in palabras):
+            return tipo
+    return 'ACTIVO'
+
+
+def ids_cuentas(id_empresa, nombres):
+    """
+    {nombre: id_cuenta} para las cuentas de la empresa; crea en plan_cuentas las
+    que no existen (INSERT ... ON CONFLICT DO NOTHING). Los ids se cachean por
+    proceso recién cuando la transacción que los leyó hace commit, para no
+    cachear cuentas creadas en una transacción que luego se revierte.
+    """
+    nombres = set(nombres)
+    with _ids_lock:
+        ids = {n: _ids_cuenta[(id_empresa, n)] for n in nombres if (id_empresa, n) in _ids_cuenta}
+    faltantes = nombres - ids.keys()
+    if not faltantes:
+        return ids
+
+    def leer(cuentas):
+        return dict(db.session.query(CuentaContable.nombre, CuentaContable.id_cuenta).filter(
+            CuentaContable.id_empresa == id_empresa, CuentaContable.nombre.in_(cuentas)
+        ).all())
+
+    leidos = leer(faltantes)
+    nuevas = faltantes - leidos.keys()
+    if nuevas:
+        db.session.execute(upsert(CuentaContable).values([
+            {"id_empresa": id_empresa, "nombre": nombre, "tipo": tipo_cuenta(nombre)}
+            for nombre in sorted(nuevas)
+        ]).on_conflict_do_nothing())
+        leidos.update(leer(nuevas))
+
+    pendientes = db.session.info.setdefault("cuentas_pendientes", {})
+    pendientes.update({(id_empresa, n): i for n, i in leidos.items()})
+    ids.update(leidos)
+    return ids
+
+
+@event.listens_for(Session, "after_commit")
+def _confirmar_ids_cuenta(session):
+    pendientes = session.info.pop("cuentas_pendientes", None)
+    if pendientes:
+        with _ids_lock:
+            _ids_cuenta.update(pendientes)
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _descartar_ids_cuenta(session, transaccion):
+    session.info.pop("cuentas_pendientes", None)
+
+
+def postear_asiento(id_empresa, glosa, id_usuario, lineas, fecha=None):
+    """
+    Registra un asiento con sus movimientos y actualiza los saldos por cuenta
+    en la misma transacción. No hace commit: eso queda a cargo del endpoint.
+
+    lineas: iterable de (cuenta, debe, haber).
+    Lanza PeriodoCerrado si la fecha (o ahora) cae en un mes ya cerrado.
+    """
+    fecha = fecha or datetime.now()
+    verificar_periodo_abierto(id_empresa, fecha)
+    lineas = list(lineas)
+    asiento = AsientoContable(
+        id_empresa=id_empresa,
+        glosa=glosa,
+        id_usuario=id_usuario,
+        fecha=fecha
+    )
+    ids = ids_cuentas(id_empresa, [cuenta for cuenta, _, _ in lineas])
+    asiento.movimientos = [
+        MovimientoContable(id_empresa=id_empresa, id_cuenta=ids[cuenta], cuenta=cuenta, debe=debe, haber=haber)
+        for cuenta, debe, haber in lineas
+    ]
+    db.session.add(asiento)
+    actualizar_saldos(id_empresa, lineas)
+    actualizar_flujo_caja(id_empresa, [(asiento.fecha, lineas)])
+    return asiento
+
+
+def postear_asientos_lote(id_empresa, id_usuario, asientos, fecha=None):
+    """
+    Versión masiva de postear_asiento: inserta todos los asientos con un único
+    INSERT ... RETURNING, todos los movimientos con un INSERT multi-fila y
+    actualiza saldos y flujo de caja una sola vez. No hace commit.
+
+    asientos: lista de (glosa, lineas) o (glosa, lineas, fecha); sin fecha propia
+    se usa `fecha` (o ahora). Devuelve los id_asiento en el mismo orden.
+    Lanza PeriodoCerrado si alguna fecha cae en un mes cerrado.
+    """
+    asientos = [(a[0], list(a[1]), a[2] if len(a) > 2 else None) for a in asientos]
+    if not asientos:
+        return []
+    ahora = fecha or datetime.now()
+    asientos = [(glosa, lineas, f or ahora) for glosa, lineas, f in asientos]
+    # Los cierres son consecutivos: basta con verificar la fecha más antigua
+    verificar_periodo_abierto(id_empresa, min((f for _, _, f in asientos), key=_como_datetime))
+    cuentas = ids_cuentas(id_empresa, [linea[0] for _, lineas, _ in asientos for linea in lineas])
+
+    ids = db.session.scalars(
+        insert(AsientoContable).returning(AsientoContable.id_asiento, sort_by_parameter_order=True),
+        [
+            {"id_empresa": id_empresa, "glosa": glosa, "id_usuario": id_usuario, "fecha": f}
+            for glosa, _, f in asientos
+        ]
+    ).all()
+
+    movimientos = [
+        {
+            "id_asiento": id_asiento, "id_empresa": id_empresa, "id_cuenta": cuentas[cuenta],
+            "cuenta": cuenta, "debe": debe, "haber": haber
+        }
+        for id_asiento, (_, lineas, _) in zip(ids, asientos)
+        for cuenta, debe, haber in lineas
+    ]
+    if movimientos:
+        db.session.execute(insert(MovimientoContable), movimientos)
+
+    actualizar_saldos(id_empresa, [linea for _, lineas, _ in asientos for linea in lineas])
+    actualizar_flujo_caja(id_empresa, [(f, lineas) for _, lineas, f in asientos])
+    return ids
+
+
+def _como_datetime(fecha):
+    return fecha if isinstance(fecha, datetime) else datetime.combine(fecha, datetime.min.time())
+
+
+def actualizar_saldos(id_empresa, lineas):
+    """
+    Suma (debe - haber) de cada cuenta a saldos_cuenta con un único upsert.
+    Las cuentas se ordenan para que dos transacciones concurrentes bloqueen
+    las filas siempre en el mismo orden.
+    """
+    deltas = defaultdict(Decimal)
+    for cuenta, debe, haber in lineas:
+        deltas[cuenta] += _decimal(debe) - _decimal(haber)
+    if not deltas:
+        return
+
+    stmt = upsert(SaldoCuenta).values([
+        {"id_empresa": id_empresa, "cuenta": cuenta, "saldo": deltas[cuenta]}
+        for cuenta in sorted(deltas)
+    ])
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[SaldoCuenta.id_empresa, SaldoCuenta.cuenta],
+        set_={"saldo": SaldoCuenta.saldo + stmt.excluded.saldo, "updated_at": func.current_timestamp()}
+    )
+    db.session.execute(stmt)
+
+
+def actualizar_flujo_caja(id_empresa, asientos):
+    """
+    Acumula en flujo_caja_diario las entradas (debe) y salidas (haber) de Caja.
+    asientos: iterable de (fecha, lineas).
+    """
+    por_dia = defaultdict(lambda: [Decimal(0), Decimal(0)])
+    for fecha, lineas in asientos:
+        dia = fecha.date() if isinstance(fecha, datetime) else fecha
+        for cuenta, debe, haber in lineas:
+            if cuenta != CUENTA_CAJA:
+                continue
+            debe, haber = _decimal(debe), _decimal(haber)
+            if debe > 0:
+                por_dia[dia][0] += debe
+            if haber > 0:
+                por_dia[dia][1] += haber
+    if not por_dia:
+        return
+
+    stmt = upsert(FlujoCajaDiario).values([
+        {"id_empresa": id_empresa, "fecha": dia, "ingresos": ingresos, "egresos": egresos}
+        for dia, (ingresos, egresos) in sorted(por_dia.items())
+    ])
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[FlujoCajaDiario.id_empresa, FlujoCajaDiario.fecha],
+        set_={
+            "ingresos": FlujoCajaDiario.ingresos + stmt.excluded.ingresos,
+            "egresos": FlujoCajaDiario.egresos + stmt.excluded.egresos,
+        }
+    )
+    db.session.execute(stmt)
+
+
+def flujo_caja(id_empresa, desde, hasta):
+    """Serie diaria de Caja desde el rollup: una fila por día con movimiento."""
+    rows = FlujoCajaDiario.query.filter(
+        FlujoCajaDiario.id_empresa == id_empresa,
+        FlujoCajaDiario.fecha >= desde,
+        FlujoCajaDiario.fecha <= hasta
+    ).order_by(FlujoCajaDiario.fecha).all()
+    return [r.to_dict() for r in rows]
+
+
+def saldos(id_empresa, cuentas):
+    """Saldos (debe - haber) de las cuentas pedidas; 0 si la cuenta no tiene movimientos."""
+    rows = db.session.query(SaldoCuenta.cuenta, SaldoCuenta.saldo)\
+        .filter(SaldoCuenta.id_empresa == id_empresa, SaldoCuenta.cuenta.in_(cuentas)).all()
+    resultado = {cuenta: Decimal(0) for cuenta in cuentas}
+    resultado.update({cuenta: _decimal(saldo) for cuenta, saldo in rows})
+    return resultado
+
+
+def libro_mayor(id_empresa, desde=None, hasta=None, ids_cuenta=None, lote=1000):
+    """
+    Libro mayor por cuenta. Genera, para cada cuenta (en orden de id_cuenta):
+      {"tipo": "apertura", ...}    saldo acumulado antes de `desde`
+      {"tipo": "movimiento", ...}  una fila por movimiento, con saldo corrido
+      {"tipo": "totales", ...}     debe/haber del período y saldo final
+    El saldo corrido se calcula en SQL (SUM() OVER por cuenta) y las filas se
+    leen con un cursor del servidor (yield_per), sin cargar el período en memoria.
+    `hasta` es inclusivo.
+    """
+    cuentas_q = db.session.query(CuentaContable.id_cuenta, CuentaContable.nombre)\
+        .filter(CuentaContable.id_empresa == id_empresa)
+    if ids_cuenta:
+        cuentas_q = cuentas_q.filter(CuentaContable.id_cuenta.in_(ids_cuenta))
+    cuentas = cuentas_q.order_by(CuentaContable.id_cuenta).all()
+    if not cuentas:
+        return
+    ids = [c[0] for c in cuentas]
+
+    apertura = {}
+    if desde is not None:
+        apertura = dict(db.session.query(
+            MovimientoContable.id_cuenta,
+            func.sum(MovimientoContable.debe - MovimientoContable.haber)
+        ).join(AsientoContable)
+         .filter(
+            MovimientoContable.id_empresa == id_empresa,
+            MovimientoContable.id_cuenta.in_(ids),
+            AsientoContable.fecha < desde
+        ).group_by(MovimientoContable.id_cuenta).all())
+
+    orden = (AsientoContable.fecha, AsientoContable.id_asiento, MovimientoContable.id_movimiento)
+    stmt = select(
+        MovimientoContable.id_cuenta,
+        AsientoContable.fecha,
+        AsientoContable.id_asiento,
+        AsientoContable.glosa,
+        MovimientoContable.debe,
+        MovimientoContable.haber,
+        func.sum(MovimientoContable.debe - MovimientoContable.haber).over(
+            partition_by=MovimientoContable.id_cuenta, order_by=orden, rows=(None, 0)
+        ).label("acumulado")
+    ).join(AsientoContable, AsientoContable.id_asiento == MovimientoContable.id_asiento)\
+     .where(MovimientoContable.id_empresa == id_empresa, MovimientoContable.id_cuenta.in_(ids))\
+     .order_by(MovimientoContable.id_cuenta, *orden)
+    if desde is not None:
+        stmt = stmt.where(AsientoContable.fecha >= desde)
+    if hasta is not None:
+        stmt = stmt.where(AsientoContable.fecha < hasta + timedelta(days=1))
+
+    filas = iter(db.session.execute(stmt.execution_options(yield_per=lote)))
+    fila = next(filas, None)
+    for id_cuenta, nombre in cuentas:
+        inicial = _decimal(apertura.get(id_cuenta))
+        if inicial == 0 and (fila is None or fila.id_cuenta != id_cuenta):
+            continue  # sin saldo ni movimientos en el período
+        yield {"tipo": "apertura", "id_cuenta": id_cuenta, "cuenta": nombre,
+               "fecha": desde.isoformat() if desde else None, "saldo": float(inicial)}
+
+        debe = haber = Decimal(0)
+        saldo = inicial
+        while fila is not None and fila.id_cuenta == id_cuenta:
+            debe += _decimal(fila.debe)
+            haber += _decimal(fila.haber)
+            saldo = inicial + _decimal(fila.acumulado)
+            yield {
+                "tipo": "movimiento", "id_cuenta": id_cuenta, "cuenta": nombre,
+                "fecha": fila.fecha.isoformat() if fila.fecha else None,
+                "id_asiento": fila.id_asiento, "glosa": fila.glosa,
+                "debe": float(_decimal(fila.debe)), "haber": float(_decimal(fila.haber)),
+                "saldo": float(saldo)
+            }
+            fila = next(filas, None)
+
+        yield {"tipo": "totales", "id_cuenta": id_cuenta, "cuenta": nombre,
+               "debe": float(debe), "haber": float(haber), "saldo": float(saldo)}
+
+
+def recalcular_saldos(id_empresa=None, aplicar=True):
+    """
+    Recalcula los saldos desde movimientos_contables y los compara con saldos_cuenta.
+    Devuelve la lista de diferencias [(id_empresa, cuenta, guardado, real)].
+    Si aplicar=True, corrige las filas con diferencias.
+    """
+    # Se agrupa por el id entero y se traduce a nombre con plan_cuentas (una fila por cuenta)
+    por_cuenta = select(
+        MovimientoContable.id_cuenta,
+        func.coalesce(func.sum(MovimientoContable.debe - MovimientoContable.haber), 0).label('saldo')
+    ).where(MovimientoContable.id_cuenta.isnot(None))\
+     .group_by(MovimientoContable.id_cuenta)
+    if id_empresa is not None:
+        por_cuenta = por_cuenta.where(MovimientoContable.id_empresa == id_empresa)
+    por_cuenta = por_cuenta.subquery()
+    real_q = select(CuentaContable.id_empresa, CuentaContable.nombre, por_cuenta.c.saldo)\
+        .join(por_cuenta, por_cuenta.c.id_cuenta == CuentaContable.id_cuenta)
+    guardado_q = select(SaldoCuenta.id_empresa, SaldoCuenta.cuenta, SaldoCuenta.saldo)
+    if id_empresa is not None:
+        guardado_q = guardado_q.where(SaldoCuenta.id_empresa == id_empresa)
+
+    real = {(e, c): _decimal(s) for e, c, s in db.session.execute(real_q)}
+    guardado = {(e, c): _decimal(s) for e, c, s in db.session.execute(guardado_q)}
+
+    diferencias = []
+    for clave in sorted(set(real) | set(guardado)):
+        esperado = real.get(clave, Decimal(0))
+        actual = guardado.get(clave, Decimal(0))
+        if esperado != actual:
+            diferencias.append((clave[0], clave[1], actual, esperado))
+
+    if aplicar and diferencias:
+        stmt = upsert(SaldoCuenta).values([
+            {"id_empresa": e, "cuenta": c, "saldo": esperado}
+            for e, c, _, esperado in diferencias
+        ])
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[SaldoCuenta.id_empresa, SaldoCuenta.cuenta],
+            set_={"saldo": stmt.excluded.saldo, "updated_at": func.current_timestamp()}
+        )
+        db.session.execute(stmt)
+        db.session.commit()
+
+    return diferencias
+
+
+def reconstruir_flujo_caja(id_empresa=None, desde=None):
+    """
+    Regenera flujo_caja_diario desde asientos/movimientos (backfill o corrección).
+    Devuelve la cantidad de días escritos.
+    """
+    dia = func.date(AsientoContable.fecha)
+    query = db.session.query(
+        AsientoContable.id_empresa,
+        dia.label('fecha'),
+        func.coalesce(func.sum(case((MovimientoContable.debe > 0, MovimientoContable.debe), else_=0)), 0),
+        func.coalesce(func.sum(case((MovimientoContable.haber > 0, MovimientoContable.haber), else_=0)), 0)
+    ).join(AsientoContable)\
+     .filter(MovimientoContable.id_cuenta.in_(
+         select(CuentaContable.id_cuenta).where(CuentaContable.nombre == CUENTA_CAJA)
+     ))
+    borrar = FlujoCajaDiario.query
+    if id_empresa is not None:
+        query = query.filter(AsientoContable.id_empresa == id_empresa)
+        borrar = borrar.filter(FlujoCajaDiario.id_empresa == id_empresa)
+    if desde is not None:
+        query = query.filter(AsientoContable.fecha >= desde)
+        borrar = borrar.filter(FlujoCajaDiario.fecha >= desde)
+
+    filas = [
+        {
+            "id_empresa": e,
+            "fecha": f if isinstance(f, date) else date.fromisoformat(f),
+            "ingresos": ingresos,
+            "egresos": egresos
+        }
+        for e, f, ingresos, egresos in query.group_by(AsientoContable.id_empresa, dia).all()
+    ]
+    borrar.delete(synchronize_session=False)
+    if filas:
+        db.session.execute(FlujoCajaDiario.__table__.insert(), filas)
+    db.session.commit()
+    return len(filas)
@@ -0,0 +1,118 @@
+# app/services/dashboard_service.py
+from datetime import date, timedelta
+from sqlalchemy import func, select, true
+
+from app.extensions import db
+from app.models.catalog import Credito, DetalleCredito, MovimientoAdmin, SaldoCuenta
+from app.services.contabilidad_service import flujo_caja
+
+ESTADOS_PENDIENTES = ('PENDIENTE', 'VENCIDO')
+MAX_DIAS_GRAFICO = 3660  # ~10 años de rollup diario
+
+
+def _suma(expr, condicion=None):
+    """SUM condicional (FILTER en PostgreSQL) que nunca devuelve NULL."""
+    agregado = func.sum(expr)
+    if condicion is not None:
+        agregado = agregado.filter(condicion)
+    return func.coalesce(agregado, 0)
+
+
+def _agregados(modelo, filtros, joins=(), **metricas):
+    """
+    Construye un SELECT de una sola fila con todas las métricas de una tabla.
+    Cada métrica es una tupla (expresion, condicion) y se resuelve en la misma
+    pasada sobre la tabla gracias a los agregados condicionales.
+    """
+    columnas = [_suma(expr, cond).label(nombre) for nombre, (expr, cond) in metricas.items()]
+    stmt = select(*columnas).select_from(modelo)
+    for destino in joins:
+        stmt = stmt.join(destino)
+    return stmt.where(*filtros).subquery()
+
+
+def resumen_kpis(id_empresa):
+    """
+    Calcula todos los KPIs del dashboard en un único round trip.
+    Cada tabla se recorre una sola vez y los subselects de una fila se combinan
+    en un SELECT final.
+    """
+    admin = _agregados(
+        MovimientoAdmin,
+        [MovimientoAdmin.id_empresa == id_empresa],
+        capital_admin=(MovimientoAdmin.monto, MovimientoAdmin.tipo == 'INYECCION'),
+        retiros_socios=(MovimientoAdmin.monto, MovimientoAdmin.tipo == 'RETIRO'),
+    )
+
+    # Saldos mantenidos en saldos_cuenta (debe - haber): dos filas por clave primaria
+    contable = _agregados(
+        SaldoCuenta,
+        [
+            SaldoCuenta.id_empresa == id_empresa,
+            SaldoCuenta.cuenta.in_(['Capital Propio', 'Caja']),
+        ],
+        capital_contable=(-SaldoCuenta.saldo, SaldoCuenta.cuenta == 'Capital Propio'),
+        saldo_caja=(SaldoCuenta.saldo, SaldoCuenta.cuenta == 'Caja'),
+    )
+
+    pagada = DetalleCredito.estado_cuota == 'PAGADO'
+    pendiente = DetalleCredito.estado_cuota.in_(ESTADOS_PENDIENTES)
+    cuotas = _agregados(
+        DetalleCredito,
+        [Credito.id_empresa == id_empresa],
+        joins=(Credito,),
+        capital_recuperado=(DetalleCredito.capital_cuota, pagada),
+        por_cobrar_capital=(DetalleCredito.capital_cuota, pendiente),
+        ganancia_pendiente=(DetalleCredito.interes_cuota, pendiente),
+        ganancia_realizada=(DetalleCredito.interes_cuota, pagada),
+    )
+
+    creditos = _agregados(
+        Credito,
+        [Credito.id_empresa == id_empresa],
+        capital_prestado=(Credito.monto_solicitado, Credito.estado != 'ANULADO'),
+    )
+
+    # Cada subselect devuelve exactamente una fila: el cruce es intencional
+    origen = admin.join(contable, true()).join(cuotas, true()).join(creditos, true())
+    fila = db.session.execute(
+        select(admin, contable, cuotas, creditos).select_from(origen)
+    ).mappings().one()
+    return {k: float(v or 0) for k, v in fila.items()}
+
+
+def rango_fechas(args, dias_default):
+    """
+    Lee fecha_inicio/fecha_fin (YYYY-MM-DD) o dias desde los query params.
+    Por defecto devuelve los últimos `dias_default` días hasta hoy.
+    Lanza ValueError si los parámetros son inválidos.
+    """
+    hasta = date.fromisoformat(args["fecha_fin"]) if args.get("fecha_fin") else date.today()
+    if args.get("fecha_inicio"):
+        desde = date.fromisoformat(args["fecha_inicio"])
+    else:
+        dias = int(args.get("dias", dias_default))
+        desde = hasta - timedelta(days=dias)
+    if desde > hasta:
+        raise ValueError("fecha_inicio no puede ser posterior a fecha_fin")
+    if (hasta - desde).days > MAX_DIAS_GRAFICO:
+        raise ValueError(f"El rango máximo es de {MAX_DIAS_GRAFICO} días")
+    return desde, hasta
+
+
+def resumen_dashboard(id_empresa, desde, hasta):
+    """Payload completo de /api/dashboard/summary (KPIs + gráfico)."""
+    kpis = resumen_kpis(id_empresa)
+
+    # Capital Disponible: (Capital Inyectado Admin + Capital Contable) + (Capital Recuperado) - (Capital Prestado) - (Retiros Socios)
+    capital_inyectado = kpis["capital_admin"] + kpis["capital_contable"]
+    capital_disponible = capital_inyectado + kpis["capital_recuperado"] - kpis["capital_prestado"] - kpis["retiros_socios"]
+
+    return {
+        "capital_disponible": capital_disponible,
+        "caja_total": kpis["saldo_caja"],  # Saldo contable real de Caja
+        "por_cobrar_capital": kpis["por_cobrar_capital"],
+        "ganancia_pendiente": kpis["ganancia_pendiente"],
+        "ganancia_realizada": kpis["ganancia_realizada"],
+        "cash_flow_chart": flujo_caja(id_empresa, desde, hasta)
+    }
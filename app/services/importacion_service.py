@@ -0,0 +1,188 @@
+# app/services/importacion_service.py
+"""
+Importación de archivos CSV de pagos (cierres de cobradores / transferencias).
+
+El archivo se lee fila a fila y se procesa en bloques de `tamano_bloque`
+filas: cada bloque resuelve cuotas, formas de pago y comprobantes ya cargados
+con consultas masivas, registra los pagos con la misma lógica que
+POST /api/pagos/ y hace commit junto con el avance de la importación. Si el
+proceso se corta, se reanuda desde el último bloque confirmado.
+
+Columnas (encabezado obligatorio, separador coma o punto y coma):
+  monto                         obligatorio
+  id_detalle_credito            o bien id_credito + numero_cuota
+  comprobante_nro               opcional; si ya existe un pago activo con ese
+                                comprobante la fila se omite (reimportación segura)
+  id_forma_pago                 opcional si se indica una forma por defecto
+"""
+import csv
+import json
+from decimal import Decimal, InvalidOperation
+from itertools import islice
+
+from sqlalchemy import or_, tuple_
+
+from app.extensions import db
+from app.models.catalog import ImportacionPagos, DetalleCredito, Credito, FormaPago, Pago
+from app.services import pagos_service
+
+TAMANO_BLOQUE = 500
+MAX_ERRORES = 1000
+
+
+class FilaInvalida(Exception):
+    pass
+
+
+def iniciar_importacion(id_empresa, id_usuario, nombre_archivo):
+    importacion = ImportacionPagos(id_empresa=id_empresa, id_usuario=id_usuario, nombre_archivo=nombre_archivo)
+    db.session.add(importacion)
+    db.session.commit()
+    return importacion
+
+
+def _entero(valor):
+    valor = (valor or "").strip()
+    return int(valor) if valor else None
+
+
+def _parsear(fila, id_forma_default):
+    try:
+        monto = Decimal((fila.get("monto") or "").strip().replace(",", "."))
+    except InvalidOperation:
+        raise FilaInvalida("Monto inválido")
+    if monto <= 0:
+        raise FilaInvalida("El monto debe ser mayor a 0")
+    try:
+        id_detalle = _entero(fila.get("id_detalle_credito"))
+        id_credito = _entero(fila.get("id_credito"))
+        numero_cuota = _entero(fila.get("numero_cuota"))
+        id_forma = _entero(fila.get("id_forma_pago")) or id_forma_default
+    except ValueError:
+        raise FilaInvalida("Identificadores inválidos")
+    if id_detalle is None and (id_credito is None or numero_cuota is None):
+        raise FilaInvalida("Debe indicar id_detalle_credito o id_credito + numero_cuota")
+    if id_forma is None:
+        raise FilaInvalida("Debe indicar id_forma_pago")
+    comprobante = (fila.get("comprobante_nro") or "").strip() or None
+    return {
+        "monto": monto, "id_detalle": id_detalle, "id_credito": id_credito,
+        "numero_cuota": numero_cuota, "id_forma": id_forma, "comprobante": comprobante
+    }
+
+
+def _resolver_cuotas(id_empresa, filas):
+    """Una consulta para todas las cuotas del bloque: {id_detalle: id} y {(id_credito, numero): id}."""
+    ids = {f["id_detalle"] for f in filas if f["id_detalle"] is not None}
+    pares = {(f["id_credito"], f["numero_cuota"]) for f in filas if f["id_detalle"] is None}
+    condiciones = []
+    if ids:
+        condiciones.append(DetalleCredito.id_detalle.in_(ids))
+    if pares:
+        condiciones.append(tuple_(DetalleCredito.id_credito, DetalleCredito.numero_cuota).in_(pares))
+    if not condiciones:
+        return {}, {}
+    rows = db.session.query(DetalleCredito.id_detalle, DetalleCredito.id_credito, DetalleCredito.numero_cuota)\
+        .join(Credito, Credito.id_credito == DetalleCredito.id_credito)\
+        .filter(Credito.id_empresa == id_empresa, or_(*condiciones)).all()
+    return {r[0]: r[0] for r in rows}, {(r[1], r[2]): r[0] for r in rows}
+
+
+def _comprobantes_existentes(id_empresa, filas):
+    comprobantes = {f["comprobante"] for f in filas if f["comprobante"]}
+    if not comprobantes:
+        return set()
+    rows = db.session.query(Pago.comprobante_nro).filter(
+        Pago.id_empresa == id_empresa,
+        Pago.estado == 'ACTIVO',
+        Pago.comprobante_nro.in_(comprobantes)
+    ).all()
+    return {r[0] for r in rows}
+
+
+def _procesar_bloque(importacion, bloque, id_forma_default, formas, ip):
+    """Registra los pagos de un bloque [(numero_fila, fila_csv)]. Devuelve los errores del bloque."""
+    id_empresa = importacion.id_empresa
+    errores, validas = [], []
+    for numero, fila in bloque:
+        try:
+            validas.append((numero, _parsear(fila, id_forma_default)))
+        except FilaInvalida as e:
+            errores.append({"fila": numero, "error": str(e)})
+
+    datos = [f for _, f in validas]
+    por_id, por_par = _resolver_cuotas(id_empresa, datos)
+    existentes = _comprobantes_existentes(id_empresa, datos)
+    faltantes = {f["id_forma"] for f in datos} - set(formas)
+    if faltantes:
+        for forma in FormaPago.query.filter(
+            FormaPago.id_empresa == id_empresa, FormaPago.id_forma_pago.in_(faltantes)
+        ).all():
+            formas[forma.id_forma_pago] = forma
+
+    for numero, f in validas:
+        if f["comprobante"] and f["comprobante"] in existentes:
+            importacion.filas_omitidas += 1
+            continue
+        id_detalle = por_id.get(f["id_detalle"]) if f["id_detalle"] is not None \
+            else por_par.get((f["id_credito"], f["numero_cuota"]))
+        if id_detalle is None:
+            errores.append({"fila": numero, "error": "Cuota no encontrada o acceso denegado"})
+            continue
+        forma = formas.get(f["id_forma"])
+        if forma is None:
+            errores.append({"fila": numero, "error": "Forma de pago no encontrada"})
+            continue
+        try:
+            with db.session.begin_nested():
+                pagos_service.registrar_pago(
+                    id_empresa, importacion.id_usuario, id_detalle, forma.id_forma_pago, f["monto"],
+                    comprobante=f["comprobante"], ip=ip, forma=forma
+                )
+        except pagos_service.PagoError as e:
+            errores.append({"fila": numero, "error": e.message})
+            continue
+        importacion.pagos_aplicados += 1
+        importacion.monto_aplicado = (importacion.monto_aplicado or 0) + f["monto"]
+        if f["comprobante"]:
+            existentes.add(f["comprobante"])
+    return sorted(errores, key=lambda e: e["fila"])
+
+
+def procesar_archivo(importacion, archivo_texto, id_forma_default=None, tamano_bloque=TAMANO_BLOQUE, ip=None):
+    """
+    Procesa (o reanuda) la importación leyendo `archivo_texto` (objeto de texto
+    iterable) como CSV. Cada bloque confirma sus pagos y el avance en un commit.
+    """
+    muestra = archivo_texto.readline()
+    delimitador = ";" if muestra.count(";") > muestra.count(",") else ","
+    encabezado = next(csv.reader([muestra], delimiter=delimitador), [])
+    lector = csv.DictReader(archivo_texto, fieldnames=[c.strip().lower() for c in encabezado], delimiter=delimitador)
+
+    # Reanudación: saltear las filas ya confirmadas
+    filas = enumerate(lector, start=2)  # fila 1 = encabezado
+    for _ in islice(filas, importacion.filas_procesadas):
+        pass
+
+    errores = json.loads(importacion.errores) if importacion.errores else []
+    formas = {}
+    try:
+        while True:
+            bloque = list(islice(filas, tamano_bloque))
+            if not bloque:
+                break
+            nuevos = _procesar_bloque(importacion, bloque, id_forma_default, formas, ip)
+            importacion.filas_con_error += len(nuevos)
+            errores.extend(nuevos[:max(MAX_ERRORES - len(errores), 0)])
+            importacion.errores = json.dumps(errores, ensure_ascii=False)
+            importacion.filas_procesadas += len(bloque)
+            db.session.commit()
+    except Exception:
+        db.session.rollback()
+        importacion.estado = 'FALLIDO'
+        db.session.commit()
+        raise
+
+    importacion.estado = 'COMPLETADO'
+    db.session.commit()
+    return importacion
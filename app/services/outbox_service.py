@@ -0,0 +1,129 @@
+# app/services/outbox_service.py
+"""
+Outbox transaccional para eventos de auditoría.
+
+Las operaciones encolan el evento con `encolar()` en su propia sesión, de modo
+que se confirma (o se descarta) en el mismo commit que el pago: no hay un
+segundo commit ni se escribe la tabla de auditoría, con sus índices, en el
+camino del request. El relay (`procesar_outbox`) toma lotes con
+FOR UPDATE SKIP LOCKED (varios procesos pueden correrlo a la vez), inserta los
+registros destino y borra los eventos en una misma transacción. Si el proceso
+se corta, los eventos siguen en outbox_eventos y se entregan en la próxima
+vuelta (al menos una vez).
+"""
+import json
+import os
+from collections import defaultdict
+from datetime import datetime, date
+from decimal import Decimal
+
+from sqlalchemy import insert, delete, DateTime, Numeric
+
+from app.extensions import db
+from app.models.catalog import EventoOutbox, PagoAudit
+
+TAMANO_LOTE = int(os.getenv("OUTBOX_TAMANO_LOTE", 500))
+MAX_INTENTOS = int(os.getenv("OUTBOX_MAX_INTENTOS", 10))
+
+# tipo de evento -> modelo donde se vuelca
+DESTINOS = {
+    'PAGO_AUDIT': PagoAudit,
+}
+
+
+def _json_default(valor):
+    if isinstance(valor, (datetime, date)):
+        return valor.isoformat()
+    if isinstance(valor, Decimal):
+        return str(valor)
+    raise TypeError(f"No serializable: {type(valor).__name__}")
+
+
+def encolar(tipo, **datos):
+    """Agrega un evento a la sesión actual. No hace commit."""
+    if tipo not in DESTINOS:
+        raise ValueError(f"Tipo de evento desconocido: {tipo}")
+    db.session.add(EventoOutbox(tipo=tipo, payload=json.dumps(datos, default=_json_default)))
+
+
+def _decodificar(modelo, payload):
+    """Payload JSON -> columnas del modelo, restaurando fechas y decimales."""
+    fila = json.loads(payload)
+    columnas = modelo.__table__.columns
+    for nombre, valor in fila.items():
+        if valor is None:
+            continue
+        tipo = columnas[nombre].type
+        if isinstance(tipo, DateTime):
+            fila[nombre] = datetime.fromisoformat(valor)
+        elif isinstance(tipo, Numeric):
+            fila[nombre] = Decimal(valor)
+    return fila
+
+
+def _insertar(modelo, filas):
+    with db.session.begin_nested():
+        db.session.execute(insert(modelo), filas)
+
+
+def _fallido(evento, error):
+    evento.intentos += 1
+    evento.ultimo_error = str(error)[:1000]
+
+
+def procesar_outbox(limite=TAMANO_LOTE):
+    """
+    Entrega un lote de eventos pendientes. Devuelve la cantidad entregada.
+    Un evento que falla no bloquea al resto: suma un intento y, al llegar a
+    MAX_INTENTOS, queda en la tabla para revisión.
+    """
+    eventos = EventoOutbox.query\
+        .filter(EventoOutbox.intentos < MAX_INTENTOS)\
+        .order_by(EventoOutbox.id_evento)\
+        .limit(limite)\
+        .with_for_update(skip_locked=True).all()
+    if not eventos:
+        db.session.rollback()
+        return 0
+
+    por_tipo = defaultdict(list)
+    for evento in eventos:
+        por_tipo[evento.tipo].append(evento)
+
+    entregados = []
+    for tipo, lote in por_tipo.items():
+        modelo = DESTINOS.get(tipo)
+        if modelo is None:
+            for evento in lote:
+                _fallido(evento, f"Tipo de evento desconocido: {tipo}")
+            continue
+        try:
+            _insertar(modelo, [_decodificar(modelo, e.payload) for e in lote])
+            entregados.extend(lote)
+        except Exception:
+            # Algún evento del lote es inválido: se reintenta de a uno para aislarlo
+            for evento in lote:
+                try:
+                    _insertar(modelo, [_decodificar(modelo, evento.payload)])
+                    entregados.append(evento)
+                except Exception as e:
+                    _fallido(evento, e)
+
+    if entregados:
+        db.session.execute(
+            delete(EventoOutbox)
+            .where(EventoOutbox.id_evento.in_([e.id_evento for e in entregados]))
+            .execution_options(synchronize_session=False)
+        )
+    db.session.commit()
+    return len(entregados)
+
+
+def drenar_outbox(limite=TAMANO_LOTE):
+    """Procesa lotes hasta vaciar los pendientes entregables. Devuelve el total entregado."""
+    total = 0
+    while True:
+        entregados = procesar_outbox(limite)
+        total += entregados
+        if entregados < limite:
+            return total
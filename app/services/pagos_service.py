@@ -0,0 +1,296 @@
+# app/services/pagos_service.py
+"""
+Registro, asignación en cascada y anulación de pagos de cuotas.
+
+Cada operación bloquea el crédito y la cuota (SELECT ... FOR UPDATE, siempre en
+ese orden), aplica el monto con un UPDATE atómico y decide el estado del
+crédito con un EXISTS, sin recorrer sus cuotas. Pago y asiento quedan en la
+sesión y la auditoría se encola en el outbox: el endpoint hace un único commit.
+"""
+from datetime import datetime
+from decimal import Decimal, ROUND_HALF_UP
+
+from sqlalchemy import update, exists, case, func
+
+from app.extensions import db
+from app.models.catalog import Pago, FormaPago, DetalleCredito, Credito
+from app.services.contabilidad_service import postear_asiento
+from app.services.outbox_service import encolar
+
+CENTAVO = Decimal("0.01")
+
+
+class PagoError(Exception):
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.message = message
+        self.status = status
+
+
+def _monto(valor):
+    return Decimal(str(valor or 0)).quantize(CENTAVO, rounding=ROUND_HALF_UP)
+
+
+def bloquear_cuota(id_empresa, id_detalle):
+    """
+    Bloquea crédito y cuota de la empresa (en ese orden, para no generar deadlocks
+    entre pagos de un mismo crédito). Devuelve (credito, detalle) o lanza PagoError.
+    """
+    id_credito = db.session.query(DetalleCredito.id_credito)\
+        .filter(DetalleCredito.id_detalle == id_detalle).scalar()
+    credito = Credito.query.filter_by(id_credito=id_credito, id_empresa=id_empresa)\
+        .with_for_update().populate_existing().first() if id_credito else None
+    if not credito:
+        raise PagoError("Cuota no encontrada o acceso denegado", 404)
+    detalle = DetalleCredito.query.filter_by(id_detalle=id_detalle)\
+        .with_for_update().populate_existing().one()
+    return credito, detalle
+
+
+def interes_proporcional(detalle, monto):
+    """Parte de `monto` que corresponde a interés según la proporción de la cuota."""
+    total_esperado = _monto(detalle.cuota_total)
+    if total_esperado <= 0:
+        # Créditos antiguos o sin desglose: todo a capital
+        return Decimal(0)
+    return (monto * _monto(detalle.interes_cuota) / total_esperado).quantize(CENTAVO, rounding=ROUND_HALF_UP)
+
+
+def aplicar_monto_cuota(detalle, monto):
+    """
+    Suma (o resta, si monto < 0) al monto_pagado de la cuota con un UPDATE
+    atómico y ajusta estado_cuota en la misma sentencia.
+    """
+    nuevo = func.coalesce(DetalleCredito.monto_pagado, 0) + monto
+    if monto >= 0:
+        estado = case((nuevo >= DetalleCredito.monto_cuota, 'PAGADO'), else_=DetalleCredito.estado_cuota)
+    else:
+        estado = case(
+            ((DetalleCredito.estado_cuota == 'PAGADO') & (nuevo < DetalleCredito.monto_cuota), 'PENDIENTE'),
+            else_=DetalleCredito.estado_cuota
+        )
+    db.session.execute(
+        update(DetalleCredito)
+        .where(DetalleCredito.id_detalle == detalle.id_detalle)
+        .values(monto_pagado=nuevo, estado_cuota=estado)
+        .execution_options(synchronize_session=False)
+    )
+    db.session.expire(detalle, ["monto_pagado", "estado_cuota"])
+
+
+def actualizar_estado_credito(credito):
+    """PAGADO si no queda ninguna cuota impaga; si se reabre una cuota, vuelve a PENDIENTE."""
+    impaga = exists().where(
+        DetalleCredito.id_credito == Credito.id_credito,
+        DetalleCredito.estado_cuota != 'PAGADO'
+    )
+    db.session.execute(
+        update(Credito)
+        .where(Credito.id_credito == credito.id_credito, Credito.estado != 'ANULADO')
+        .values(estado=case(
+            (~impaga, 'PAGADO'),
+            (Credito.estado == 'PAGADO', 'PENDIENTE'),
+            else_=Credito.estado
+        ))
+        .execution_options(synchronize_session=False)
+    )
+    db.session.expire(credito, ["estado"])
+
+
+def registrar_pago(id_empresa, id_usuario, id_detalle, id_forma, monto, comprobante=None, ip=None, forma=None):
+    """
+    Registra el pago de una cuota con su asiento y evento de auditoría. No hace commit.
+    `forma` permite pasar la FormaPago ya cargada (importaciones masivas).
+    """
+    monto = _monto(monto)
+    if monto <= 0:
+        raise PagoError("El monto debe ser mayor a 0")
+
+    if forma is None:
+        forma = FormaPago.query.filter_by(id_forma_pago=id_forma, id_empresa=id_empresa).first()
+    if not forma:
+        raise PagoError("Forma de pago no encontrada", 404)
+
+    credito, detalle = bloquear_cuota(id_empresa, id_detalle)
+    if credito.estado == 'ANULADO':
+        raise PagoError("El crédito está anulado")
+
+    pago = Pago(
+        id_empresa=id_empresa,
+        id_detalle_credito=detalle.id_detalle,
+        id_forma_pago=forma.id_forma_pago,
+        id_usuario=id_usuario,
+        monto_pagado=monto,
+        fecha_pago=datetime.now(),
+        comprobante_nro=comprobante
+    )
+    db.session.add(pago)
+
+    postear_asiento(
+        id_empresa,
+        f"Pago de Cuota #{detalle.numero_cuota} - Crédito #{credito.id_credito} - {forma.nombre}",
+        id_usuario,
+        lineas_cobro(monto, interes_proporcional(detalle, monto))
+    )
+
+    aplicar_monto_cuota(detalle, monto)
+    actualizar_estado_credito(credito)
+
+    db.session.flush()  # id_pago para la auditoría
+    _auditar_creacion(id_empresa, id_usuario, [pago], comprobante, ip)
+    return pago
+
+
+def lineas_cobro(monto, interes):
+    """Asiento de cobro: entra Caja y baja Cuentas por Cobrar; el interés cobrado se devenga."""
+    lineas = [
+        ('Caja', monto, 0),
+        ('Cuentas por Cobrar', 0, monto),
+    ]
+    if interes > 0:
+        lineas.append(('Intereses por Cobrar', interes, 0))
+        lineas.append(('Ganancias por Intereses', 0, interes))
+    return lineas
+
+
+def _auditar(id_empresa, id_usuario, pago, accion, estado, ip, observacion):
+    encolar(
+        'PAGO_AUDIT',
+        id_empresa=id_empresa,
+        id_pago=pago.id_pago,
+        id_usuario=id_usuario,
+        accion=accion,
+        fecha_accion=datetime.now(),
+        monto_registrado=_monto(pago.monto_pagado),
+        id_detalle_credito=pago.id_detalle_credito,
+        estado_pago_momento=estado,
+        direccion_ip=ip,
+        observacion=observacion
+    )
+
+
+def _auditar_creacion(id_empresa, id_usuario, pagos, comprobante, ip):
+    for pago in pagos:
+        _auditar(id_empresa, id_usuario, pago, 'CREACION', 'ACTIVO', ip,
+                 f"Pago registrado vía Caja. Comprobante: {comprobante or 'N/A'}")
+
+
+def asignar_pago(id_empresa, id_usuario, id_credito, id_forma, monto, comprobante=None, ip=None):
+    """
+    Distribuye un monto entre las cuotas impagas del crédito, de la más antigua
+    a la más nueva (cascada). Crea un Pago por cuota alcanzada, con el mismo
+    desglose capital/interés que registrar_pago, y un único asiento consolidado.
+    No hace commit. Devuelve (pagos, desglose).
+    """
+    monto = _monto(monto)
+    if monto <= 0:
+        raise PagoError("El monto debe ser mayor a 0")
+
+    forma = FormaPago.query.filter_by(id_forma_pago=id_forma, id_empresa=id_empresa).first()
+    if not forma:
+        raise PagoError("Forma de pago no encontrada", 404)
+
+    credito = Credito.query.filter_by(id_credito=id_credito, id_empresa=id_empresa)\
+        .with_for_update().populate_existing().first()
+    if not credito:
+        raise PagoError("Crédito no encontrado o acceso denegado", 404)
+    if credito.estado == 'ANULADO':
+        raise PagoError("El crédito está anulado")
+
+    cuotas = DetalleCredito.query.filter(
+        DetalleCredito.id_credito == credito.id_credito,
+        DetalleCredito.estado_cuota != 'PAGADO'
+    ).order_by(DetalleCredito.fecha_vencimiento, DetalleCredito.numero_cuota)\
+     .with_for_update().populate_existing().all()
+
+    saldo_pendiente = sum(_monto(d.monto_cuota) - _monto(d.monto_pagado) for d in cuotas)
+    if monto > saldo_pendiente:
+        raise PagoError(f"El monto supera el saldo pendiente del crédito ({saldo_pendiente})")
+
+    restante, ahora = monto, datetime.now()
+    pagos, desglose, interes_total = [], [], Decimal(0)
+    for detalle in cuotas:
+        if restante <= 0:
+            break
+        aplicado = min(restante, _monto(detalle.monto_cuota) - _monto(detalle.monto_pagado))
+        if aplicado <= 0:
+            continue
+        restante -= aplicado
+        interes = interes_proporcional(detalle, aplicado)
+        interes_total += interes
+
+        pago = Pago(
+            id_empresa=id_empresa,
+            id_detalle_credito=detalle.id_detalle,
+            id_forma_pago=forma.id_forma_pago,
+            id_usuario=id_usuario,
+            monto_pagado=aplicado,
+            fecha_pago=ahora,
+            comprobante_nro=comprobante
+        )
+        pagos.append(pago)
+        desglose.append({
+            "id_detalle": detalle.id_detalle,
+            "numero_cuota": detalle.numero_cuota,
+            "monto_aplicado": float(aplicado),
+            "capital": float(aplicado - interes),
+            "interes": float(interes),
+            "cuota_saldada": aplicado == _monto(detalle.monto_cuota) - _monto(detalle.monto_pagado)
+        })
+        aplicar_monto_cuota(detalle, aplicado)
+
+    db.session.add_all(pagos)
+    numeros = ", ".join(f"#{d['numero_cuota']}" for d in desglose)
+    postear_asiento(
+        id_empresa,
+        f"Pago de Cuotas {numeros} - Crédito #{credito.id_credito} - {forma.nombre}",
+        id_usuario,
+        lineas_cobro(monto, interes_total)
+    )
+    actualizar_estado_credito(credito)
+
+    db.session.flush()  # id_pago para la auditoría
+    _auditar_creacion(id_empresa, id_usuario, pagos, comprobante, ip)
+    for pago, fila in zip(pagos, desglose):
+        fila["id_pago"] = pago.id_pago
+    return pagos, desglose
+
+
+def anular_pago(id_empresa, id_usuario, id_pago, ip=None):
+    """Anula un pago, revierte la cuota y registra el asiento de reversión. No hace commit."""
+    id_detalle = db.session.query(Pago.id_detalle_credito)\
+        .filter_by(id_pago=id_pago, id_empresa=id_empresa).scalar()
+    if id_detalle is None:
+        raise PagoError("Pago no encontrado o acceso denegado", 404)
+
+    credito, detalle = bloquear_cuota(id_empresa, id_detalle)
+    pago = Pago.query.filter_by(id_pago=id_pago).with_for_update().populate_existing().one()
+    if pago.estado == 'ANULADO':
+        raise PagoError("El pago ya está anulado")
+
+    monto = _monto(pago.monto_pagado)
+    pago.estado = 'ANULADO'
+
+    pago_interes = interes_proporcional(detalle, monto)
+    lineas = [
+        # Sale de Caja y se repone Cuentas por Cobrar
+        ('Caja', 0, monto),
+        ('Cuentas por Cobrar', monto, 0),
+    ]
+    if pago_interes > 0:
+        # El interés vuelve a estar por cobrar y deja de ser ganancia
+        lineas.append(('Intereses por Cobrar', 0, pago_interes))
+        lineas.append(('Ganancias por Intereses', pago_interes, 0))
+    postear_asiento(
+        id_empresa,
+        f"REVERSIÓN Pago #{pago.id_pago} - Cuota #{detalle.numero_cuota} - Crédito #{credito.id_credito}",
+        id_usuario,
+        lineas
+    )
+
+    aplicar_monto_cuota(detalle, -monto)
+    actualizar_estado_credito(credito)
+
+    _auditar(id_empresa, id_usuario, pago, 'ANULACION', 'ANULADO', ip,
+             "Anulación de pago realizada por el usuario.")
+    return pago
@@ -0,0 +1,138 @@
+# app/services/vencimientos_service.py
+"""
+Barrido de vencimientos: pasa a VENCIDO las cuotas PENDIENTE con
+fecha_vencimiento anterior a hoy, y a sus créditos con ellas.
+
+Cada empresa se procesa en su propia transacción, protegida por un advisory
+lock para que solo un nodo la barra a la vez: se bloquean los créditos
+afectados (solo sus ids) y se actualizan con updates por conjunto en lotes.
+"""
+import time
+from datetime import date
+
+from flask import current_app
+from sqlalchemy import select, update, exists, or_
+
+from app.extensions import db
+from app.models.catalog import Credito, DetalleCredito, Empresa
+from app.utils.sql import try_advisory_xact_lock
+
+LOCK_VENCIMIENTOS = 4101  # clave de advisory lock (clase), el id_empresa es el recurso
+
+# Métricas de la última ejecución (para logs/monitoreo)
+ultima_ejecucion = {}
+
+
+TAMANO_LOTE = 1000  # créditos por UPDATE (límite de parámetros del IN)
+
+
+def _tiene_cuota(*condiciones):
+    return exists().where(DetalleCredito.id_credito == Credito.id_credito, *condiciones)
+
+
+def _creditos_a_bloquear(id_empresa, hoy):
+    """
+    Créditos que el barrido puede tocar: vigentes con cuotas por vencer o ya
+    vencidas, o en estado VENCIDO (candidatos a regularizar).
+    """
+    return select(Credito.id_credito).where(
+        Credito.id_empresa == id_empresa,
+        Credito.estado != 'ANULADO',
+        or_(
+            Credito.estado == 'VENCIDO',
+            _tiene_cuota(DetalleCredito.estado_cuota == 'PENDIENTE', DetalleCredito.fecha_vencimiento < hoy),
+            _tiene_cuota(DetalleCredito.estado_cuota == 'VENCIDO')
+        )
+    ).order_by(Credito.id_credito).with_for_update(of=Credito)
+
+
+def _marcar_lote(ids, hoy):
+    cuotas = db.session.execute(
+        update(DetalleCredito)
+        .where(
+            DetalleCredito.id_credito.in_(ids),
+            DetalleCredito.estado_cuota == 'PENDIENTE',
+            DetalleCredito.fecha_vencimiento < hoy
+        )
+        .values(estado_cuota='VENCIDO')
+        .execution_options(synchronize_session=False)
+    ).rowcount
+
+    cuota_vencida = _tiene_cuota(DetalleCredito.estado_cuota == 'VENCIDO')
+    creditos = db.session.execute(
+        update(Credito)
+        .where(Credito.id_credito.in_(ids), Credito.estado == 'PENDIENTE', cuota_vencida)
+        .values(estado='VENCIDO')
+        .execution_options(synchronize_session=False)
+    ).rowcount
+
+    # Créditos que ya pusieron al día sus cuotas vencidas vuelven a PENDIENTE
+    regularizados = db.session.execute(
+        update(Credito)
+        .where(Credito.id_credito.in_(ids), Credito.estado == 'VENCIDO', ~cuota_vencida)
+        .values(estado='PENDIENTE')
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    return cuotas, creditos, regularizados
+
+
+def marcar_vencidos_empresa(id_empresa, hoy=None):
+    """
+    Marca los vencimientos de una empresa y hace commit.
+    Devuelve {"cuotas", "creditos", "regularizados"} o None si otro nodo tiene el lock.
+
+    Primero bloquea los créditos afectados (FOR UPDATE, por id) y recién después
+    toca sus cuotas: el mismo orden crédito -> cuota que usan los pagos
+    (pagos_service.bloquear_cuota / asignar_pago), para no generar deadlocks
+    con un cobro concurrente.
+    """
+    hoy = hoy or date.today()
+    if not try_advisory_xact_lock(LOCK_VENCIMIENTOS, id_empresa):
+        db.session.rollback()
+        return None
+
+    ids = db.session.execute(_creditos_a_bloquear(id_empresa, hoy)).scalars().all()
+    totales = [0, 0, 0]
+    for i in range(0, len(ids), TAMANO_LOTE):
+        for n, filas in enumerate(_marcar_lote(ids[i:i + TAMANO_LOTE], hoy)):
+            totales[n] += filas
+
+    db.session.commit()
+    return dict(zip(("cuotas", "creditos", "regularizados"), totales))
+
+
+def marcar_vencidos(id_empresa=None, hoy=None):
+    """
+    Barre una empresa o todas. Devuelve las métricas agregadas:
+    empresas procesadas/omitidas (lock tomado), filas tocadas y duración.
+    """
+    inicio = time.monotonic()
+    if id_empresa is not None:
+        empresas = [id_empresa]
+    else:
+        empresas = db.session.execute(select(Empresa.id_empresa).order_by(Empresa.id_empresa)).scalars().all()
+
+    metricas = {"empresas": 0, "omitidas": 0, "cuotas": 0, "creditos": 0, "regularizados": 0}
+    for empresa in empresas:
+        try:
+            resultado = marcar_vencidos_empresa(empresa, hoy=hoy)
+        except Exception:
+            db.session.rollback()
+            current_app.logger.exception("Error marcando vencidos de la empresa %s", empresa)
+            continue
+        if resultado is None:
+            metricas["omitidas"] += 1
+            continue
+        metricas["empresas"] += 1
+        for clave, valor in resultado.items():
+            metricas[clave] += valor
+
+    metricas["segundos"] = round(time.monotonic() - inicio, 3)
+    ultima_ejecucion.clear()
+    ultima_ejecucion.update(metricas, fecha=(hoy or date.today()).isoformat())
+    current_app.logger.info(
+        "Vencimientos: %(cuotas)s cuotas y %(creditos)s créditos vencidos, "
+        "%(regularizados)s regularizados en %(empresas)s empresas (%(omitidas)s omitidas) en %(segundos)ss",
+        metricas
+    )
+    return metricas
@@ -0,0 +1,156 @@
+# app/utils/access_log.py
+"""
+Escritura asíncrona del historial de accesos (login/logout).
+
+Los eventos se acumulan en un buffer circular acotado y un hilo los inserta
+en bloque cada ACCESOS_INTERVALO_MS milisegundos o apenas se juntan
+ACCESOS_LOTE eventos, así el login no espera un commit propio. Si el buffer
+se llena (ráfagas de fuerza bruta, base lenta) se descartan los eventos más
+antiguos y se cuentan en `descartados`. Si el INSERT falla, el lote vuelve al
+frente del buffer y se reintenta en la próxima vuelta. Al terminar el proceso
+se vacía lo pendiente.
+
+Si el escritor no fue iniciado (CLI, scripts) el evento se escribe en el acto.
+"""
+import atexit
+import os
+import threading
+from collections import deque
+from datetime import datetime
+
+from sqlalchemy import insert
+
+from app.extensions import db
+from app.models.catalog import HistorialAcceso
+
+CAPACIDAD = int(os.getenv("ACCESOS_BUFFER", 10000))
+TAMANO_LOTE = int(os.getenv("ACCESOS_LOTE", 500))
+INTERVALO_MS = int(os.getenv("ACCESOS_INTERVALO_MS", 200))
+
+_COLUMNAS = (
+    "id_usuario", "id_empresa", "username_intentado", "fecha_hora",
+    "evento", "ip_cliente", "user_agent", "motivo_fallo"
+)
+
+
+class EscritorAccesos:
+    def __init__(self, app, capacidad=CAPACIDAD, tamano_lote=TAMANO_LOTE, intervalo_ms=INTERVALO_MS):
+        self.app = app
+        self.tamano_lote = tamano_lote
+        self.intervalo = intervalo_ms / 1000
+        self._buffer = deque(maxlen=capacidad)
+        self._lock = threading.Lock()
+        self._despertar = threading.Event()
+        self._escritura = threading.Lock()  # un solo volcado a la vez (hilo o atexit)
+        self.encolados = 0
+        self.escritos = 0
+        self.descartados = 0
+        self.fallidos = 0
+        self._descartados_informados = 0
+        self._hilo = None
+
+    def registrar(self, fila):
+        with self._lock:
+            if len(self._buffer) == self._buffer.maxlen:
+                self.descartados += 1  # deque(maxlen) expulsa el más antiguo
+            self._buffer.append(fila)
+            self.encolados += 1
+            lleno = len(self._buffer) >= self.tamano_lote
+        if lleno:
+            self._despertar.set()
+
+    def _tomar_lote(self):
+        with self._lock:
+            n = min(len(self._buffer), self.tamano_lote)
+            return [self._buffer.popleft() for _ in range(n)]
+
+    def _devolver(self, lote):
+        """Vuelve a poner el lote al frente del buffer (sigue acotado por maxlen)."""
+        with self._lock:
+            libres = self._buffer.maxlen - len(self._buffer)
+            if len(lote) > libres:
+                # No entra todo: se conservan los más nuevos del lote y se cuentan los descartados
+                self.descartados += len(lote) - libres
+                lote = lote[len(lote) - libres:] if libres else []
+            self._buffer.extendleft(reversed(lote))
+
+    def vaciar(self):
+        """Inserta todo lo pendiente en bloques de tamano_lote. Devuelve las filas escritas."""
+        total = 0
+        with self._escritura, self.app.app_context():
+            while True:
+                lote = self._tomar_lote()
+                if not lote:
+                    return total
+                try:
+                    db.session.execute(insert(HistorialAcceso), lote)
+                    db.session.commit()
+                except Exception:
+                    db.session.rollback()
+                    self._devolver(lote)
+                    self.fallidos += len(lote)
+                    self.app.logger.exception(
+                        "No se pudieron escribir %d evento(s) de acceso; se reintentan en la próxima vuelta", len(lote)
+                    )
+                    return total
+                total += len(lote)
+                self.escritos += len(lote)
+
+    def _loop(self):
+        while True:
+            self._despertar.wait(self.intervalo)
+            self._despertar.clear()
+            try:
+                self.vaciar()
+            except Exception:
+                self.app.logger.exception("Error en el escritor de accesos")
+            if self.descartados != self._descartados_informados:
+                self.app.logger.warning(
+                    "Buffer de accesos lleno: %d evento(s) descartados en total",
+                    self.descartados
+                )
+                self._descartados_informados = self.descartados
+
+    def iniciar(self):
+        self._hilo = threading.Thread(target=self._loop, name="historial-accesos", daemon=True)
+        self._hilo.start()
+        atexit.register(self.vaciar)
+
+    def estadisticas(self):
+        with self._lock:
+            pendientes = len(self._buffer)
+        return {
+            "encolados": self.encolados,
+            "escritos": self.escritos,
+            "descartados": self.descartados,
+            "fallidos": self.fallidos,
+            "pendientes": pendientes,
+        }
+
+
+_escritor = None
+
+
+def iniciar_escritor_accesos(app):
+    global _escritor
+    _escritor = EscritorAccesos(app)
+    _escritor.iniciar()
+    return _escritor
+
+
+def get_escritor_accesos():
+    return _escritor
+
+
+def registrar_acceso(evento, **datos):
+    """
+    Registra un evento de historial_accesos (LOGIN_EXITOSO, LOGIN_FALLIDO, LOGOUT).
+    Con el escritor iniciado no toca la base de datos en el request.
+    """
+    datos.update(evento=evento, fecha_hora=datetime.now())
+    fila = {columna: datos.get(columna) for columna in _COLUMNAS}
+    if _escritor is not None:
+        _escritor.registrar(fila)
+        return
+    db.session.execute(insert(HistorialAcceso), [fila])
+    db.session.commit()
@@ -0,0 +1,157 @@
+# app/utils/idempotency.py
+"""
+Soporte de la cabecera Idempotency-Key.
+
+La clave se reserva (EN_PROCESO) en la misma transacción que el endpoint y
+la respuesta se guarda (COMPLETADO) antes de ese único commit: el commit del
+endpoint se difiere hasta entonces. Una operación confirmada siempre deja su
+respuesta guardada, y si el proceso muere antes del commit no queda ni la
+operación ni la clave. En PostgreSQL un reintento concurrente espera en el
+INSERT de la reserva hasta que la primera transacción termine y luego recibe
+la respuesta guardada sin volver a ejecutar el endpoint (ni tocar la
+contabilidad).
+
+Las claves vencen a las IDEMPOTENCIA_TTL_HORAS y se purgan con
+`flask mantenimiento purgar-idempotencia` (o la tarea periódica).
+"""
+import hashlib
+import os
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from functools import wraps
+
+from flask import request, jsonify, make_response, current_app
+from flask_jwt_extended import get_jwt
+from sqlalchemy import delete, update, select
+
+from app.extensions import db
+from app.models.catalog import ClaveIdempotencia
+from app.utils.sql import upsert
+
+HEADER = "Idempotency-Key"
+TTL_HORAS = int(os.getenv("IDEMPOTENCIA_TTL_HORAS", 24))
+MAX_LARGO_CLAVE = 100
+
+
+def _hash_solicitud():
+    h = hashlib.sha256()
+    h.update(f"{request.method} {request.path}\n".encode())
+    h.update(request.get_data() or b"")
+    return h.hexdigest()
+
+
+def _insertar(clave, id_empresa, hash_solicitud, **campos):
+    """INSERT ... ON CONFLICT DO NOTHING sin commit: True si insertó la fila."""
+    ahora = datetime.now()
+    stmt = upsert(ClaveIdempotencia).values(
+        clave=clave, id_empresa=id_empresa, endpoint=request.path[:100],
+        hash_solicitud=hash_solicitud, created_at=ahora,
+        expires_at=ahora + timedelta(hours=TTL_HORAS), **campos
+    ).on_conflict_do_nothing()
+    return db.session.execute(stmt).rowcount == 1
+
+
+def _reservar(clave, id_empresa, hash_solicitud):
+    """
+    Reserva la clave en la transacción actual. Si existe vencida (aún no
+    purgada) la reemplaza. Devuelve True si esta solicitud la reservó.
+    """
+    if _insertar(clave, id_empresa, hash_solicitud, estado='EN_PROCESO'):
+        return True
+    vencida = db.session.execute(delete(ClaveIdempotencia).where(
+        ClaveIdempotencia.clave == clave,
+        ClaveIdempotencia.id_empresa == id_empresa,
+        ClaveIdempotencia.expires_at <= datetime.now()
+    )).rowcount
+    return bool(vencida) and _insertar(clave, id_empresa, hash_solicitud, estado='EN_PROCESO')
+
+
+def _completar(clave, id_empresa, hash_solicitud, resp):
+    """
+    Guarda la respuesta en la transacción actual. Si el endpoint hizo rollback
+    (y con él se perdió la reserva) la clave se vuelve a insertar, salvo que
+    otra solicitud ya la haya tomado.
+    """
+    datos = {"estado": 'COMPLETADO', "status_code": resp.status_code, "respuesta": resp.get_data(as_text=True)}
+    actualizada = db.session.execute(update(ClaveIdempotencia).where(
+        ClaveIdempotencia.clave == clave,
+        ClaveIdempotencia.id_empresa == id_empresa,
+        ClaveIdempotencia.estado == 'EN_PROCESO'
+    ).values(**datos)).rowcount
+    if not actualizada:
+        _insertar(clave, id_empresa, hash_solicitud, **datos)
+
+
+@contextmanager
+def _commit_diferido():
+    """Dentro del bloque, db.session.commit() solo hace flush; el commit real lo hace el decorador."""
+    sesion = db.session()
+    sesion.commit = sesion.flush
+    try:
+        yield
+    finally:
+        del sesion.commit
+
+
+def idempotente(fn):
+    """
+    Uso (debajo del decorador de autenticación):
+        @bp.post("/")
+        @jwt_required()
+        @idempotente
+    Sin cabecera Idempotency-Key el endpoint se ejecuta normalmente. El
+    endpoint debe confirmar con un único db.session.commit() al final, como
+    los demás: ese commit se difiere hasta guardar la respuesta.
+    """
+    @wraps(fn)
+    def decorated(*args, **kwargs):
+        clave = (request.headers.get(HEADER) or "").strip()
+        if not clave:
+            return fn(*args, **kwargs)
+        if len(clave) > MAX_LARGO_CLAVE:
+            return jsonify({"message": f"{HEADER} no puede superar {MAX_LARGO_CLAVE} caracteres"}), 400
+
+        id_empresa = get_jwt().get("id_empresa") or 0
+        hash_solicitud = _hash_solicitud()
+
+        if not _reservar(clave, id_empresa, hash_solicitud):
+            previa = db.session.execute(select(
+                ClaveIdempotencia.hash_solicitud, ClaveIdempotencia.estado,
+                ClaveIdempotencia.status_code, ClaveIdempotencia.respuesta
+            ).where(
+                ClaveIdempotencia.clave == clave, ClaveIdempotencia.id_empresa == id_empresa
+            )).first()
+            db.session.rollback()
+            if previa is not None and previa.hash_solicitud != hash_solicitud:
+                return jsonify({"message": f"{HEADER} ya fue usada con otra solicitud"}), 422
+            if previa is None or previa.estado != 'COMPLETADO':
+                return jsonify({"message": f"Hay una solicitud en proceso con esta {HEADER}"}), 409
+            resp = current_app.response_class(previa.respuesta, status=previa.status_code, mimetype="application/json")
+            resp.headers["Idempotent-Replayed"] = "true"
+            return resp
+
+        try:
+            with _commit_diferido():
+                resp = make_response(fn(*args, **kwargs))
+        except Exception:
+            db.session.rollback()
+            raise
+
+        if resp.status_code >= 500:
+            # Error transitorio: no se guarda nada y el reintento vuelve a ejecutar
+            db.session.rollback()
+            return resp
+
+        _completar(clave, id_empresa, hash_solicitud, resp)
+        db.session.commit()
+        return resp
+    return decorated
+
+
+def purgar_claves_vencidas():
+    """Borra las claves vencidas. Devuelve la cantidad eliminada."""
+    borradas = db.session.execute(
+        delete(ClaveIdempotencia).where(ClaveIdempotencia.expires_at <= datetime.now())
+    ).rowcount
+    db.session.commit()
+    return borradas
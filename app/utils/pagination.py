@@ -1,4 +1,8 @@
 # app/utils/pagination.py
+import base64
+import json
+
+
 def parse_pagination(req, default_page=1, default_per_page=20, max_per_page=100):
     try:
         page = max(int(req.args.get("page", default_page)), 1)
@@ -6,3 +10,52 @@ def parse_pagination(req, default_page=1, default_per_page=20, max_per_page=100)
         return page, per_page
     except ValueError:
         return default_page, default_per_page
+
+
+# ---- Paginación por cursor (keyset) ----
+def encode_cursor(*values):
+    """Cursor opaco con los valores de la clave de orden de la última fila."""
+    raw = json.dumps(values, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    """Inverso de encode_cursor. Lanza ValueError si el cursor es inválido."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = json.loads(raw)
+    except Exception:
+        raise ValueError("Cursor inválido")
+    if not isinstance(values, list):
+        raise ValueError("Cursor inválido")
+    return values
+
+
+def parse_keyset(req, default_limit=50, max_limit=200):
+    """
+    Lee ?cursor=&limit= del request.
+    Devuelve (valores_cursor | None, limit), o None si el cliente no pidió paginar
+    (los endpoints mantienen entonces su respuesta de lista completa).
+    Lanza ValueError si los parámetros son inválidos.
+    """
+    cursor = req.args.get("cursor")
+    limit = req.args.get("limit")
+    if cursor is None and limit is None:
+        return None
+    try:
+        limit = int(limit) if limit is not None else default_limit
+    except ValueError:
+        raise ValueError("limit debe ser numérico")
+    limit = min(max(limit, 1), max_limit)
+    return (decode_cursor(cursor) if cursor else None), limit
+
+
+def keyset_page(rows, limit, key):
+    """
+    Recibe hasta limit + 1 filas y arma la página.
+    key(row) devuelve los valores de la clave de orden para el próximo cursor.
+    """
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    next_cursor = encode_cursor(*key(rows[-1])) if has_more and rows else None
+    return rows, next_cursor
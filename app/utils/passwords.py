@@ -0,0 +1,59 @@
+# app/utils/passwords.py
+"""
+Hash y verificación de contraseñas (pbkdf2:sha256 de Werkzeug).
+
+El cálculo corre en el hilo del request; un semáforo limita cuántos hashes
+corren a la vez (PASSWORD_HASH_CONCURRENCIA, por defecto uno por núcleo) y el
+resto espera hasta PASSWORD_HASH_ESPERA_SEGUNDOS. Pasado ese tiempo se lanza
+HashOcupado (los endpoints responden 503) en lugar de acumular una cola sin
+límite durante una ráfaga de intentos.
+
+Es solo control de admisión. hashlib.pbkdf2_hmac ya libera el GIL, pero que
+varios logins usen varios núcleos a la vez depende de que el worker atienda
+requests en hilos (gunicorn --worker-class gthread --threads N); con workers
+sync cada proceso hashea de a uno.
+
+El costo se configura con PASSWORD_ITERACIONES. Los hashes guardados con otro
+método o cantidad de iteraciones se rehashean en el próximo login exitoso.
+"""
+import os
+import threading
+
+from werkzeug.security import generate_password_hash, check_password_hash
+
+ITERACIONES = int(os.getenv("PASSWORD_ITERACIONES", 600000))
+METODO = f"pbkdf2:sha256:{ITERACIONES}"
+CONCURRENCIA = int(os.getenv("PASSWORD_HASH_CONCURRENCIA", os.cpu_count() or 1))
+ESPERA_SEGUNDOS = float(os.getenv("PASSWORD_HASH_ESPERA_SEGUNDOS", 5))
+
+_cupos = threading.BoundedSemaphore(CONCURRENCIA)
+
+
+class HashOcupado(Exception):
+    """Demasiados hashes en curso; el request debe reintentarse."""
+
+    def __init__(self, message="Servidor ocupado, intente nuevamente en unos segundos"):
+        super().__init__(message)
+        self.message = message
+
+
+def _ejecutar(fn, *args):
+    if not _cupos.acquire(timeout=ESPERA_SEGUNDOS):
+        raise HashOcupado()
+    try:
+        return fn(*args)
+    finally:
+        _cupos.release()
+
+
+def hashear(password):
+    return _ejecutar(generate_password_hash, password, METODO)
+
+
+def verificar(password_hash, password):
+    return _ejecutar(check_password_hash, password_hash, password)
+
+
+def necesita_rehash(password_hash):
+    """True si el hash no usa el método/iteraciones configurados."""
+    return (password_hash or "").split("$", 1)[0] != METODO
@@ -0,0 +1,180 @@
+# app/utils/permissions.py
+"""
+Resolución centralizada de permisos.
+
+Los permisos efectivos de un usuario (roles + códigos de permiso) se leen con
+una sola consulta y se cachean por proceso durante PERMISOS_CACHE_TTL segundos.
+roles.py, permisos.py y users.py invalidan la caché al modificar asignaciones.
+
+Los access tokens llevan los códigos de permiso ("perms") y la versión de
+permisos del usuario ("pv"). permission_required autoriza con esos claims y
+solo compara "pv" contra usuarios.permisos_version (cacheada) para rechazar
+tokens emitidos antes de un cambio de roles/permisos.
+"""
+import os
+import threading
+import time
+from collections import namedtuple
+from functools import wraps
+
+from flask import jsonify
+from flask_jwt_extended import jwt_required, get_jwt_identity, get_jwt
+from sqlalchemy import select
+
+from app.extensions import db
+from app.models.catalog import Usuario, UsuarioRol, Rol, RolPermiso, Permiso
+
+CACHE_TTL = int(os.getenv("PERMISOS_CACHE_TTL", 60))
+
+PermisosUsuario = namedtuple(
+    "PermisosUsuario",
+    ["id_usuario", "id_empresa", "is_global", "version", "roles", "permisos"]
+)
+
+_cache = {}
+_versiones = {}
+_lock = threading.Lock()
+
+
+def _cargar_permisos(id_usuario):
+    rows = db.session.query(
+        Usuario.id_usuario, Usuario.id_empresa, Usuario.is_global, Usuario.permisos_version,
+        Rol.nombre, Permiso.nombre
+    )\
+        .outerjoin(UsuarioRol, UsuarioRol.id_usuario == Usuario.id_usuario)\
+        .outerjoin(Rol, Rol.id_rol == UsuarioRol.id_rol)\
+        .outerjoin(RolPermiso, RolPermiso.id_rol == Rol.id_rol)\
+        .outerjoin(Permiso, Permiso.id_permiso == RolPermiso.id_permiso)\
+        .filter(Usuario.id_usuario == id_usuario).all()
+    if not rows:
+        return None
+    _, id_empresa, is_global, version = rows[0][:4]
+    return PermisosUsuario(
+        id_usuario=id_usuario,
+        id_empresa=id_empresa,
+        is_global=bool(is_global),
+        version=version or 0,
+        roles=frozenset(row[4] for row in rows if row[4]),
+        permisos=frozenset(row[5] for row in rows if row[5])
+    )
+
+
+def get_permisos(id_usuario, refrescar=False):
+    """
+    Roles y permisos efectivos del usuario (None si no existe).
+    Con la caché caliente no toca la base de datos; refrescar=True fuerza la
+    lectura (login/refresh, para emitir claims actualizados).
+    """
+    id_usuario = int(id_usuario)
+    ahora = time.monotonic()
+    if not refrescar:
+        with _lock:
+            entrada = _cache.get(id_usuario)
+        if entrada and entrada[0] > ahora:
+            return entrada[1]
+
+    resultado = _cargar_permisos(id_usuario)
+    if resultado is not None:
+        with _lock:
+            _cache[id_usuario] = (ahora + CACHE_TTL, resultado)
+            _versiones[id_usuario] = (ahora + CACHE_TTL, resultado.version)
+    return resultado
+
+
+def get_version_permisos(id_usuario):
+    """usuarios.permisos_version vigente (cacheada). None si el usuario no existe."""
+    id_usuario = int(id_usuario)
+    ahora = time.monotonic()
+    with _lock:
+        entrada = _versiones.get(id_usuario)
+    if entrada and entrada[0] > ahora:
+        return entrada[1]
+
+    version = db.session.execute(
+        select(Usuario.permisos_version).where(Usuario.id_usuario == id_usuario)
+    ).scalar_one_or_none()
+    if version is not None:
+        with _lock:
+            _versiones[id_usuario] = (ahora + CACHE_TTL, version)
+    return version
+
+
+def invalidar_permisos(id_usuario=None):
+    """Descarta la caché de un usuario, o de todos si no se indica."""
+    with _lock:
+        if id_usuario is None:
+            _cache.clear()
+            _versiones.clear()
+        else:
+            _cache.pop(int(id_usuario), None)
+            _versiones.pop(int(id_usuario), None)
+
+
+def incrementar_version_permisos(id_usuario=None, id_rol=None, id_permiso=None):
+    """
+    Incrementa usuarios.permisos_version de los usuarios afectados por un cambio,
+    para que sus tokens vigentes sean rechazados. No hace commit.
+    """
+    if id_usuario is not None:
+        afectados = select(Usuario.id_usuario).where(Usuario.id_usuario == id_usuario)
+    elif id_rol is not None:
+        afectados = select(UsuarioRol.id_usuario).where(UsuarioRol.id_rol == id_rol)
+    elif id_permiso is not None:
+        afectados = select(UsuarioRol.id_usuario)\
+            .join(RolPermiso, RolPermiso.id_rol == UsuarioRol.id_rol)\
+            .where(RolPermiso.id_permiso == id_permiso)
+    else:
+        return
+    Usuario.query.filter(Usuario.id_usuario.in_(afectados))\
+        .update({Usuario.permisos_version: Usuario.permisos_version + 1}, synchronize_session=False)
+
+
+def claims_de_permisos(permisos):
+    """Claims de autorización que se embeben en los tokens."""
+    return {
+        "roles": sorted(permisos.roles),
+        "id_empresa": permisos.id_empresa,
+        "is_global": permisos.is_global,
+        "perms": sorted(permisos.permisos),
+        "pv": permisos.version,
+    }
+
+
+def es_admin(roles):
+    return any(r.upper() == 'ADMIN' for r in roles)
+
+
+def permission_required(permission_name):
+    """
+    Uso: @permission_required("credito.gestionar")
+    El rol Admin tiene acceso total.
+    """
+    def wrapper(fn):
+        @wraps(fn)
+        @jwt_required()
+        def decorated(*args, **kwargs):
+            claims = get_jwt()
+            if "perms" in claims:
+                # Token con claims de permisos: solo validamos que no esté desactualizado
+                version = get_version_permisos(get_jwt_identity())
+                if version is None:
+                    return jsonify({"message": "Usuario no encontrado"}), 404
+                if claims.get("pv") != version:
+                    return jsonify({
+                        "message": "Sus permisos cambiaron. Inicie sesión nuevamente.",
+                        "code": "PERMISOS_DESACTUALIZADOS"
+                    }), 401
+                roles, codigos = claims.get("roles") or [], claims.get("perms") or []
+            else:
+                # Tokens emitidos antes de incluir permisos: resolver desde caché/DB
+                permisos = get_permisos(get_jwt_identity())
+                if permisos is None:
+                    return jsonify({"message": "Usuario no encontrado"}), 404
+                roles, codigos = permisos.roles, permisos.permisos
+
+            if es_admin(roles) or permission_name in codigos:
+                return fn(*args, **kwargs)
+
+            return jsonify({"message": f"Permiso denegado. Se requiere '{permission_name}'"}), 403
+        return decorated
+    return wrapper
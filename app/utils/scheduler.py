@@ -0,0 +1,23 @@
+# app/utils/scheduler.py
+import threading
+import time
+
+
+def iniciar_tarea_periodica(app, nombre, intervalo, tarea):
+    """
+    Ejecuta tarea() cada `intervalo` segundos en un hilo daemon, dentro del
+    app context. Pensado para tareas idempotentes protegidas por advisory lock:
+    si varios procesos la lanzan, solo uno hace el trabajo en cada vuelta.
+    """
+    def loop():
+        while True:
+            time.sleep(intervalo)
+            with app.app_context():
+                try:
+                    tarea()
+                except Exception:
+                    app.logger.exception("Error en la tarea periódica %s", nombre)
+
+    hilo = threading.Thread(target=loop, name=nombre, daemon=True)
+    hilo.start()
+    return hilo
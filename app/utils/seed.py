@@ -1,6 +1,6 @@
 # app/utils/seed.py
 import os
-from werkzeug.security import generate_password_hash
+from app.utils.passwords import hashear, HashOcupado
 from app.extensions import db
 from app.models.catalog import Usuario, Rol, UsuarioRol
 
@@ -29,7 +29,7 @@ def seed_db():
         
         if not admin_user:
             initial_password = os.getenv("INITIAL_ADMIN_PASSWORD", "admin123")
-            hashed_pw = generate_password_hash(initial_password, method="pbkdf2:sha256")
+            hashed_pw = hashear(initial_password)
             
             admin_user = Usuario(
                 nombre_usuario=username,
@@ -58,6 +58,9 @@ def seed_db():
 
         db.session.commit()
         
+    except HashOcupado as e:
+        db.session.rollback()
+        print(f"❌ Seed pospuesto (se reintenta en el próximo arranque): {e.message}")
     except Exception as e:
         db.session.rollback()
         print(f"❌ Error en inicialización de DB (Seed): {e}")
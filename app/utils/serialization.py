@@ -0,0 +1,98 @@
+# app/utils/serialization.py
+"""
+Formas de serialización con carga anticipada.
+
+Cada forma declara qué relaciones necesita el to_dict correspondiente, para
+cargarlas con selectinload/joinedload en la misma consulta del endpoint en
+lugar de un lazy load por fila (N+1):
+
+    creditos = con_forma(Credito.query.filter(...), "credito.detalle").all()
+    return jsonify(serializar(creditos)), 200
+
+Con SERIALIZACION_ESTRICTA activa (tests), cualquier lazy load que emita SQL
+durante serializar() lanza LazyLoadNoPlanificado en vez de pasar inadvertido.
+"""
+import contextvars
+from contextlib import contextmanager
+
+from flask import current_app, has_app_context
+from sqlalchemy import event
+from sqlalchemy.orm import Session, joinedload, selectinload
+
+from app.models.catalog import (
+    Credito, DetalleCredito, Pago, Usuario, UsuarioRol, Rol, RolPermiso, AsientoContable
+)
+
+
+class LazyLoadNoPlanificado(RuntimeError):
+    """Se intentó cargar una relación que la forma de serialización no declaró."""
+
+
+def _pago():
+    return (joinedload(Pago.forma_pago), joinedload(Pago.usuario))
+
+
+def _credito_resumen():
+    return (joinedload(Credito.cliente), joinedload(Credito.usuario), joinedload(Credito.regla))
+
+
+def _credito_detalle():
+    # DetalleCredito.to_dict lee credito.regla: la relación inversa se resuelve
+    # desde el identity map (sin SQL) porque el crédito ya está cargado.
+    return _credito_resumen() + (
+        selectinload(Credito.detalles).selectinload(DetalleCredito.pagos).options(*_pago()),
+    )
+
+
+FORMAS = {
+    "credito.resumen": _credito_resumen,
+    "credito.detalle": _credito_detalle,
+    "pago": _pago,
+    "usuario": lambda: (
+        joinedload(Usuario.empresa),
+        selectinload(Usuario.roles).joinedload(UsuarioRol.rol),
+    ),
+    "rol": lambda: (
+        selectinload(Rol.permisos_asociados).joinedload(RolPermiso.permiso),
+    ),
+    "asiento": lambda: (selectinload(AsientoContable.movimientos),),
+}
+
+
+def con_forma(query, forma):
+    """Aplica a la query las opciones de carga declaradas para la forma."""
+    return query.options(*FORMAS[forma]())
+
+
+_serializando = contextvars.ContextVar("serializando", default=False)
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _detectar_lazy_load(orm_execute_state):
+    if _serializando.get() and orm_execute_state.lazy_loaded_from is not None:
+        instancia = orm_execute_state.lazy_loaded_from
+        raise LazyLoadNoPlanificado(
+            f"Lazy load no planificado desde {instancia.class_.__name__} durante la serialización"
+        )
+
+
+def _estricto():
+    return has_app_context() and current_app.config.get("SERIALIZACION_ESTRICTA", False)
+
+
+@contextmanager
+def sin_lazy_loads():
+    """En modo estricto, falla ante cualquier lazy load dentro del bloque."""
+    token = _serializando.set(_estricto())
+    try:
+        yield
+    finally:
+        _serializando.reset(token)
+
+
+def serializar(objetos, metodo="to_dict"):
+    """Serializa un objeto o una lista con el método indicado (to_dict, to_dict_summary...)."""
+    with sin_lazy_loads():
+        if isinstance(objetos, (list, tuple)):
+            return [getattr(o, metodo)() for o in objetos]
+        return getattr(objetos, metodo)()
@@ -0,0 +1,70 @@
+# app/utils/sql.py
+import json
+
+from sqlalchemy import text
+
+from app.extensions import db
+
+
+def upsert(modelo):
+    """
+    INSERT ... ON CONFLICT del dialecto activo (PostgreSQL en producción,
+    SQLite en local). Devuelve el statement listo para .values()/.on_conflict_*.
+    """
+    if db.session.get_bind().dialect.name == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        from sqlalchemy.dialects.postgresql import insert
+    return insert(modelo)
+
+
+def try_advisory_xact_lock(clave, id_recurso):
+    """
+    pg_try_advisory_xact_lock(clave, id_recurso): True si esta transacción obtuvo
+    el lock (se libera solo al commit/rollback), False si otro nodo lo tiene.
+    En SQLite (un solo proceso en local) siempre devuelve True.
+    """
+    if db.session.get_bind().dialect.name == "sqlite":
+        return True
+    return bool(db.session.execute(
+        text("SELECT pg_try_advisory_xact_lock(:clave, :id)"), {"clave": clave, "id": id_recurso}
+    ).scalar())
+
+
+def advisory_xact_lock(clave, id_recurso):
+    """
+    pg_advisory_xact_lock(clave, id_recurso): espera el lock exclusivo hasta
+    obtenerlo (se libera al commit/rollback). En SQLite no hace nada.
+    """
+    if db.session.get_bind().dialect.name == "sqlite":
+        return
+    db.session.execute(text("SELECT pg_advisory_xact_lock(:clave, :id)"), {"clave": clave, "id": id_recurso})
+
+
+def advisory_xact_lock_shared(clave, id_recurso):
+    """
+    pg_advisory_xact_lock_shared(clave, id_recurso): lock compartido hasta el
+    commit/rollback. Varias transacciones lo toman a la vez; solo espera a quien
+    tenga el exclusivo. En SQLite no hace nada.
+    """
+    if db.session.get_bind().dialect.name == "sqlite":
+        return
+    db.session.execute(text("SELECT pg_advisory_xact_lock_shared(:clave, :id)"), {"clave": clave, "id": id_recurso})
+
+
+def contar_aproximado(query):
+    """
+    Cantidad estimada de filas de `query` según el planificador de PostgreSQL
+    (EXPLAIN, sin ejecutarla): evita el COUNT(*) completo en listados grandes.
+    En SQLite devuelve el conteo exacto.
+    """
+    bind = db.session.get_bind()
+    if bind.dialect.name == "sqlite":
+        return query.order_by(None).count()
+    compilado = query.order_by(None).statement.compile(dialect=bind.dialect)
+    plan = db.session.connection().exec_driver_sql(
+        "EXPLAIN (FORMAT JSON) " + str(compilado), compilado.params
+    ).scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
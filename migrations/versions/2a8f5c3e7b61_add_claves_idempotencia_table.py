@@ -0,0 +1,40 @@
+"""Add claves_idempotencia table
+
+Revision ID: 2a8f5c3e7b61
+Revises: 9e4b6c2d8a17
+Create Date: 2026-10-17 13:22:05.871943
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '2a8f5c3e7b61'
+down_revision = '9e4b6c2d8a17'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('claves_idempotencia',
+    sa.Column('clave', sa.String(length=100), nullable=False),
+    sa.Column('id_empresa', sa.Integer(), nullable=False),
+    sa.Column('endpoint', sa.String(length=100), nullable=False),
+    sa.Column('hash_solicitud', sa.String(length=64), nullable=False),
+    sa.Column('estado', sa.String(length=20), nullable=False),
+    sa.Column('status_code', sa.Integer(), nullable=True),
+    sa.Column('respuesta', sa.Text(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('expires_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('clave', 'id_empresa')
+    )
+    with op.batch_alter_table('claves_idempotencia', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_claves_idempotencia_expires_at'), ['expires_at'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('claves_idempotencia', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_claves_idempotencia_expires_at'))
+
+    op.drop_table('claves_idempotencia')
@@ -0,0 +1,39 @@
+"""Add saldos_cuenta table
+
+Revision ID: 3f9a1c7d2b4e
+Revises: 165d8fdbfa06
+Create Date: 2026-10-17 09:12:41.318204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f9a1c7d2b4e'
+down_revision = '165d8fdbfa06'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('saldos_cuenta',
+    sa.Column('id_empresa', sa.Integer(), nullable=False),
+    sa.Column('cuenta', sa.String(length=100), nullable=False),
+    sa.Column('saldo', sa.Numeric(), nullable=False),
+    sa.Column('updated_at', sa.TIMESTAMP(), nullable=True),
+    sa.ForeignKeyConstraint(['id_empresa'], ['empresa.id_empresa'], ),
+    sa.PrimaryKeyConstraint('id_empresa', 'cuenta')
+    )
+    # Carga inicial desde el histórico de movimientos
+    op.execute("""
+        INSERT INTO saldos_cuenta (id_empresa, cuenta, saldo, updated_at)
+        SELECT id_empresa, cuenta, COALESCE(SUM(debe - haber), 0), CURRENT_TIMESTAMP
+        FROM movimientos_contables
+        WHERE id_empresa IS NOT NULL
+        GROUP BY id_empresa, cuenta
+    """)
+
+
+def downgrade():
+    op.drop_table('saldos_cuenta')
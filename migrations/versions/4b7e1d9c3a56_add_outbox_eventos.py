@@ -0,0 +1,32 @@
+"""Add outbox_eventos table
+
+Revision ID: 4b7e1d9c3a56
+Revises: e83c1f6a9d24
+Create Date: 2026-10-17 15:21:37.480216
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '4b7e1d9c3a56'
+down_revision = 'e83c1f6a9d24'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('outbox_eventos',
+    sa.Column('id_evento', sa.BigInteger().with_variant(sa.Integer(), 'sqlite'), nullable=False),
+    sa.Column('tipo', sa.String(length=30), nullable=False),
+    sa.Column('payload', sa.Text(), nullable=False),
+    sa.Column('intentos', sa.Integer(), nullable=False),
+    sa.Column('ultimo_error', sa.Text(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id_evento')
+    )
+
+
+def downgrade():
+    op.drop_table('outbox_eventos')
@@ -0,0 +1,28 @@
+"""Add keyset indexes to creditos
+
+Revision ID: 5d7e2a1c9f03
+Revises: c41e7a9b3d52
+Create Date: 2026-10-17 12:04:41.118207
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5d7e2a1c9f03'
+down_revision = 'c41e7a9b3d52'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('creditos', schema=None) as batch_op:
+        batch_op.create_index('ix_creditos_empresa_id_credito', ['id_empresa', 'id_credito'], unique=False)
+        batch_op.create_index('ix_creditos_empresa_cliente', ['id_empresa', 'id_cliente'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('creditos', schema=None) as batch_op:
+        batch_op.drop_index('ix_creditos_empresa_cliente')
+        batch_op.drop_index('ix_creditos_empresa_id_credito')
@@ -0,0 +1,41 @@
+"""Add importaciones_pagos table
+
+Revision ID: 6c1d9f4a2e38
+Revises: 2a8f5c3e7b61
+Create Date: 2026-10-17 13:58:44.210576
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '6c1d9f4a2e38'
+down_revision = '2a8f5c3e7b61'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('importaciones_pagos',
+    sa.Column('id_importacion', sa.Integer(), nullable=False),
+    sa.Column('id_empresa', sa.Integer(), nullable=False),
+    sa.Column('id_usuario', sa.Integer(), nullable=True),
+    sa.Column('nombre_archivo', sa.String(length=255), nullable=True),
+    sa.Column('estado', sa.String(length=20), nullable=False),
+    sa.Column('filas_procesadas', sa.Integer(), nullable=False),
+    sa.Column('pagos_aplicados', sa.Integer(), nullable=False),
+    sa.Column('filas_omitidas', sa.Integer(), nullable=False),
+    sa.Column('filas_con_error', sa.Integer(), nullable=False),
+    sa.Column('monto_aplicado', sa.Numeric(precision=15, scale=2), nullable=False),
+    sa.Column('errores', sa.Text(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['id_empresa'], ['empresa.id_empresa'], ),
+    sa.ForeignKeyConstraint(['id_usuario'], ['usuarios.id_usuario'], ),
+    sa.PrimaryKeyConstraint('id_importacion')
+    )
+
+
+def downgrade():
+    op.drop_table('importaciones_pagos')
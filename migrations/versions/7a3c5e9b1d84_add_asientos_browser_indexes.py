@@ -0,0 +1,41 @@
+"""Add journal browser indexes
+
+Revision ID: 7a3c5e9b1d84
+Revises: 4b7e1d9c3a56
+Create Date: 2026-10-17 15:48:02.615930
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7a3c5e9b1d84'
+down_revision = '4b7e1d9c3a56'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('asientos_contables', schema=None) as batch_op:
+        batch_op.create_index('ix_asientos_empresa_fecha_id', ['id_empresa', 'fecha', 'id_asiento'], unique=False)
+
+    with op.batch_alter_table('movimientos_contables', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_movimientos_contables_id_asiento'), ['id_asiento'], unique=False)
+
+    if op.get_bind().dialect.name == 'postgresql':
+        op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        op.create_index('ix_asientos_glosa_trgm', 'asientos_contables', ['glosa'], unique=False,
+                        postgresql_using='gin', postgresql_ops={'glosa': 'gin_trgm_ops'})
+    else:
+        op.create_index('ix_asientos_glosa_trgm', 'asientos_contables', ['glosa'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_asientos_glosa_trgm', table_name='asientos_contables')
+
+    with op.batch_alter_table('movimientos_contables', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_movimientos_contables_id_asiento'))
+
+    with op.batch_alter_table('asientos_contables', schema=None) as batch_op:
+        batch_op.drop_index('ix_asientos_empresa_fecha_id')
@@ -0,0 +1,42 @@
+"""Add flujo_caja_diario table
+
+Revision ID: 8b2d4e6f1a90
+Revises: 3f9a1c7d2b4e
+Create Date: 2026-10-17 10:03:55.904117
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8b2d4e6f1a90'
+down_revision = '3f9a1c7d2b4e'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('flujo_caja_diario',
+    sa.Column('id_empresa', sa.Integer(), nullable=False),
+    sa.Column('fecha', sa.Date(), nullable=False),
+    sa.Column('ingresos', sa.Numeric(), nullable=False),
+    sa.Column('egresos', sa.Numeric(), nullable=False),
+    sa.ForeignKeyConstraint(['id_empresa'], ['empresa.id_empresa'], ),
+    sa.PrimaryKeyConstraint('id_empresa', 'fecha')
+    )
+    # Backfill (equivalente a `flask contabilidad reconstruir-flujo`)
+    op.execute("""
+        INSERT INTO flujo_caja_diario (id_empresa, fecha, ingresos, egresos)
+        SELECT a.id_empresa, DATE(a.fecha),
+               COALESCE(SUM(CASE WHEN m.debe > 0 THEN m.debe ELSE 0 END), 0),
+               COALESCE(SUM(CASE WHEN m.haber > 0 THEN m.haber ELSE 0 END), 0)
+        FROM movimientos_contables m
+        JOIN asientos_contables a ON a.id_asiento = m.id_asiento
+        WHERE m.cuenta = 'Caja'
+        GROUP BY a.id_empresa, DATE(a.fecha)
+    """)
+
+
+def downgrade():
+    op.drop_table('flujo_caja_diario')
@@ -0,0 +1,26 @@
+"""Add estado_cuota/fecha_vencimiento index to detalles_credito
+
+Revision ID: 9e4b6c2d8a17
+Revises: 5d7e2a1c9f03
+Create Date: 2026-10-17 12:41:19.604382
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9e4b6c2d8a17'
+down_revision = '5d7e2a1c9f03'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('detalles_credito', schema=None) as batch_op:
+        batch_op.create_index('ix_detalles_estado_vencimiento', ['estado_cuota', 'fecha_vencimiento'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('detalles_credito', schema=None) as batch_op:
+        batch_op.drop_index('ix_detalles_estado_vencimiento')
@@ -0,0 +1,90 @@
+"""Add plan_cuentas and movimientos_contables.id_cuenta
+
+Revision ID: b5d2f8a4c617
+Revises: 7a3c5e9b1d84
+Create Date: 2026-10-17 16:20:45.318204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b5d2f8a4c617'
+down_revision = '7a3c5e9b1d84'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('plan_cuentas',
+    sa.Column('id_cuenta', sa.Integer(), nullable=False),
+    sa.Column('id_empresa', sa.Integer(), nullable=False),
+    sa.Column('nombre', sa.String(length=100), nullable=False),
+    sa.Column('tipo', sa.String(length=20), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['id_empresa'], ['empresa.id_empresa'], ),
+    sa.PrimaryKeyConstraint('id_cuenta'),
+    sa.UniqueConstraint('id_empresa', 'nombre', name='uq_plan_cuentas_empresa_nombre')
+    )
+
+    with op.batch_alter_table('movimientos_contables', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('id_cuenta', sa.Integer(), nullable=True))
+        batch_op.create_foreign_key('fk_movimientos_cuenta', 'plan_cuentas', ['id_cuenta'], ['id_cuenta'])
+
+    # Backfill: movimientos sin empresa la toman de su asiento
+    op.execute("""
+        UPDATE movimientos_contables
+        SET id_empresa = (
+            SELECT a.id_empresa FROM asientos_contables a
+            WHERE a.id_asiento = movimientos_contables.id_asiento
+        )
+        WHERE id_empresa IS NULL
+    """)
+
+    # Plan de cuentas inicial: las cuentas ya usadas por cada empresa
+    # (mismo criterio de tipo que contabilidad_service.tipo_cuenta)
+    op.execute("""
+        INSERT INTO plan_cuentas (id_empresa, nombre, tipo, created_at)
+        SELECT id_empresa, cuenta,
+            CASE
+                WHEN cuenta IN ('Caja', 'Cuentas por Cobrar', 'Intereses por Cobrar') THEN 'ACTIVO'
+                WHEN cuenta = 'Ganancias por Intereses' THEN 'INGRESO'
+                WHEN cuenta = 'Capital Propio' THEN 'PATRIMONIO'
+                WHEN LOWER(cuenta) LIKE '%gasto%' OR LOWER(cuenta) LIKE '%costo%'
+                     OR LOWER(cuenta) LIKE '%egreso%' THEN 'GASTO'
+                WHEN LOWER(cuenta) LIKE '%ganancia%' OR LOWER(cuenta) LIKE '%ingreso%'
+                     OR LOWER(cuenta) LIKE '%venta%' THEN 'INGRESO'
+                WHEN LOWER(cuenta) LIKE '%capital%' OR LOWER(cuenta) LIKE '%patrimonio%'
+                     OR LOWER(cuenta) LIKE '%resultado%' THEN 'PATRIMONIO'
+                WHEN LOWER(cuenta) LIKE '%por pagar%' OR LOWER(cuenta) LIKE '%deuda%'
+                     OR LOWER(cuenta) LIKE '%proveedor%' THEN 'PASIVO'
+                ELSE 'ACTIVO'
+            END,
+            CURRENT_TIMESTAMP
+        FROM movimientos_contables
+        WHERE id_empresa IS NOT NULL
+        GROUP BY id_empresa, cuenta
+    """)
+
+    op.execute("""
+        UPDATE movimientos_contables
+        SET id_cuenta = (
+            SELECT p.id_cuenta FROM plan_cuentas p
+            WHERE p.id_empresa = movimientos_contables.id_empresa
+              AND p.nombre = movimientos_contables.cuenta
+        )
+        WHERE id_empresa IS NOT NULL
+    """)
+
+    with op.batch_alter_table('movimientos_contables', schema=None) as batch_op:
+        batch_op.create_index('ix_movimientos_empresa_cuenta', ['id_empresa', 'id_cuenta'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('movimientos_contables', schema=None) as batch_op:
+        batch_op.drop_index('ix_movimientos_empresa_cuenta')
+        batch_op.drop_constraint('fk_movimientos_cuenta', type_='foreignkey')
+        batch_op.drop_column('id_cuenta')
+
+    op.drop_table('plan_cuentas')
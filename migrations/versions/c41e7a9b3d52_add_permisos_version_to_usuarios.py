@@ -0,0 +1,26 @@
+"""Add permisos_version to usuarios
+
+Revision ID: c41e7a9b3d52
+Revises: 8b2d4e6f1a90
+Create Date: 2026-10-17 11:27:08.552310
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c41e7a9b3d52'
+down_revision = '8b2d4e6f1a90'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('usuarios', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('permisos_version', sa.Integer(), server_default='0', nullable=False))
+
+
+def downgrade():
+    with op.batch_alter_table('usuarios', schema=None) as batch_op:
+        batch_op.drop_column('permisos_version')
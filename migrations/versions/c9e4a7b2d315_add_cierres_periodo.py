@@ -0,0 +1,43 @@
+"""Add cierres_periodo and saldos_cierre tables
+
+Revision ID: c9e4a7b2d315
+Revises: b5d2f8a4c617
+Create Date: 2026-10-17 16:58:13.902541
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c9e4a7b2d315'
+down_revision = 'b5d2f8a4c617'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('cierres_periodo',
+    sa.Column('id_empresa', sa.Integer(), nullable=False),
+    sa.Column('periodo', sa.Date(), nullable=False),
+    sa.Column('id_usuario', sa.Integer(), nullable=True),
+    sa.Column('cerrado_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['id_empresa'], ['empresa.id_empresa'], ),
+    sa.ForeignKeyConstraint(['id_usuario'], ['usuarios.id_usuario'], ),
+    sa.PrimaryKeyConstraint('id_empresa', 'periodo')
+    )
+    op.create_table('saldos_cierre',
+    sa.Column('id_empresa', sa.Integer(), nullable=False),
+    sa.Column('periodo', sa.Date(), nullable=False),
+    sa.Column('id_cuenta', sa.Integer(), nullable=False),
+    sa.Column('debe', sa.Numeric(precision=18, scale=2), nullable=False),
+    sa.Column('haber', sa.Numeric(precision=18, scale=2), nullable=False),
+    sa.ForeignKeyConstraint(['id_cuenta'], ['plan_cuentas.id_cuenta'], ),
+    sa.ForeignKeyConstraint(['id_empresa', 'periodo'], ['cierres_periodo.id_empresa', 'cierres_periodo.periodo'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id_empresa', 'periodo', 'id_cuenta')
+    )
+
+
+def downgrade():
+    op.drop_table('saldos_cierre')
+    op.drop_table('cierres_periodo')
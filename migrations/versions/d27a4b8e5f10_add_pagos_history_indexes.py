@@ -0,0 +1,28 @@
+"""Add history indexes to pagos
+
+Revision ID: d27a4b8e5f10
+Revises: 6c1d9f4a2e38
+Create Date: 2026-10-17 14:31:52.407719
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd27a4b8e5f10'
+down_revision = '6c1d9f4a2e38'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('pagos', schema=None) as batch_op:
+        batch_op.create_index('ix_pagos_empresa_fecha', ['id_empresa', 'fecha_pago'], unique=False)
+        batch_op.create_index('ix_pagos_empresa_id_pago', ['id_empresa', 'id_pago'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('pagos', schema=None) as batch_op:
+        batch_op.drop_index('ix_pagos_empresa_id_pago')
+        batch_op.drop_index('ix_pagos_empresa_fecha')
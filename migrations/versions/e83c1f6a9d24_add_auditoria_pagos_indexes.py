@@ -0,0 +1,34 @@
+"""Add audit browser indexes
+
+Revision ID: e83c1f6a9d24
+Revises: d27a4b8e5f10
+Create Date: 2026-10-17 14:52:10.093318
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e83c1f6a9d24'
+down_revision = 'd27a4b8e5f10'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('historial_pagos_audit', schema=None) as batch_op:
+        batch_op.create_index('ix_pagos_audit_empresa_id', ['id_empresa', 'id_audit'], unique=False)
+        batch_op.create_index('ix_pagos_audit_empresa_fecha', ['id_empresa', 'fecha_accion'], unique=False)
+
+    with op.batch_alter_table('clientes', schema=None) as batch_op:
+        batch_op.create_index('ix_clientes_empresa_documento', ['id_empresa', 'documento'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('clientes', schema=None) as batch_op:
+        batch_op.drop_index('ix_clientes_empresa_documento')
+
+    with op.batch_alter_table('historial_pagos_audit', schema=None) as batch_op:
+        batch_op.drop_index('ix_pagos_audit_empresa_fecha')
+        batch_op.drop_index('ix_pagos_audit_empresa_id')
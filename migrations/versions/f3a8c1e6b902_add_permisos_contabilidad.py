@@ -0,0 +1,38 @@
+"""Add cierre.gestionar and cuenta.gestionar permissions
+
+Revision ID: f3a8c1e6b902
+Revises: c9e4a7b2d315
+Create Date: 2026-10-17 14:02:41.318204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f3a8c1e6b902'
+down_revision = 'c9e4a7b2d315'
+branch_labels = None
+depends_on = None
+
+PERMISOS = (
+    ('cierre.gestionar', 'Cerrar y reabrir períodos contables'),
+    ('cuenta.gestionar', 'Modificar el plan de cuentas'),
+)
+
+
+def upgrade():
+    # Solo si no existen (pueden haberse creado a mano desde /api/permisos)
+    for nombre, descripcion in PERMISOS:
+        op.execute(sa.text(
+            "INSERT INTO permiso (nombre, descripcion) "
+            "SELECT :nombre, :descripcion WHERE NOT EXISTS (SELECT 1 FROM permiso WHERE nombre = :nombre)"
+        ).bindparams(nombre=nombre, descripcion=descripcion))
+
+
+def downgrade():
+    op.execute(sa.text(
+        "DELETE FROM rol_permiso WHERE id_permiso IN (SELECT id_permiso FROM permiso WHERE nombre IN :nombres)"
+    ).bindparams(sa.bindparam('nombres', [n for n, _ in PERMISOS], expanding=True)))
+    op.execute(sa.text("DELETE FROM permiso WHERE nombre IN :nombres")
+               .bindparams(sa.bindparam('nombres', [n for n, _ in PERMISOS], expanding=True)))
@@ -0,0 +1,41 @@
+# scripts/bench_amortizacion.py
+# Micro-benchmark del motor de amortización en centavos.
+# Uso: python scripts/bench_amortizacion.py [cuotas] [repeticiones]
+import sys
+import os
+import timeit
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.services.amortizacion import generar_plan
+
+# Presupuesto por plan de 1000 cuotas (segundos)
+MAX_SEGUNDOS = 0.001
+
+
+def run(cuotas=1000, repeticiones=2000):
+    casos = [
+        dict(monto=1000000, cuotas=cuotas, tasa_porcentaje=20),
+        dict(monto=987654.33, cuotas=cuotas, tasa_porcentaje=17.5),
+        dict(monto=1000000, cuotas=cuotas, tasa_porcentaje=20, usar_redondeo=True, monto_redondeado=1200),
+    ]
+    peor = 0.0
+    for caso in casos:
+        plan = generar_plan(**caso)
+        # Exactitud: las sumas cuadran al centavo
+        assert sum(plan.montos) == plan.total, caso
+        assert sum(plan.capitales) == plan.monto, caso
+        assert sum(plan.intereses) == plan.interes, caso
+
+        mejor = min(timeit.repeat(lambda: generar_plan(**caso), number=repeticiones, repeat=5)) / repeticiones
+        peor = max(peor, mejor)
+        modo = "redondeo" if caso.get("usar_redondeo") else "estándar"
+        print(f"{modo:9} | {cuotas} cuotas | {mejor * 1e6:8.1f} µs/plan")
+
+    print(f"Peor caso: {peor * 1e6:.1f} µs (máximo {MAX_SEGUNDOS * 1e6:.0f} µs)")
+    return 0 if peor < MAX_SEGUNDOS else 1
+
+
+if __name__ == "__main__":
+    args = [int(a) for a in sys.argv[1:3]]
+    sys.exit(run(*args))
@@ -0,0 +1,51 @@
+# scripts/bench_login.py
+# Benchmark de POST /api/auth/login: logins/s totales y por núcleo.
+# Usar con un usuario de pruebas (cada login queda en historial_accesos).
+# Uso: python scripts/bench_login.py <nombre_usuario> <password> [logins] [hilos]
+import contextlib
+import io
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app import create_app, iniciar_tareas_de_fondo
+from app.utils import passwords
+
+
+def run(username, password, logins=200, hilos=None):
+    hilos = hilos or passwords.CONCURRENCIA
+    nucleos = min(hilos, passwords.CONCURRENCIA, os.cpu_count() or 1)
+    app = create_app()
+    iniciar_tareas_de_fondo(app)  # mismo camino que el servidor (escritor de accesos)
+    print(f"{passwords.METODO} | hasta {passwords.CONCURRENCIA} hash(es) a la vez | {hilos} cliente(s) concurrentes")
+
+    def login(_):
+        resp = app.test_client().post("/api/auth/login", json={"username": username, "password": password})
+        return resp.status_code
+
+    with contextlib.redirect_stdout(io.StringIO()):  # login imprime trazas por intento
+        login(None)  # calentamiento (y rehash si el hash usa otros parámetros)
+        inicio = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=hilos) as pool:
+            codigos = list(pool.map(login, range(logins)))
+        segundos = time.perf_counter() - inicio
+
+    fallidos = sum(1 for c in codigos if c != 200)
+    if fallidos:
+        print(f"[ERROR] {fallidos} login(s) no devolvieron 200 (códigos: {sorted(set(codigos))}).")
+        return 1
+    por_segundo = logins / segundos
+    print(f"{logins} logins en {segundos:.2f}s | {por_segundo:.1f} logins/s | "
+          f"{por_segundo / nucleos:.1f} logins/s por núcleo ({nucleos} núcleo(s))")
+    return 0
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 3:
+        print("Uso: python scripts/bench_login.py <nombre_usuario> <password> [logins] [hilos]")
+        sys.exit(2)
+    extra = [int(a) for a in sys.argv[3:5]]
+    sys.exit(run(sys.argv[1], sys.argv[2], *extra))
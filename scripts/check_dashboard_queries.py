@@ -0,0 +1,48 @@
+# scripts/check_dashboard_queries.py
+# Regresión de cantidad de consultas de /api/dashboard/summary.
+# Uso: python scripts/check_dashboard_queries.py <nombre_usuario>
+import sys
+import os
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sqlalchemy import event
+from flask_jwt_extended import create_access_token
+from app import create_app
+from app.extensions import db
+from app.models.catalog import Usuario
+
+# 1 (carga de usuario del JWT) + 1 (KPIs) + 1 (gráfico)
+MAX_QUERIES = 3
+
+
+def run(username):
+    app = create_app()
+    with app.app_context():
+        user = Usuario.query.filter_by(nombre_usuario=username).first()
+        if not user:
+            print(f"[ERROR] Usuario '{username}' no encontrado.")
+            return 1
+        token = create_access_token(identity=str(user.id_usuario))
+
+        consultas = []
+        def contar(conn, cursor, statement, *args):
+            consultas.append(statement)
+        event.listen(db.engine, "before_cursor_execute", contar)
+
+        client = app.test_client()
+        resp = client.get("/api/dashboard/summary", headers={"Authorization": f"Bearer {token}"})
+        event.remove(db.engine, "before_cursor_execute", contar)
+
+        print(f"Status: {resp.status_code} | Consultas: {len(consultas)} (máximo {MAX_QUERIES})")
+        if resp.status_code != 200 or len(consultas) > MAX_QUERIES:
+            for sql in consultas:
+                print("  -", sql.splitlines()[0])
+            print("[FAIL]")
+            return 1
+        print("[OK]")
+        return 0
+
+
+if __name__ == "__main__":
+    sys.exit(run(sys.argv[1] if len(sys.argv) > 1 else "admin_global"))
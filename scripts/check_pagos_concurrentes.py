@@ -0,0 +1,67 @@
+# scripts/check_pagos_concurrentes.py
+# Prueba de concurrencia de POST /api/pagos/: dispara pagos en paralelo contra
+# una misma cuota y verifica que no se pierdan actualizaciones.
+# Registra pagos reales: usar contra una base de staging/pruebas.
+# Uso: python scripts/check_pagos_concurrentes.py <nombre_usuario> <id_detalle> [hilos] [monto]
+import sys
+import os
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from flask_jwt_extended import create_access_token
+from sqlalchemy import func
+from app import create_app
+from app.extensions import db
+from app.models.catalog import Usuario, DetalleCredito, FormaPago, Pago
+
+
+def run(username, id_detalle, hilos=8, monto="1.00"):
+    app = create_app()
+    with app.app_context():
+        user = Usuario.query.filter_by(nombre_usuario=username).first()
+        if not user:
+            print(f"[ERROR] Usuario '{username}' no encontrado.")
+            return 1
+        forma = FormaPago.query.filter_by(id_empresa=user.id_empresa).first()
+        if not forma:
+            print("[ERROR] La empresa no tiene formas de pago.")
+            return 1
+        token = create_access_token(identity=str(user.id_usuario))
+        antes = DetalleCredito.query.get(id_detalle).monto_pagado or 0
+
+    def pagar(_):
+        client = app.test_client()
+        resp = client.post(
+            "/api/pagos/",
+            json={"id_detalle_credito": id_detalle, "id_forma_pago": forma.id_forma_pago, "monto_pagado": monto},
+            headers={"Authorization": f"Bearer {token}"}
+        )
+        return resp.status_code
+
+    with ThreadPoolExecutor(max_workers=hilos) as pool:
+        estados = list(pool.map(pagar, range(hilos)))
+
+    with app.app_context():
+        db.session.expire_all()
+        detalle = DetalleCredito.query.get(id_detalle)
+        activos = db.session.query(func.coalesce(func.sum(Pago.monto_pagado), 0))\
+            .filter(Pago.id_detalle_credito == id_detalle, Pago.estado == 'ACTIVO').scalar()
+        ok = estados.count(201)
+        esperado = Decimal(str(antes)) + Decimal(monto) * ok
+
+    print(f"Respuestas: {estados}")
+    print(f"monto_pagado: {detalle.monto_pagado} | esperado: {esperado} | suma de pagos activos: {activos}")
+    if Decimal(str(detalle.monto_pagado)) != esperado or Decimal(str(detalle.monto_pagado)) != Decimal(str(activos)):
+        print("[FALLA] Se perdieron actualizaciones concurrentes.")
+        return 1
+    print("[OK] Sin actualizaciones perdidas.")
+    return 0
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 3:
+        print("Uso: python scripts/check_pagos_concurrentes.py <nombre_usuario> <id_detalle> [hilos] [monto]")
+        sys.exit(2)
+    sys.exit(run(sys.argv[1], int(sys.argv[2]), *(int(a) for a in sys.argv[3:4]), *sys.argv[4:5]))
@@ -1,8 +1,9 @@
 # wsgi.py
 # -*- coding: utf-8 -*-
-from app import create_app
+from app import create_app, iniciar_tareas_de_fondo
 
 app = create_app()
+iniciar_tareas_de_fondo(app)
 
 if __name__ == "__main__":
     # ¡esto mantiene el server corriendo!